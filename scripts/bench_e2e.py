@@ -0,0 +1,197 @@
+"""End-to-end simulation throughput around run_case.
+
+Runs the scenario x controller x dt x disturbance level x horizon matrix,
+each case in a fresh worker process so peak RSS is per case, and reports:
+
+- rtf: real-time factor, simulated seconds per wall second
+- rhs_per_s: closed-loop RHS evaluations per wall second (4 per step for
+  rk4, the solver's count for dopri45)
+- peak_rss_mb: worker peak resident set size (and growth over the
+  post-import level)
+
+Every case is appended as one JSON line to ``--history`` together with the
+commit, package and interpreter versions, so throughput can be tracked
+across versions.
+
+    python scripts/bench_e2e.py --quick
+    python scripts/bench_e2e.py --dts 0.001 0.0005 --levels 2 --horizons 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import replace
+from datetime import datetime
+from importlib.metadata import PackageNotFoundError, version
+
+import numpy as np
+
+from quadlqr.config import ExperimentConfig
+from quadlqr.sim import scenarios
+from quadlqr.sim.logger import load_log
+from quadlqr.sim.runner import run_case
+
+DTS = (0.01, 0.005, 0.002, 0.001, 0.0005)
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+def run_one(case: dict) -> dict:
+    """Worker: simulate one case and measure it (fresh process per case)."""
+    rss0 = _rss_mb()
+    base = ExperimentConfig()
+    cfg = replace(
+        base,
+        sim=replace(
+            base.sim,
+            dt=case["dt"],
+            integrator=case["integrator"],
+            fast_path=case["fast_path"],
+            log_format=case["log_format"],
+        ),
+        # dopri45 rejects per-call online noise; give it the pre-generated table
+        disturb=replace(
+            base.disturb,
+            level=case["level"],
+            mode="table" if case["integrator"] == "dopri45" else base.disturb.mode,
+        ),
+    )
+    ref_fn = getattr(scenarios, case["scenario"])
+    with tempfile.TemporaryDirectory() as outdir:
+        t0 = time.perf_counter()
+        path = run_case(
+            cfg, "bench", ref_fn, case["controller"], case["horizon"], outdir
+        )
+        wall = time.perf_counter() - t0
+
+        steps = int(np.floor(case["horizon"] / case["dt"]))
+        nfev = 4 * steps if case["integrator"] == "rk4" else None
+        if path is not None and nfev is None:
+            nfev = int(load_log(path)["solver_stats"][2])
+
+    return {
+        "wall_s": wall,
+        "rtf": case["horizon"] / wall,
+        "steps_per_s": steps / wall,
+        "rhs_evals": nfev,
+        "rhs_per_s": nfev / wall if nfev is not None else None,
+        "peak_rss_mb": _rss_mb(),
+        "rss_growth_mb": _rss_mb() - rss0,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _meta() -> dict:
+    try:
+        pkg = version("quadlqr")
+    except PackageNotFoundError:
+        pkg = None
+    return {
+        "run_id": uuid.uuid4().hex[:12],
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "quadlqr": pkg,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--scenarios", nargs="+", default=["hover", "line", "circle"])
+    parser.add_argument("--controllers", nargs="+", default=["lqr", "pid"])
+    parser.add_argument("--dts", nargs="+", type=float, default=list(DTS))
+    parser.add_argument("--levels", nargs="+", type=int, default=[0, 1, 2])
+    parser.add_argument("--horizons", nargs="+", type=float, default=[5.0])
+    parser.add_argument("--integrator", default="rk4", choices=("rk4", "dopri45"))
+    parser.add_argument("--fast-path", action="store_true")
+    parser.add_argument(
+        "--log-format",
+        default="none",
+        choices=("none", "npz", "chunked"),
+        help="include log writing in the measurement (dopri45 needs a log "
+        "for its RHS count)",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="circle only, dt 0.01/0.001, level 0/2"
+    )
+    parser.add_argument("--history", default=os.path.join("benchmarks", "e2e.jsonl"))
+    args = parser.parse_args()
+
+    if args.quick:
+        args.scenarios, args.dts, args.levels = ["circle"], [0.01, 0.001], [0, 2]
+
+    cases = [
+        {
+            "scenario": sc,
+            "controller": ctrl,
+            "dt": dt,
+            "level": level,
+            "horizon": horizon,
+            "integrator": args.integrator,
+            "fast_path": args.fast_path,
+            "log_format": args.log_format,
+        }
+        for sc, ctrl, dt, level, horizon in itertools.product(
+            args.scenarios, args.controllers, args.dts, args.levels, args.horizons
+        )
+    ]
+
+    meta = _meta()
+    os.makedirs(os.path.dirname(args.history) or ".", exist_ok=True)
+    print(
+        f"{'scenario':>8s} {'ctrl':>4s} {'dt':>7s} {'lvl':>3s} {'T':>6s} "
+        f"{'rtf':>8s} {'rhs/s':>9s} {'rss MB':>7s}"
+    )
+    # one fresh process per case so ru_maxrss is that case's peak
+    ctx = mp.get_context("spawn")
+    with (
+        ctx.Pool(1, maxtasksperchild=1) as pool,
+        open(args.history, "a", encoding="utf-8") as hist,
+    ):
+        for case, res in zip(cases, pool.imap(run_one, cases), strict=True):
+            hist.write(json.dumps({**meta, **case, **res}) + "\n")
+            hist.flush()
+            rhs = f"{res['rhs_per_s']:9.0f}" if res["rhs_per_s"] else f"{'-':>9s}"
+            print(
+                f"{case['scenario']:>8s} {case['controller']:>4s} "
+                f"{case['dt']:7.4f} {case['level']:3d} {case['horizon']:6.1f} "
+                f"{res['rtf']:8.2f} {rhs} {res['peak_rss_mb']:7.1f}"
+            )
+    print(f"[OK] {len(cases)} cases appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
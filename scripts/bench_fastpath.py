@@ -0,0 +1,101 @@
+"""Compare the reference closed-loop RK4 step with the fast path.
+
+Reports wall time and tracemalloc-measured transient memory per step (peak
+above the pre-step level, i.e. temporaries allocated inside the step) and
+checks that both paths produce the same trajectory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from quadlqr.config import DisturbanceConfig, MotorParams, QuadParams, RotorParams
+from quadlqr.dynamics import MotorModel, QuadrotorPlant
+from quadlqr.sim.fastpath import FastRHS, FastRK4, normalize_quat_inplace
+from quadlqr.sim.integrator import rk4_step
+
+
+def initial_state() -> np.ndarray:
+    x = np.zeros(17)
+    x[2] = 1.0
+    x[6] = 1.0
+    x[10:13] = [0.3, -0.2, 0.1]
+    x[13:17] = 1200.0
+    return x
+
+
+def make_reference(plant: QuadrotorPlant, motor: MotorModel, omega_cmd):
+    def step(t: float, x: np.ndarray, dt: float) -> np.ndarray:
+        def rhs(tk, xk):
+            xdot = plant.f(tk, xk).copy()
+            xdot[13:17] = motor.deriv(xk[13:17], omega_cmd)
+            return xdot
+
+        return plant.post_process(rk4_step(rhs, t, x, dt))
+
+    return step
+
+
+def make_fast(plant: QuadrotorPlant, motor: MotorModel, omega_cmd):
+    rhs = FastRHS(plant, motor)
+    stepper = FastRK4(17)
+
+    def f(tk, xk, out):
+        return rhs(tk, xk, omega_cmd, out)
+
+    def step(t: float, x: np.ndarray, dt: float) -> np.ndarray:
+        stepper.step(f, t, x, dt)
+        return normalize_quat_inplace(x)
+
+    return step
+
+
+def measure(step, steps: int, dt: float) -> tuple[np.ndarray, float, float]:
+    x = initial_state()
+    t0 = time.perf_counter()
+    for k in range(steps):
+        x = step(k * dt, x, dt)
+    wall = (time.perf_counter() - t0) / steps
+
+    x = initial_state()
+    tracemalloc.start()
+    transient = 0
+    for k in range(steps):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        x = step(k * dt, x, dt)
+        transient += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return x, wall, transient / steps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--dt", type=float, default=0.001)
+    parser.add_argument("--level", type=int, default=0, help="disturbance level")
+    args = parser.parse_args()
+
+    omega_cmd = np.array([1210.0, 1190.0, 1205.0, 1195.0])
+    results = {}
+    for name, make in (("reference", make_reference), ("fast", make_fast)):
+        plant = QuadrotorPlant(
+            QuadParams(), RotorParams(), DisturbanceConfig(level=args.level)
+        )
+        motor = MotorModel(MotorParams().tau)
+        results[name] = measure(make(plant, motor, omega_cmd), args.steps, args.dt)
+
+    for name, (_, wall, transient) in results.items():
+        print(
+            f"{name:>9s}: {wall * 1e6:8.1f} us/step  {transient:8.0f} B/step transient"
+        )
+    diff = np.abs(results["reference"][0] - results["fast"][0]).max()
+    print(f"max |x_ref - x_fast| after {args.steps} steps: {diff:.3e}")
+
+
+if __name__ == "__main__":
+    main()
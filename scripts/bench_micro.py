@@ -0,0 +1,208 @@
+"""Microbenchmarks for the control and math hot paths.
+
+Times each call in isolation (best of ``--repeat`` timeit runs) and measures
+transient memory per call with tracemalloc (peak traced bytes above the
+pre-call level, i.e. temporaries allocated inside the call). Results go to
+JSON; with ``--baseline`` they are compared against a stored run and the
+script exits non-zero on regressions beyond the tolerances.
+
+    python scripts/bench_micro.py --save-baseline benchmarks/micro.json
+    python scripts/bench_micro.py --baseline benchmarks/micro.json --tol 0.2
+
+A baseline entry may carry its own ``"tol"`` / ``"tol_bytes"`` to override
+the command-line tolerances for noisy benchmarks.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime
+
+import numpy as np
+
+from quadlqr.config import (
+    DisturbanceConfig,
+    Limits,
+    LQRConfig,
+    PIDConfig,
+    QuadParams,
+    RotorParams,
+)
+from quadlqr.control import BaselinePID, HierarchicalLQR, Mixer
+from quadlqr.control.reference import accel_to_q_and_thrust
+from quadlqr.dynamics import QuadrotorPlant
+from quadlqr.math import R_to_q, q_to_R
+from quadlqr.sim.integrator import rk4_step
+from quadlqr.types import State
+
+
+def make_cases() -> dict[str, Callable[[], object]]:
+    quad, rotor, limits = QuadParams(), RotorParams(), Limits()
+    st = State(
+        p=np.array([0.1, -0.2, 0.9]),
+        v=np.array([0.05, 0.0, -0.02]),
+        q=np.array([0.995, 0.05, -0.06, 0.05]),
+        omega=np.array([0.1, -0.2, 0.05]),
+        omega_m=np.full(4, 1200.0),
+    )
+    ref = {
+        "p_d": np.array([0.0, 0.0, 1.0]),
+        "v_d": np.zeros(3),
+        "a_ff": np.zeros(3),
+        "yaw_d": 0.0,
+    }
+    lqr = HierarchicalLQR.build(quad, LQRConfig(), limits)
+    pid = BaselinePID.build(quad, PIDConfig(), limits)
+    mixer = Mixer(rotor.kf, rotor.km, rotor.arm, limits.omega_min, limits.omega_max)
+    tau = np.array([0.001, -0.002, 0.0005])
+    a_cmd = np.array([0.3, -0.2, 0.1])
+    q = st.q / np.linalg.norm(st.q)
+    R = q_to_R(q)
+    plant = QuadrotorPlant(quad, rotor, DisturbanceConfig(level=0))
+    plant_d = QuadrotorPlant(quad, rotor, DisturbanceConfig(level=2))
+    x = st.as_vector()
+    xdot = plant.f(0.0, x)
+
+    def const_rhs(t, xk):
+        return xdot
+
+    return {
+        "HierarchicalLQR.compute": lambda: lqr.compute(st, ref, 0.001),
+        "BaselinePID.compute": lambda: pid.compute(st, ref, 0.001),
+        "Mixer.allocate": lambda: mixer.allocate(0.35, tau),
+        "accel_to_q_and_thrust": lambda: accel_to_q_and_thrust(
+            a_cmd, 0.1, quad.m, quad.g
+        ),
+        "R_to_q": lambda: R_to_q(R),
+        "q_to_R": lambda: q_to_R(q),
+        "QuadrotorPlant.f": lambda: plant.f(0.3, x),
+        "QuadrotorPlant.f[disturbed]": lambda: plant_d.f(0.3, x),
+        # integrator overhead only: the RHS returns a precomputed derivative
+        "rk4_step": lambda: rk4_step(const_rhs, 0.0, x, 0.001),
+    }
+
+
+def time_call(fn: Callable[[], object], repeat: int, min_time: float) -> float:
+    """Best-of-``repeat`` ns/call, each run sized to take about ``min_time``."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def alloc_per_call(fn: Callable[[], object], calls: int) -> float:
+    """Mean transient traced bytes per call."""
+    fn()  # warm caches / lazily created objects
+    tracemalloc.start()
+    total = 0
+    for _ in range(calls):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / calls
+
+
+def run(selected: list[str] | None, repeat: int, min_time: float, calls: int) -> dict:
+    results = {}
+    for name, fn in make_cases().items():
+        if selected and not any(s in name for s in selected):
+            continue
+        results[name] = {
+            "ns_per_call": time_call(fn, repeat, min_time),
+            "bytes_per_call": alloc_per_call(fn, calls),
+        }
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tol: float, tol_bytes: float) -> list[str]:
+    """Regression messages for every benchmark slower / hungrier than allowed.
+
+    Time may grow by a factor ``1 + tol``; bytes by ``1 + tol_bytes`` plus a
+    64-byte floor so zero-allocation baselines are not flagged by noise.
+    """
+    failures = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        t_tol = base.get("tol", tol)
+        b_tol = base.get("tol_bytes", tol_bytes)
+        if cur["ns_per_call"] > base["ns_per_call"] * (1.0 + t_tol):
+            failures.append(
+                f"{name}: {cur['ns_per_call']:.0f} ns/call vs baseline "
+                f"{base['ns_per_call']:.0f} (+{t_tol:.0%} allowed)"
+            )
+        if cur["bytes_per_call"] > base["bytes_per_call"] * (1.0 + b_tol) + 64:
+            failures.append(
+                f"{name}: {cur['bytes_per_call']:.0f} B/call vs baseline "
+                f"{base['bytes_per_call']:.0f} (+{b_tol:.0%} allowed)"
+            )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("names", nargs="*", help="only run benchmarks matching these")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="s per timing run")
+    parser.add_argument("--calls", type=int, default=200, help="calls for alloc stats")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--save-baseline", help="write results as a new baseline")
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--tol", type=float, default=0.25, help="allowed slowdown")
+    parser.add_argument(
+        "--tol-bytes", type=float, default=0.10, help="allowed allocation growth"
+    )
+    args = parser.parse_args()
+
+    current = run(args.names, args.repeat, args.min_time, args.calls)
+    base = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+
+    for name, r in current["results"].items():
+        ns, nbytes = r["ns_per_call"], r["bytes_per_call"]
+        line = f"{name:>28s}: {ns:10.0f} ns/call {nbytes:8.0f} B/call"
+        if base and name in base["results"]:
+            ratio = r["ns_per_call"] / base["results"][name]["ns_per_call"]
+            line += f"  x{ratio:.2f} vs baseline"
+        print(line)
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(current, f, indent=2)
+
+    if base is not None:
+        failures = compare(current, base, args.tol, args.tol_bytes)
+        for msg in failures:
+            print(f"[REGRESSION] {msg}")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Cross-check the NumPy Riccati solvers against SciPy and time cold start."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+import numpy as np
+
+from quadlqr.control.riccati import (
+    care_residual,
+    dare_residual,
+    solve_care,
+    solve_dare,
+)
+
+COLD_START = """
+import time
+t0 = time.perf_counter()
+import quadlqr.control
+from quadlqr.config import Limits, LQRConfig, QuadParams
+from quadlqr.control.lqr import HierarchicalLQR
+from quadlqr.control import riccati
+{patch}
+HierarchicalLQR.build(QuadParams(), LQRConfig(), Limits())
+print(time.perf_counter() - t0)
+"""
+
+# route the design through SciPy, as before the NumPy backend existed
+SCIPY_PATCH = """
+import quadlqr.control.lqr as _lqr
+_lqr.care = lambda A, B, Q, R: riccati.care(A, B, Q, R, backend="scipy")
+"""
+
+
+def check_accuracy(trials: int, seed: int) -> dict:
+    from scipy.linalg import solve_continuous_are, solve_discrete_are
+
+    rng = np.random.default_rng(seed)
+    worst = {"care_rel_err": 0.0, "dare_rel_err": 0.0, "care_res": 0.0, "dare_res": 0.0}
+    for _ in range(trials):
+        n = int(rng.integers(2, 9))
+        m = int(rng.integers(1, n + 1))
+        A = rng.standard_normal((n, n))
+        B = rng.standard_normal((n, m))
+        C = rng.standard_normal((n, n))
+        Q = C @ C.T + 0.1 * np.eye(n)
+        D = rng.standard_normal((m, m))
+        R = D @ D.T + 0.1 * np.eye(m)
+
+        P = solve_care(A, B, Q, R)
+        Ps = solve_continuous_are(A, B, Q, R)
+        err = np.abs(P - Ps).max() / np.abs(Ps).max()
+        worst["care_rel_err"] = max(worst["care_rel_err"], float(err))
+        worst["care_res"] = max(worst["care_res"], care_residual(P, A, B, Q, R))
+
+        Ad = 1.1 * A / np.abs(np.linalg.eigvals(A)).max()
+        P = solve_dare(Ad, B, Q, R)
+        Ps = solve_discrete_are(Ad, B, Q, R)
+        err = np.abs(P - Ps).max() / np.abs(Ps).max()
+        worst["dare_rel_err"] = max(worst["dare_rel_err"], float(err))
+        worst["dare_res"] = max(worst["dare_res"], dare_residual(P, Ad, B, Q, R))
+    return worst
+
+
+def time_cold_start(patch: str, repeat: int) -> float:
+    code = COLD_START.format(patch=patch)
+    # no persistent gain cache: every process must really solve
+    env = {k: v for k, v in os.environ.items() if k != "QUADLQR_GAIN_CACHE"}
+    times = [
+        float(subprocess.check_output([sys.executable, "-c", code], text=True, env=env))
+        for _ in range(repeat)
+    ]
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    worst = check_accuracy(args.trials, args.seed)
+    for k, v in worst.items():
+        print(f"{k:>14s}: {v:.3e}")
+
+    t_np = time_cold_start("", args.repeat)
+    t_sp = time_cold_start(SCIPY_PATCH, args.repeat)
+    print(f"cold import + build (numpy backend): {t_np * 1e3:8.1f} ms")
+    print(f"cold import + build (scipy backend): {t_sp * 1e3:8.1f} ms")
+
+    if worst["care_rel_err"] > 1e-8 or worst["dare_rel_err"] > 1e-8:
+        sys.exit("NumPy Riccati solvers disagree with SciPy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""Validate the analytic Jacobians against central finite differences.
+
+Checks, at ``--samples`` random states/wrenches (non-unit quaternions, body
+rates up to ``--max-rate`` rad/s, rotor speeds inside the limits):
+
+- ``QuadrotorPlant.jacobian`` / ``jacobian_batch`` against d plant.f / dx;
+- ``QuadrotorPlant.wrench_jacobian`` against d wrench_from_omega / d omega_m;
+- ``Mixer.jacobian`` / ``jacobian_batch`` against d allocate / du;
+- ``MotorModel.jacobian`` and ``flow_jacobian``;
+- ``linearize`` / ``linearize_batch`` against the actuated-plant RHS;
+- ``HierarchicalLQR.jacobian`` / ``BaselinePID.jacobian`` (and their batched
+  variants) against d compute / dx, and ``closed_loop_jacobian`` /
+  ``closed_loop_jacobian_batch`` against run_case's stage-mode
+  closed_loop_rhs, at states around a hover reference (integrators held at a
+  non-zero value, dt = 0 so they do not advance). States within 1e-3 of a
+  wrench clip are skipped, saturated ones are kept (zero rows); the closed
+  loop only uses states whose rotor commands stay inside the limits.
+
+Errors are max |analytic - fd| / max(|fd|, 1) per entry (per row for the
+closed loop, whose motor rows reach ~1e8). Also times one
+analytic Jacobian against the 34 plant.f calls of the finite difference.
+Exits non-zero if any error exceeds ``--tol``.
+
+    python scripts/check_jacobians.py
+    python scripts/check_jacobians.py --samples 200 --max-rate 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from dataclasses import replace
+
+import numpy as np
+
+from quadlqr.config import DisturbanceConfig, ExperimentConfig
+from quadlqr.control import BaselinePID, HierarchicalLQR, Mixer
+from quadlqr.dynamics import (
+    MotorModel,
+    QuadrotorPlant,
+    closed_loop_jacobian,
+    closed_loop_jacobian_batch,
+    linearize,
+    linearize_batch,
+)
+from quadlqr.types import State
+
+
+def fd(fn, x: np.ndarray, rel: float = 1e-6) -> np.ndarray:
+    """Central-difference Jacobian of fn at x, steps scaled to |x_i|."""
+    x = np.asarray(x, dtype=float)
+    cols = []
+    for i in range(x.size):
+        h = rel * max(1.0, abs(x[i]))
+        xp, xm = x.copy(), x.copy()
+        xp[i] += h
+        xm[i] -= h
+        cols.append((np.asarray(fn(xp)) - np.asarray(fn(xm))) / (2.0 * h))
+    return np.stack(cols, axis=-1)
+
+
+def rel_err(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.max(np.abs(a - b) / np.maximum(np.abs(b), 1.0)))
+
+
+def row_err(a: np.ndarray, b: np.ndarray) -> float:
+    """rel_err with each row scaled by its largest |fd| entry."""
+    scale = np.maximum(np.max(np.abs(b), axis=-1, keepdims=True), 1.0)
+    return float(np.max(np.abs(a - b) / scale))
+
+
+def sample(rng, n: int, cfg: ExperimentConfig, max_rate: float):
+    lo, hi = cfg.limits.omega_min, cfg.limits.omega_max
+    X = np.zeros((n, 17))
+    X[:, 0:3] = rng.uniform(-2.0, 2.0, (n, 3))
+    X[:, 3:6] = rng.uniform(-3.0, 3.0, (n, 3))
+    X[:, 6:10] = rng.standard_normal((n, 4)) * rng.uniform(0.8, 1.2, (n, 1))
+    X[:, 10:13] = rng.uniform(-max_rate, max_rate, (n, 3))
+    X[:, 13:17] = rng.uniform(lo + 0.1 * (hi - lo), hi - 0.1 * (hi - lo), (n, 4))
+    # wrenches from rotor speeds strictly inside the limits, so no clip is active
+    M = QuadrotorPlant(cfg.quad, cfg.rotor, cfg.disturb).mixing_matrix()
+    W = rng.uniform(lo + 0.1 * (hi - lo), hi - 0.1 * (hi - lo), (n, 4))
+    U = (W * W) @ M.T
+    return X, U
+
+
+def sample_loop(rng, n: int, cfg: ExperimentConfig, yaw: float):
+    """States around hover at the origin with heading yaw.
+
+    Deviations are scaled by 10**U(-4, 0) per sample, so the set mixes the
+    linear regime with states where the torque (and some rotor) clips.
+    """
+    scale = 10.0 ** rng.uniform(-4.0, 0.0, (n, 1))
+    X = np.zeros((n, 17))
+    X[:, 0:3] = scale * rng.uniform(-0.2, 0.2, (n, 3))
+    X[:, 3:6] = scale * rng.uniform(-0.3, 0.3, (n, 3))
+    X[:, 6] = np.cos(0.5 * yaw)
+    X[:, 9] = np.sin(0.5 * yaw)
+    X[:, 7:10] += scale * rng.uniform(-0.05, 0.05, (n, 3))
+    X[:, 6:10] *= rng.uniform(0.9, 1.1, (n, 1))
+    X[:, 10:13] = scale * rng.uniform(-0.3, 0.3, (n, 3))
+    w_hover = np.sqrt(cfg.quad.m * cfg.quad.g / (4.0 * cfg.rotor.kf))
+    X[:, 13:17] = w_hover * rng.uniform(0.9, 1.1, (n, 4))
+    return X
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--max-rate", type=float, default=20.0, help="rad/s")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tol", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    cfg = ExperimentConfig(disturb=DisturbanceConfig(level=0))
+    plant = QuadrotorPlant(cfg.quad, cfg.rotor, cfg.disturb)
+    motor = MotorModel(cfg.motor.tau)
+    mixer = Mixer(
+        cfg.rotor.kf,
+        cfg.rotor.km,
+        cfg.rotor.arm,
+        cfg.limits.omega_min,
+        cfg.limits.omega_max,
+    )
+    rng = np.random.default_rng(args.seed)
+    X, U = sample(rng, args.samples, cfg, args.max_rate)
+    h = 0.5 * cfg.motor.tau
+
+    def actuated(x, u):
+        xdot = plant.f(0.0, x)
+        xdot[13:17] = motor.deriv(x[13:17], mixer.allocate(u[0], u[1:4]))
+        return xdot
+
+    def motor_flow(z):
+        return motor.flow(z[:4], z[4:], h)
+
+    err = dict.fromkeys(
+        [
+            "plant.jacobian",
+            "plant.wrench_jacobian",
+            "mixer.jacobian",
+            "motor.jacobian",
+            "motor.flow_jacobian",
+            "linearize A",
+            "linearize B",
+        ],
+        0.0,
+    )
+    A_fd, B_fd = [], []
+    for x, u in zip(X, U, strict=True):
+        A_fd.append(fd(lambda z, u=u: actuated(z, u), x))
+        B_fd.append(fd(lambda v, x=x: actuated(x, v), u))
+        err["plant.jacobian"] = max(
+            err["plant.jacobian"],
+            rel_err(plant.jacobian(0.0, x), fd(lambda z: plant.f(0.0, z), x)),
+        )
+
+        def wrench(w):
+            T, tau = plant.wrench_from_omega(w)
+            return np.concatenate([[T], tau])
+
+        err["plant.wrench_jacobian"] = max(
+            err["plant.wrench_jacobian"],
+            rel_err(plant.wrench_jacobian(x[13:17]), fd(wrench, x[13:17])),
+        )
+        err["mixer.jacobian"] = max(
+            err["mixer.jacobian"],
+            rel_err(
+                mixer.jacobian(u[0], u[1:4]),
+                fd(lambda v: mixer.allocate(v[0], v[1:4]), u),
+            ),
+        )
+        cmd = mixer.allocate(u[0], u[1:4])
+        d_omega, d_cmd = motor.jacobian()
+        err["motor.jacobian"] = max(
+            err["motor.jacobian"],
+            rel_err(
+                np.hstack([d_omega, d_cmd]),
+                fd(
+                    lambda z: motor.deriv(z[:4], z[4:]), np.concatenate([x[13:17], cmd])
+                ),
+            ),
+        )
+        err["motor.flow_jacobian"] = max(
+            err["motor.flow_jacobian"],
+            rel_err(
+                np.hstack(motor.flow_jacobian(h)),
+                fd(motor_flow, np.concatenate([x[13:17], cmd])),
+            ),
+        )
+        A, B = linearize(plant, motor, mixer, 0.0, x, u)
+        err["linearize A"] = max(err["linearize A"], rel_err(A, A_fd[-1]))
+        err["linearize B"] = max(err["linearize B"], rel_err(B, B_fd[-1]))
+
+    # batched variants must agree with the scalar ones
+    A_b, B_b = linearize_batch(plant, motor, mixer, 0.0, X, U)
+    err["plant.jacobian_batch"] = max(
+        rel_err(plant.jacobian_batch(0.0, X)[i], plant.jacobian(0.0, X[i]))
+        for i in range(len(X))
+    )
+    err["plant.wrench_jacobian_batch"] = rel_err(
+        plant.wrench_jacobian_batch(X[:, 13:17]),
+        np.stack([plant.wrench_jacobian(x[13:17]) for x in X]),
+    )
+    err["mixer.jacobian_batch"] = rel_err(
+        mixer.jacobian_batch(U), np.stack([mixer.jacobian(u[0], u[1:4]) for u in U])
+    )
+    err["linearize_batch A"] = rel_err(A_b, np.stack(A_fd))
+    err["linearize_batch B"] = rel_err(B_b, np.stack(B_fd))
+
+    # controllers and the closed loop, as closed_loop_rhs evaluates them
+    ref = {
+        "p_d": np.zeros(3),
+        "v_d": np.zeros(3),
+        "a_ff": np.zeros(3),
+        "yaw_d": 0.3,
+    }
+    integ = np.array([2e-4, -1e-4, 1e-4])
+    lim = cfg.limits
+    unlimited = replace(lim, thrust_max=np.inf, tau_max=np.inf)
+    span = lim.omega_max - lim.omega_min
+    counts = {}
+    for name, ctrl in (
+        ("lqr", HierarchicalLQR.build(cfg.quad, cfg.lqr, cfg.limits)),
+        ("pid", BaselinePID.build(cfg.quad, cfg.pid, cfg.limits)),
+    ):
+        # hover heading: the default LQR config holds yaw_des, PID tracks yaw_d
+        yaw = ref["yaw_d"]
+        if not getattr(ctrl.cfg, "yaw_track", True):
+            yaw = ctrl.cfg.yaw_des
+        XL = sample_loop(rng, 4 * args.samples, cfg, yaw)
+        ctrl.integ_ep[:] = integ
+        ctrl.integ_ep_batch = np.tile(integ, (len(XL), 1))
+
+        # finite differences are only valid away from the kinks: drop states
+        # whose unclipped wrench (same gains, no limits) is within 1e-3 of a
+        # clip, and keep the closed loop to rotor commands inside the limits
+        # (the mixer's sqrt is singular at 0)
+        raw = replace(ctrl, limits=unlimited)
+        U = raw.compute_batch(
+            XL[:, 0:3], XL[:, 3:6], XL[:, 6:10], XL[:, 10:13], ref, 0.0
+        )
+        far = np.all(
+            np.abs(np.abs(U[:, 1:4]) - lim.tau_max) > 1e-3 * lim.tau_max, axis=1
+        )
+        far &= np.abs(U[:, 0] - lim.thrust_max) > 1e-3 * lim.thrust_max
+        XL = XL[far][: args.samples]
+        U = ctrl.compute_batch(
+            XL[:, 0:3], XL[:, 3:6], XL[:, 6:10], XL[:, 10:13], ref, 0.0
+        )
+        cmd = np.stack([mixer.allocate(u[0], u[1:4]) for u in U])
+        inside = np.all(
+            (cmd > lim.omega_min + 0.1 * span) & (cmd < lim.omega_max - 0.1 * span),
+            axis=1,
+        )
+        ctrl.integ_ep_batch = np.tile(integ, (len(XL), 1))
+
+        def wrench(z, ctrl=ctrl):
+            return ctrl.compute(State.from_vector(z), ref, 0.0).as_vector()
+
+        def closed_loop_rhs(z, wrench=wrench):
+            u = wrench(z)
+            xdot = plant.f(0.0, z)
+            xdot[13:17] = motor.deriv(z[13:17], mixer.allocate(u[0], u[1:4]))
+            return xdot
+
+        K_fd = np.stack([fd(wrench, x) for x in XL])
+        K = np.stack([ctrl.jacobian(State.from_vector(x), ref) for x in XL])
+        err[f"{name}.jacobian"] = rel_err(K, K_fd)
+        err[f"{name}.jacobian_batch"] = rel_err(ctrl.jacobian_batch(XL, ref), K_fd)
+
+        XC = XL[inside]
+        # motor rows reach ~1e8 through the mixer: a smaller step keeps the
+        # O(h^2) truncation error down, and errors are taken per row since
+        # the round-off of such rows swamps their small entries
+        L_fd = np.stack([fd(closed_loop_rhs, x, rel=1e-7) for x in XC])
+        L = np.stack(
+            [closed_loop_jacobian(plant, motor, mixer, ctrl, 0.0, x, ref) for x in XC]
+        )
+        ctrl.integ_ep_batch = np.tile(integ, (len(XC), 1))
+        err[f"{name} closed_loop_jacobian"] = row_err(L, L_fd)
+        err[f"{name} closed_loop_jacobian_batch"] = row_err(
+            closed_loop_jacobian_batch(plant, motor, mixer, ctrl, 0.0, XC, ref), L_fd
+        )
+        saturated = int(np.sum(np.any(np.all(K == 0.0, axis=2), axis=1)))
+        counts[name] = (
+            f"{len(XL)} states ({saturated} saturated), {len(XC)} closed-loop"
+        )
+
+    width = max(len(k) for k in err)
+    failed = False
+    for name, e in err.items():
+        ok = e <= args.tol
+        failed |= not ok
+        print(f"{name:<{width}s}  {e:9.2e}  {'ok' if ok else 'FAIL'}")
+    print("; ".join(f"{k}: {v}" for k, v in counts.items()))
+
+    x = X[0]
+    reps = 200
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        plant.jacobian(0.0, x)
+    t_an = (time.perf_counter() - t0) / reps
+    t0 = time.perf_counter()
+    for _ in range(reps // 10):
+        fd(lambda z: plant.f(0.0, z), x)
+    t_fd = (time.perf_counter() - t0) / (reps // 10)
+    t0 = time.perf_counter()
+    for _ in range(reps // 10):
+        plant.jacobian_batch(0.0, X)
+    t_b = (time.perf_counter() - t0) / (reps // 10) / len(X)
+    print(
+        f"\nplant.jacobian {t_an * 1e6:.0f} us, finite differences {t_fd * 1e6:.0f} us "
+        f"({t_fd / t_an:.0f}x); jacobian_batch {t_b * 1e6:.1f} us per state "
+        f"(N={len(X)})"
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Accuracy versus step size of the Lie-group (RKMK) attitude integrator.
+
+Compares ``integrator="rk4"`` (quaternion summed in the RK stages, then
+renormalized) with ``"rkmk4"`` (quaternion advanced by the exponential map)
+against an RK4 reference at ``--dt-ref``, in two settings:
+
+1. closed loop: an aggressive circle (``--omega`` rad/s, ``--radius`` m) via
+   run_case, stage control, no disturbances and no position integrators, so
+   every run solves the same ODE (see compare_splitting.py);
+2. open loop: the torque-free vehicle tumbling at ``--tumble-rate`` rad/s,
+   where attitude kinematics are the only error source.
+
+Reported per dt: max position / attitude deviation, the quaternion norm
+error (rk4: of one step before renormalization; rkmk4: as integrated) and
+wall time; then, per method, the largest dt whose attitude error stays
+within ``--tol-deg``.
+
+    python scripts/compare_attitude.py
+    python scripts/compare_attitude.py --omega 4 --tumble-rate 60 --tol-deg 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from quadlqr.config import (
+    DisturbanceConfig,
+    ExperimentConfig,
+    LQRConfig,
+    PIDConfig,
+    SimConfig,
+    TrajConfig,
+)
+from quadlqr.dynamics import QuadrotorPlant
+from quadlqr.sim.integrator import rk4_step, rkmk4_step
+from quadlqr.sim.logger import load_log
+from quadlqr.sim.runner import run_case
+from quadlqr.sim.scenarios import circle
+
+METHODS = ("rk4", "rkmk4")
+
+
+def simulate(controller: str, method: str, dt: float, args, outdir):
+    cfg = ExperimentConfig(
+        sim=SimConfig(dt=dt, integrator=method),
+        lqr=LQRConfig(use_pos_integral=False),
+        pid=PIDConfig(ki_pos=np.zeros(3)),
+        traj=TrajConfig(circle_r=args.radius, circle_omega=args.omega),
+        disturb=DisturbanceConfig(level=0),
+    )
+    t0 = time.perf_counter()
+    path = run_case(cfg, f"circle_{method}", circle, controller, args.horizon, outdir)
+    wall = time.perf_counter() - t0
+    log = load_log(path)
+    return np.asarray(log["t"]), np.asarray(log["X"]), wall
+
+
+def tumble(method: str, dt: float, args) -> tuple[np.ndarray, np.ndarray, float]:
+    """Torque-free tumble (motors off, no gravity effect on attitude)."""
+    cfg = ExperimentConfig()
+    plant = QuadrotorPlant(cfg.quad, cfg.rotor, DisturbanceConfig(level=0))
+    x = np.zeros(17)
+    x[6] = 1.0
+    x[10:13] = args.tumble_rate * np.array([1.0, 0.4, 0.7]) / np.sqrt(1.65)
+    n = round(args.tumble_time / dt)
+    X = np.empty((n + 1, 17))
+    X[0] = x
+    t0 = time.perf_counter()
+    for k in range(n):
+        if method == "rkmk4":
+            x = rkmk4_step(plant.f, k * dt, x, dt)
+        else:
+            x = plant.post_process(rk4_step(plant.f, k * dt, x, dt))
+        X[k + 1] = x
+    return np.arange(n + 1) * dt, X, time.perf_counter() - t0
+
+
+def norm_error(method: str, X: np.ndarray, dt: float) -> float:
+    """rkmk4: max |1 - |q|| as integrated. rk4: the same for one RK4 step of
+    the attitude kinematics from each (sampled) state before renormalizing,
+    i.e. what post_process removes every step."""
+    if method == "rkmk4":
+        return float(np.abs(1.0 - np.linalg.norm(X[:, 6:10], axis=1)).max())
+
+    def f(t, y):
+        qdot = np.zeros(7)
+        w, qx, qy, qz = y[0:4]
+        ox, oy, oz = y[4:7]
+        qdot[0:4] = 0.5 * np.array(
+            [
+                -ox * qx - oy * qy - oz * qz,
+                ox * w + oz * qy - oy * qz,
+                oy * w - oz * qx + ox * qz,
+                oz * w + oy * qx - ox * qy,
+            ]
+        )
+        return qdot
+
+    worst = 0.0
+    for x in X[:: max(len(X) // 200, 1)]:
+        y = rk4_step(f, 0.0, np.concatenate([x[6:10], x[10:13]]), dt)
+        worst = max(worst, abs(1.0 - float(np.linalg.norm(y[0:4]))))
+    return worst
+
+
+def deviations(t, X, t_ref, X_ref) -> tuple[float, float]:
+    """Max position (m) and attitude (deg) deviation at the coarse log times."""
+    idx = np.clip(np.searchsorted(t_ref, t - 1e-9), 0, len(t_ref) - 1)
+    dp = np.linalg.norm(X[:, 0:3] - X_ref[idx, 0:3], axis=1)
+    dot = np.abs(np.sum(X[:, 6:10] * X_ref[idx, 6:10], axis=1))
+    dq = 2.0 * np.degrees(np.arccos(np.clip(dot, 0.0, 1.0)))
+    if not (np.all(np.isfinite(dp)) and np.all(np.isfinite(dq))):
+        return np.inf, np.inf
+    return float(dp.max()), float(dq.max())
+
+
+def report(title: str, run, ref, dts: list[float], args) -> None:
+    t_ref, X_ref = ref
+    print(f"\n{title} (reference: rk4, dt={args.dt_ref:g})")
+    print(
+        f"{'dt':>7s} {'method':>6s} {'pos err m':>10s} {'att err deg':>12s} "
+        f"{'|q| err':>9s} {'wall s':>7s}"
+    )
+    err = {}
+    for dt in dts:
+        for m in METHODS:
+            t, X, wall = run(m, dt)
+            dp, dq = deviations(t, X, t_ref, X_ref)
+            err[m, dt] = dq
+            print(
+                f"{dt:7.4f} {m:>6s} {dp:10.2e} {dq:12.2e} "
+                f"{norm_error(m, X, dt):9.1e} {wall:7.2f}"
+            )
+    for m in METHODS:
+        ok = [dt for dt in dts if err[m, dt] <= args.tol_deg]
+        print(
+            f"  {m:>6s}: largest dt with attitude error <= "
+            f"{args.tol_deg:g} deg: {max(ok) if ok else None}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--controllers", nargs="+", default=["pid"])
+    parser.add_argument(
+        "--dts", nargs="+", type=float, default=[0.001, 0.002, 0.004, 0.005, 0.008]
+    )
+    parser.add_argument("--dt-ref", type=float, default=0.0001)
+    parser.add_argument("--omega", type=float, default=3.0, help="circle rate, rad/s")
+    parser.add_argument("--radius", type=float, default=1.0)
+    parser.add_argument("--horizon", type=float, default=3.0)
+    parser.add_argument("--tumble-rate", type=float, default=30.0, help="rad/s")
+    parser.add_argument("--tumble-time", type=float, default=1.0)
+    parser.add_argument(
+        "--tumble-dts", nargs="+", type=float, default=[0.001, 0.002, 0.005, 0.01, 0.02]
+    )
+    parser.add_argument("--tol-deg", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as outdir:
+        for ctrl in args.controllers:
+            t_ref, X_ref, _ = simulate(ctrl, "rk4", args.dt_ref, args, outdir)
+            rate = np.abs(X_ref[:, 10:13]).max()
+            report(
+                f"circle r={args.radius:g} m, omega={args.omega:g} rad/s / {ctrl} "
+                f"(max body rate {rate:.1f} rad/s)",
+                lambda m, dt, ctrl=ctrl: simulate(ctrl, m, dt, args, outdir),
+                (t_ref, X_ref),
+                sorted(args.dts),
+                args,
+            )
+
+    ref = tumble("rk4", args.dt_ref, args)[:2]
+    report(
+        f"torque-free tumble at {args.tumble_rate:g} rad/s",
+        lambda m, dt: tumble(m, dt, args),
+        ref,
+        sorted(args.tumble_dts),
+        args,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Accuracy of the splitting integrators against the coupled RK4 step.
+
+Every case is simulated with ``integrator="rk4"`` (motor dynamics integrated
+together with the rigid body), ``"strang"`` and ``"lie"`` (exact exponential
+motor update + RK4 rigid body) over a range of dt, and compared with a
+coupled RK4 reference at ``--dt-ref``. Stage (continuous-time) control, no
+disturbances, and the position integrators are off: rk4 bumps them once per
+controller call while strang/lie integrate them as ODE state (see
+SimConfig.integrator), which would make the methods simulate different
+systems rather than the same ODE.
+
+Reported: max position deviation from the reference over the run (on the
+coarse log grid), wall time, and for each method the largest dt whose error
+stays within that of coupled RK4 at ``--dt-base``.
+
+    python scripts/compare_splitting.py
+    python scripts/compare_splitting.py --scenarios hover --dts 0.005 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from quadlqr.config import (
+    DisturbanceConfig,
+    ExperimentConfig,
+    LQRConfig,
+    PIDConfig,
+    SimConfig,
+)
+from quadlqr.sim import scenarios
+from quadlqr.sim.logger import load_log
+from quadlqr.sim.runner import run_case
+
+METHODS = ("rk4", "strang", "lie")
+
+
+def simulate(scenario: str, controller: str, method: str, dt: float, args, outdir):
+    cfg = ExperimentConfig(
+        sim=SimConfig(dt=dt, integrator=method),
+        lqr=LQRConfig(use_pos_integral=False),
+        pid=PIDConfig(ki_pos=np.zeros(3)),
+        disturb=DisturbanceConfig(level=0),
+    )
+    t0 = time.perf_counter()
+    path = run_case(
+        cfg,
+        f"{scenario}_{method}",
+        getattr(scenarios, scenario),
+        controller,
+        args.horizon,
+        outdir,
+    )
+    wall = time.perf_counter() - t0
+    log = load_log(path)
+    return np.asarray(log["t"]), np.asarray(log["X"]), wall
+
+
+def deviation(t, X, t_ref, X_ref) -> float:
+    """Max position deviation from the reference at the coarse log times."""
+    idx = np.clip(np.searchsorted(t_ref, t - 1e-9), 0, len(t_ref) - 1)
+    return float(np.max(np.linalg.norm(X[:, 0:3] - X_ref[idx, 0:3], axis=1)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--scenarios", nargs="+", default=["hover", "line"])
+    parser.add_argument("--controllers", nargs="+", default=["lqr", "pid"])
+    parser.add_argument(
+        "--dts", nargs="+", type=float, default=[0.001, 0.002, 0.005, 0.01, 0.02]
+    )
+    parser.add_argument("--dt-ref", type=float, default=0.0001)
+    parser.add_argument("--dt-base", type=float, default=0.002)
+    parser.add_argument("--horizon", type=float, default=3.0)
+    args = parser.parse_args()
+    dts = sorted(set(args.dts) | {args.dt_base})
+
+    with tempfile.TemporaryDirectory() as outdir:
+        for sc in args.scenarios:
+            for ctrl in args.controllers:
+                t_ref, X_ref, _ = simulate(sc, ctrl, "rk4", args.dt_ref, args, outdir)
+                print(f"\n{sc} / {ctrl} (reference: rk4, dt={args.dt_ref:g})")
+                print(f"{'dt':>8s}" + "".join(f"{m:>22s}" for m in METHODS))
+                err = {}
+                for dt in dts:
+                    cells = []
+                    for m in METHODS:
+                        t, X, wall = simulate(sc, ctrl, m, dt, args, outdir)
+                        err[m, dt] = deviation(t, X, t_ref, X_ref)
+                        if not np.isfinite(err[m, dt]):
+                            err[m, dt] = np.inf
+                        cells.append(f"{err[m, dt]:11.2e} m {wall:6.2f} s")
+                    print(f"{dt:8.4f}" + "".join(f"{c:>22s}" for c in cells))
+                base = err["rk4", args.dt_base]
+                for m in METHODS:
+                    ok = [dt for dt in dts if err[m, dt] <= base]
+                    best = max(ok) if ok else None
+                    ratio = f"{best / args.dt_base:.0f}x" if best else "-"
+                    print(
+                        f"  {m:>6s}: largest dt within rk4@{args.dt_base:g} "
+                        f"error ({base:.2e} m): {best} ({ratio})"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,116 @@
 from __future__ import annotations
 
-import json
+import argparse
 import os
 from datetime import datetime
 
-import numpy as np
-
-from quadlqr.config import ExperimentConfig
-from quadlqr.metrics import compute_metrics
-from quadlqr.plotting import (
-    plot_hover_errors,
-    plot_inputs,
-    plot_motor_speeds,
-    plot_traj_xy,
-)
-from quadlqr.sim.runner import run_case
+from quadlqr.config import ExperimentConfig, SimConfig
+from quadlqr.sim.cache import RunCache
 from quadlqr.sim.scenarios import circle, hover, line
-from quadlqr.plotting import plot_traj_xy_compare
-
-def main() -> None:
-    cfg = ExperimentConfig()
-
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    outdir = os.path.join("outputs", ts)
-    figdir = os.path.join(outdir, "figs")
-    os.makedirs(outdir, exist_ok=True)
-    os.makedirs(figdir, exist_ok=True)
-
-    rows = []
+from quadlqr.sim.suite import Case, Compare, run_suite
 
+CASES = [
     # Exp-1 Hover (LQR)
-    p1 = run_case(cfg, "Exp1_Hover", hover, "lqr", cfg.sim.t_hover, outdir)
-    npz = np.load(p1)
-    rows.append({"exp": "Exp1_Hover", "controller": "LQR", **compute_metrics(npz)})
-    plot_hover_errors(npz, figdir, "Exp1_Hover__LQR")
-    plot_inputs(npz, figdir, "Exp1_Hover__LQR")
-    plot_motor_speeds(npz, figdir, "Exp1_Hover__LQR")
-
+    Case(
+        "Exp1_Hover",
+        hover,
+        "lqr",
+        plots=("hover_errors", "inputs", "motor_speeds"),
+    ),
     # Exp-2 Line (LQR)
-    p2 = run_case(cfg, "Exp2_Line", line, "lqr", cfg.sim.t_line, outdir)
-    npz = np.load(p2)
-    rows.append({"exp": "Exp2_Line", "controller": "LQR", **compute_metrics(npz)})
-    plot_traj_xy(npz, figdir, "Exp2_Line__LQR", "Line Tracking (XY)")
-    plot_inputs(npz, figdir, "Exp2_Line__LQR")
-    plot_motor_speeds(npz, figdir, "Exp2_Line__LQR")
-
+    Case(
+        "Exp2_Line",
+        line,
+        "lqr",
+        plots=("traj_xy", "inputs", "motor_speeds"),
+        title="Line Tracking (XY)",
+    ),
     # Exp-3 Circle (LQR)
-    p3 = run_case(cfg, "Exp3_Circle", circle, "lqr", cfg.sim.t_circle, outdir)
-    npz_lqr = np.load(p3)
-    rows.append({"exp": "Exp3_Circle", "controller": "LQR", **compute_metrics(npz_lqr)})
-    plot_traj_xy(npz_lqr, figdir, "Exp3_Circle__LQR", "Circle Tracking (XY)")
-    plot_inputs(npz_lqr, figdir, "Exp3_Circle__LQR")
-    plot_motor_speeds(npz_lqr, figdir, "Exp3_Circle__LQR")
-
+    Case(
+        "Exp3_Circle",
+        circle,
+        "lqr",
+        plots=("traj_xy", "inputs", "motor_speeds"),
+        title="Circle Tracking (XY)",
+    ),
     # Exp-4 Circle Compare (PID baseline)
-    p4 = run_case(cfg, "Exp4_CircleCompare", circle, "pid", cfg.sim.t_circle, outdir)
-    npz_pid = np.load(p4)
-    rows.append(
-        {"exp": "Exp4_CircleCompare", "controller": "PID", **compute_metrics(npz_pid)}
-    )
-    plot_traj_xy(npz_pid, figdir, "Exp4_Circle__PID", "Circle Tracking (XY) - PID")
-    plot_inputs(npz_pid, figdir, "Exp4_Circle__PID")
-    plot_motor_speeds(npz_pid, figdir, "Exp4_Circle__PID")
+    Case(
+        "Exp4_CircleCompare",
+        circle,
+        "pid",
+        plots=("traj_xy", "inputs", "motor_speeds"),
+        tag="Exp4_Circle__PID",
+        title="Circle Tracking (XY) - PID",
+    ),
+]
 
+COMPARES = [
     # LQR vs PID comparison
-    plot_traj_xy_compare(
-        npz_lqr=npz_lqr,
-        npz_pid=npz_pid,
-        outdir=figdir,
+    Compare(
+        lqr="Exp3_Circle__lqr",
+        pid="Exp4_CircleCompare__pid",
         tag="Circle_LQR_vs_PID",
         title="Circle Tracking (XY): LQR vs PID",
+    ),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the QuadLQR experiment suite.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        help="worker processes (0: one per case, 1: run in-process)",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=("chunked", "npz"),
+        default="chunked",
+        help="run logs: per-channel .npy (memory-mapped on reload) or compressed .npz",
+    )
+    parser.add_argument(
+        "--track-memory",
+        type=int,
+        default=0,
+        metavar="STEPS",
+        help="sample tracemalloc/RSS every STEPS steps; writes memory.json",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="DIR",
+        help="reuse logs of unchanged cases from this run cache",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=None,
+        help="evict least recently used cache entries beyond this size",
     )
+    args = parser.parse_args()
 
-    # Save metrics
-    with open(os.path.join(outdir, "metrics.json"), "w", encoding="utf-8") as f:
-        json.dump(rows, f, indent=2)
+    cfg = ExperimentConfig(sim=SimConfig(log_format=args.log_format))
+
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    outdir = os.path.join("outputs", ts)
+
+    cache = None
+    if args.cache:
+        max_bytes = (
+            None if args.cache_max_mb is None else int(args.cache_max_mb * 2**20)
+        )
+        cache = RunCache(args.cache, max_bytes=max_bytes)
+
+    jobs = args.jobs or min(len(CASES), os.cpu_count() or 1)
+    run_suite(
+        CASES,
+        outdir,
+        cfg=cfg,
+        compares=COMPARES,
+        jobs=jobs,
+        memory_interval=args.track_memory,
+        cache=cache,
+    )
 
     print(f"[OK] Done. Outputs: {outdir}")
 
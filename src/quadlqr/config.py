@@ -44,6 +44,10 @@ class DisturbanceConfig:
 
     level: int = 0  # 0 none, 1 medium, 2 strong
     seed: int = 7
+    # "online": fresh noise on every plant evaluation (each RK stage)
+    # "table": whole-horizon signals pre-generated on the sim.dt grid and
+    #          interpolated at stage times, shared across runs
+    mode: str = "online"
 
     # Force disturbance amps (N)
     force_amp_1: np.ndarray = np.array([0.03, 0.03, 0.025])
@@ -72,6 +76,10 @@ class LQRConfig:
     Qi_w: float = 10.0
     Ri_tau: float = 1.5
 
+    # "continuous": CARE gains; "discrete": DARE gains for the plant sampled
+    # (exact ZOH) at the control period
+    design: str = "continuous"
+
     yaw_track: bool = False
     yaw_des: float = 0.0
     use_pos_integral: bool = True
@@ -95,6 +103,37 @@ class PIDConfig:
 @dataclass
 class SimConfig:
     dt: float = 0.01
+    # "stage": controller re-evaluated in every RK4 stage (continuous-time law)
+    # "zoh": controller sampled once per control period, omega_cmd held
+    control_mode: str = "stage"
+    control_decimation: int = 1  # zoh control period = control_decimation * dt
+    # "rk4": fixed step dt; "dopri45": adaptive RK5(4), logged on the dt grid.
+    #   dopri45 needs a smooth RHS: online disturbance noise is rejected (use
+    #   disturb.mode="table"). It pays off in zoh mode; in stage mode the
+    #   saturating controller inside the RHS forces tiny steps (1 s LQR
+    #   hover: ~21k RHS calls vs 400 for rk4 at dt=0.01).
+    # "strang" / "lie": operator splitting, exact exponential motor update +
+    #   RK4 rigid body with omega_m frozen (sim/integrator.py)
+    # "rkmk4": RK4 with the quaternion advanced on the manifold (exp map),
+    #   unit norm by construction, no renormalization step
+    # Position integrator in stage mode: dopri45 / strang / lie carry it as ODE
+    #   state (d/dt integ_ep = position error); rk4 / rkmk4 bump it by
+    #   error * dt in every RHS call (4 RK stages + the logged call per step),
+    #   so their integral action differs. Disable it to compare integrators.
+    integrator: str = "rk4"
+    rtol: float = 1e-6
+    atol: float = 1e-8
+    h_min: float = 1e-10  # dopri45: smallest step before StepSizeError
+    max_steps: int = 10_000  # dopri45: step attempts allowed per log interval
+    fast_path: bool = False  # rk4 only: buffer-reusing RHS (sim/fastpath.py)
+    # "online": call the scenario at every RK stage
+    # "table": precomputed ReferenceTable on the log grid (sim/scenarios.py)
+    reference: str = "online"
+    # "npz": whole run in memory, compressed at the end
+    # "chunked": streamed to per-channel .npy files, log_chunk rows at a time
+    # "none": nothing written (pair with run_case(..., metrics=OnlineMetrics))
+    log_format: str = "npz"
+    log_chunk: int = 4096
     t_hover: float = 30.0
     t_line: float = 30.0
     t_circle: float = 40.0
@@ -1,5 +1,6 @@
 from .allocation import Mixer as Mixer
+from .gain_cache import GainCache as GainCache
 from .lqr import HierarchicalLQR as HierarchicalLQR
 from .pid import BaselinePID as BaselinePID
 
-__all__ = ["Mixer", "HierarchicalLQR", "BaselinePID"]
+__all__ = ["Mixer", "HierarchicalLQR", "BaselinePID", "GainCache"]
@@ -39,3 +39,36 @@ class Mixer:
         w = np.sqrt(w2)
         w = np.clip(w, self.omega_min, self.omega_max)
         return w
+
+    def allocate_batch(self, U: Array) -> Array:
+        """Batched allocate: (N, 4) wrenches [T, tau] -> (N, 4) rotor speeds."""
+        U = np.asarray(U, dtype=float).reshape(-1, 4)
+        w2 = U @ self.M_inv.T
+        np.clip(w2, 0.0, None, out=w2)
+        w = np.sqrt(w2, out=w2)
+        return np.clip(w, self.omega_min, self.omega_max, out=w)
+
+    def jacobian(self, thrust: float, tau: Array) -> Array:
+        """d allocate / d [T, tau], (4, 4).
+
+        Rows of rotors held at a limit (omega_min, omega_max or w^2 <= 0) are
+        zero: the clip makes them locally insensitive.
+        """
+        u = np.array(
+            [float(thrust), float(tau[0]), float(tau[1]), float(tau[2])], dtype=float
+        )
+        w2 = self.M_inv @ u
+        w = np.sqrt(np.clip(w2, 0.0, None))
+        free = (w2 > 0.0) & (w > self.omega_min) & (w < self.omega_max)
+        # d sqrt(w2) = d w2 / (2 w)
+        scale = np.where(free, 0.5 / np.where(free, w, 1.0), 0.0)
+        return scale[:, None] * self.M_inv
+
+    def jacobian_batch(self, U: Array) -> Array:
+        """Batched jacobian: (N, 4) wrenches -> (N, 4, 4)."""
+        U = np.asarray(U, dtype=float).reshape(-1, 4)
+        w2 = U @ self.M_inv.T
+        w = np.sqrt(np.clip(w2, 0.0, None))
+        free = (w2 > 0.0) & (w > self.omega_min) & (w < self.omega_max)
+        scale = np.where(free, 0.5 / np.where(free, w, 1.0), 0.0)
+        return scale[:, :, None] * self.M_inv
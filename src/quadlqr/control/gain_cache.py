@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from collections.abc import Callable
+
+import numpy as np
+
+Array = np.ndarray
+
+# files this cache writes: <sha256 hex>.npy, plus <...>.npy.<pid>.tmp leftovers
+_ENTRY_RE = re.compile(r"[0-9a-f]{64}\.npy(\.\d+\.tmp)?")
+
+
+def array_key(kind: str, *arrays: Array) -> str:
+    """Content hash of a gain problem: kind tag + shape/values of each array."""
+    h = hashlib.sha256(kind.encode())
+    for a in arrays:
+        a = np.ascontiguousarray(a, dtype=float)
+        h.update(repr(a.shape).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
+class GainCache:
+    """Two-level memo for gain matrices: in-process LRU + optional .npy store.
+
+    Entries are keyed by ``array_key`` so identical (A, B, Q, R) problems
+    share one solve across controllers, runs and (with ``directory`` set)
+    processes. Returned arrays are copies; cached values are never aliased.
+    """
+
+    def __init__(self, maxsize: int = 256, directory: str | None = None):
+        self.maxsize = int(maxsize)
+        self.directory = directory
+        self._mem: OrderedDict[str, Array] = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._mem),
+        }
+
+    def clear(self, disk: bool = False) -> None:
+        """Drop the in-memory entries; with ``disk`` also the cache's own files.
+
+        Only files named like cache entries are removed; anything else in
+        ``directory`` is left alone.
+        """
+        self._mem.clear()
+        self.hits = self.disk_hits = self.misses = 0
+        if disk and self.directory and os.path.isdir(self.directory):
+            for fn in os.listdir(self.directory):
+                if _ENTRY_RE.fullmatch(fn):
+                    os.remove(os.path.join(self.directory, fn))
+
+    def get_or_compute(self, key: str, compute: Callable[[], Array]) -> Array:
+        K = self._mem.get(key)
+        if K is not None:
+            self._mem.move_to_end(key)
+            self.hits += 1
+            return K.copy()
+
+        K = self._load(key)
+        if K is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            K = np.asarray(compute(), dtype=float)
+            self._store(key, K)
+
+        self._mem[key] = K.copy()
+        if len(self._mem) > self.maxsize:
+            self._mem.popitem(last=False)
+        return K
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def _load(self, key: str) -> Array | None:
+        if not self.directory:
+            return None
+        try:
+            return np.load(self._path(key))
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key: str, K: Array) -> None:
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # write-then-rename so concurrent workers never read a partial file
+        tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, K)
+        os.replace(tmp, self._path(key))
+
+
+# Process-wide cache used by lqr_gain; set QUADLQR_GAIN_CACHE to a directory
+# (or call set_gain_cache_dir) to persist solutions across processes.
+default_gain_cache = GainCache(directory=os.environ.get("QUADLQR_GAIN_CACHE") or None)
+
+
+def set_gain_cache_dir(directory: str | None) -> None:
+    default_gain_cache.directory = directory
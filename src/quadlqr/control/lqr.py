@@ -1,26 +1,197 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import numpy as np
-from scipy.linalg import solve_continuous_are
 
 from ..config import Limits, LQRConfig, QuadParams
 from ..math.quaternion import q_normalize, q_to_R
-from ..math.so3 import vee
+from ..math.so3 import hat, vee
 from ..types import State, Wrench
-from .reference import accel_to_q_and_thrust
+from .gain_cache import array_key, default_gain_cache
+from .reference import accel_to_q_and_thrust, accel_to_R_and_thrust_batch
+from .riccati import care, dare
 
 
-def lqr_gain(A: np.ndarray, B: np.ndarray, Q: np.ndarray, R: np.ndarray) -> np.ndarray:
-    P = solve_continuous_are(A, B, Q, R)
-    K = np.linalg.solve(R, B.T @ P)
-    return K
+def lqr_gain(
+    A: np.ndarray, B: np.ndarray, Q: np.ndarray, R: np.ndarray, cache: bool = True
+) -> np.ndarray:
+    """Continuous-time LQR gain K = R^{-1} B^T P, memoized on (A, B, Q, R)."""
+
+    def solve() -> np.ndarray:
+        P = care(A, B, Q, R)
+        return np.linalg.solve(R, B.T @ P)
+
+    if not cache:
+        return solve()
+    return default_gain_cache.get_or_compute(array_key("care", A, B, Q, R), solve)
+
+
+def expm(M: np.ndarray) -> np.ndarray:
+    """Matrix exponential: [6/6] Pade approximant with scaling and squaring."""
+    M = np.asarray(M, dtype=float)
+    norm = np.linalg.norm(M, 1)
+    s = max(0, int(np.ceil(np.log2(norm / 0.5)))) if norm > 0.5 else 0
+    X = M / (2.0**s)
+    c = (1.0, 1 / 2, 5 / 44, 1 / 66, 1 / 792, 1 / 15840, 1 / 665280)
+    eye = np.eye(M.shape[0])
+    N = c[0] * eye
+    D = c[0] * eye
+    Xk = eye
+    for k in range(1, 7):
+        Xk = Xk @ X
+        N = N + c[k] * Xk
+        D = D + (-1) ** k * c[k] * Xk
+    E = np.linalg.solve(D, N)
+    for _ in range(s):
+        E = E @ E
+    return E
+
+
+def c2d_zoh(A: np.ndarray, B: np.ndarray, dt: float) -> tuple[np.ndarray, np.ndarray]:
+    """Exact zero-order-hold discretization (Ad, Bd) of x_dot = A x + B u."""
+    n, m = B.shape
+    M = np.zeros((n + m, n + m), dtype=float)
+    M[:n, :n] = A
+    M[:n, n:] = B
+    E = expm(M * dt)
+    return E[:n, :n], E[:n, n:]
+
+
+def dlqr_gain(
+    A: np.ndarray,
+    B: np.ndarray,
+    Q: np.ndarray,
+    R: np.ndarray,
+    dt: float,
+    cache: bool = True,
+) -> np.ndarray:
+    """Discrete-time LQR gain for x_dot = A x + B u sampled with ZOH at dt.
+
+    K = (R + Bd^T P Bd)^{-1} Bd^T P Ad with P from the DARE; memoized on
+    (Ad, Bd, Q, R), i.e. per plant, weights and dt.
+    """
+    Ad, Bd = c2d_zoh(A, B, dt)
+
+    def solve() -> np.ndarray:
+        P = dare(Ad, Bd, Q, R)
+        return np.linalg.solve(R + Bd.T @ P @ Bd, Bd.T @ P @ Ad)
+
+    if not cache:
+        return solve()
+    return default_gain_cache.get_or_compute(array_key("dare", Ad, Bd, Q, R), solve)
 
 
 def so3_error(R: np.ndarray, Rd: np.ndarray) -> np.ndarray:
-    """SO(3) attitude error vector (Lee et al.-style): e_R = 0.5 * vee(Rd^T R - R^T Rd)"""
-    return 0.5 * vee(Rd.T @ R - R.T @ Rd)
+    """SO(3) attitude error vector (Lee et al.-style): e_R = 0.5 * vee(Rd^T R - R^T Rd)
+
+    Accepts single (3, 3) rotations or (..., 3, 3) stacks.
+    """
+    M = np.swapaxes(Rd, -1, -2) @ R  # R^T Rd is its transpose
+    return 0.5 * vee(M - np.swapaxes(M, -1, -2))
+
+
+def _ref_batch(ref: dict, n: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Broadcast p_d / v_d / a_ff of a ref dict to (n, 3) arrays."""
+    zeros = np.zeros(3)
+    p_d = np.broadcast_to(np.asarray(ref["p_d"], dtype=float), (n, 3))
+    v_d = np.broadcast_to(np.asarray(ref.get("v_d", zeros), dtype=float), (n, 3))
+    a_ff = np.broadcast_to(np.asarray(ref.get("a_ff", zeros), dtype=float), (n, 3))
+    return p_d, v_d, a_ff
+
+
+def _dR_dq(q: np.ndarray) -> np.ndarray:
+    """d q_to_R / d q_j at unit quaternions (N, 4) -> (N, 4, 3, 3), j = w, x, y, z."""
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    o = np.zeros_like(w)
+    rows = [
+        [[o, -z, y], [z, o, -x], [-y, x, o]],
+        [[o, y, z], [y, -2 * x, -w], [z, w, -2 * x]],
+        [[-2 * y, x, w], [x, o, z], [-w, z, -2 * y]],
+        [[-2 * z, -w, x], [w, -2 * z, y], [x, y, o]],
+    ]
+    return 2.0 * np.array(rows).transpose(3, 0, 1, 2)
+
+
+def _cascade_jacobian(
+    a_cmd: np.ndarray,
+    yaw_d,
+    q: np.ndarray,
+    omega: np.ndarray,
+    K_pos: np.ndarray,
+    K_vel: np.ndarray,
+    K_R: np.ndarray,
+    K_w: np.ndarray,
+    quad: QuadParams,
+    limits: Limits,
+) -> np.ndarray:
+    """d[T, tau]/dx, (N, 4, 17), of the cascade shared by LQR and PID.
+
+    ``a_cmd = a_ff - K_pos ep - K_vel ev - ki integ_ep`` -> (Rd, T) as in
+    accel_to_R_and_thrust_batch -> ``tau = -K_R e_R - K_w omega``, then the
+    saturations. ``a_cmd`` (N, 3) is the commanded acceleration at the
+    point; the integrator is held. Saturated outputs get zero rows and the
+    rotor speeds (columns 13:17) do not enter.
+    """
+    n = a_cmd.shape[0]
+    eye3 = np.eye(3)
+    d_a = np.concatenate([-K_pos, -K_vel], axis=1)  # d a_cmd / d [p, v]
+
+    # b3 = a_total / |a_total|, T = m |a_total|
+    a_total = a_cmd.copy()
+    a_total[:, 2] += quad.g
+    norm = np.sqrt(np.sum(a_total * a_total, axis=1))
+    safe = np.maximum(norm, 1e-6)
+    b3 = a_total / safe[:, None]
+    d_b3 = (eye3 - b3[:, :, None] * b3[:, None, :]) / safe[:, None, None]
+    d_b3[norm < 1e-6] = eye3 / 1e-6
+
+    # b2 = unit(b3 x c), b1 = b2 x b3, with c the heading or its fallbacks
+    yaw = np.broadcast_to(np.asarray(yaw_d, dtype=float), (n,))
+    c = np.zeros((n, 3), dtype=float)
+    c[:, 0] = np.cos(yaw)
+    c[:, 1] = np.sin(yaw)
+    b2 = np.cross(b3, c)
+    n2 = np.sqrt(np.sum(b2 * b2, axis=1))
+    for axis in ([0.0, 1.0, 0.0], [1.0, 0.0, 0.0]):
+        bad = n2 < 1e-6
+        if not np.any(bad):
+            break
+        c[bad] = axis
+        b2[bad] = np.cross(b3[bad], c[bad])
+        n2[bad] = np.sqrt(np.sum(b2[bad] * b2[bad], axis=1))
+    b2 /= n2[:, None]
+    b1 = np.cross(b2, b3)
+    Rd = np.stack([b1, b2, b3], axis=2)
+    d_b2 = (eye3 - b2[:, :, None] * b2[:, None, :]) / n2[:, None, None]
+    d_b2 = d_b2 @ -hat(c) @ d_b3
+    d_b1 = hat(b2) @ d_b3 - hat(b3) @ d_b2
+    # d Rd / d a_i as (N, 3, 3, 3) with the a_i axis second
+    d_Rd = np.stack([d_b1, d_b2, d_b3], axis=3).transpose(0, 2, 1, 3)
+
+    # e_R is linear in R and in Rd separately
+    s = np.sqrt(np.sum(q * q, axis=1))
+    qn = q_normalize(q)
+    R = q_to_R(qn)
+    e_R = so3_error(R, Rd)
+    de_da = np.swapaxes(so3_error(R[:, None], d_Rd), 1, 2)
+    de_dqn = np.swapaxes(so3_error(_dR_dq(qn), Rd[:, None]), 1, 2)
+    # d qn / d q
+    P = np.eye(4) - qn[:, :, None] * qn[:, None, :]
+    P *= np.where(s >= 1e-12, 1.0 / np.maximum(s, 1e-300), 0.0)[:, None, None]
+
+    K = np.zeros((n, 4, 17), dtype=float)
+    K[:, 0, 0:6] = (quad.m * b3) @ d_a
+    K[:, 1:4, 0:6] = -K_R @ de_da @ d_a
+    K[:, 1:4, 6:10] = -K_R @ de_dqn @ P
+    K[:, 1:4, 10:13] = -K_w
+
+    # saturated outputs are locally constant
+    thrust = quad.m * norm
+    tau = -(e_R @ K_R.T + omega @ K_w.T)
+    K[(thrust <= limits.thrust_min) | (thrust >= limits.thrust_max), 0] = 0.0
+    K[:, 1:4][np.abs(tau) >= limits.tau_max] = 0.0
+    return K
 
 
 @dataclass
@@ -31,9 +202,30 @@ class HierarchicalLQR:
     K_outer: np.ndarray
     K_inner: np.ndarray
     integ_ep: np.ndarray
+    integ_ep_batch: np.ndarray | None = field(default=None)
+    dt: float | None = None  # design sample time (discrete design only)
 
     @staticmethod
-    def build(quad: QuadParams, cfg: LQRConfig, limits: Limits) -> "HierarchicalLQR":
+    def build(
+        quad: QuadParams, cfg: LQRConfig, limits: Limits, dt: float | None = None
+    ) -> "HierarchicalLQR":
+        """Design both loops; ``cfg.design == "discrete"`` needs the control dt."""
+        design = cfg.design.lower()
+        if design == "continuous":
+
+            def gain(A, B, Q, R):
+                return lqr_gain(A, B, Q, R)
+
+        elif design == "discrete":
+            if dt is None or dt <= 0.0:
+                raise ValueError("Discrete LQR design needs a positive dt")
+
+            def gain(A, B, Q, R):
+                return dlqr_gain(A, B, Q, R, dt)
+
+        else:
+            raise ValueError(f"Unknown LQR design: {cfg.design}")
+
         # Outer: double integrator, u = a_cmd
         Ao = np.block(
             [
@@ -49,7 +241,7 @@ class HierarchicalLQR:
         )
         Qo = np.diag([cfg.Qo_pos] * 3 + [cfg.Qo_vel] * 3)
         Ro = np.diag([cfg.Ro_acc] * 3)
-        Ko = lqr_gain(Ao, Bo, Qo, Ro)
+        Ko = gain(Ao, Bo, Qo, Ro)
 
         # Inner: small-angle SO(3) error model
         # x = [e_R(3), e_w(3)], e_R_dot ≈ e_w, e_w_dot = J^{-1} tau
@@ -68,7 +260,7 @@ class HierarchicalLQR:
         )
         Qi = np.diag([cfg.Qi_R] * 3 + [cfg.Qi_w] * 3)
         Ri = np.diag([cfg.Ri_tau] * 3)
-        Ki = lqr_gain(Ai, Bi, Qi, Ri)
+        Ki = gain(Ai, Bi, Qi, Ri)
 
         return HierarchicalLQR(
             quad=quad,
@@ -77,10 +269,12 @@ class HierarchicalLQR:
             K_outer=Ko,
             K_inner=Ki,
             integ_ep=np.zeros(3, dtype=float),
+            dt=dt if design == "discrete" else None,
         )
 
     def reset(self) -> None:
         self.integ_ep[:] = 0.0
+        self.integ_ep_batch = None
 
     def compute(self, st: State, ref: dict, dt: float | None = None) -> Wrench:
         p, v, q, w = st.p, st.v, q_normalize(st.q), st.omega
@@ -98,14 +292,16 @@ class HierarchicalLQR:
         xo = np.concatenate([ep, ev], axis=0)
         a_cmd = a_ff - self.K_outer @ xo
 
-        if self.cfg.use_pos_integral and dt is not None and dt > 0.0:
-            self.integ_ep += ep * dt
-            np.clip(
-                self.integ_ep,
-                -self.cfg.integ_limit,
-                self.cfg.integ_limit,
-                out=self.integ_ep,
-            )
+        if self.cfg.use_pos_integral:
+            # dt None / 0: apply the integrator without advancing it
+            if dt is not None and dt > 0.0:
+                self.integ_ep += ep * dt
+                np.clip(
+                    self.integ_ep,
+                    -self.cfg.integ_limit,
+                    self.cfg.integ_limit,
+                    out=self.integ_ep,
+                )
             a_cmd -= self.cfg.ki_pos * self.integ_ep
 
         # Map to desired attitude + thrust
@@ -125,3 +321,109 @@ class HierarchicalLQR:
         tau = np.clip(tau, -self.limits.tau_max, self.limits.tau_max)
 
         return Wrench(thrust=thrust, tau=tau)
+
+    def jacobian(self, st: State, ref: dict) -> np.ndarray:
+        """d wrench / d x, (4, 17), of compute at (st, ref).
+
+        The position integrator is held at ``integ_ep``, i.e. the local gain
+        of ``compute(st, ref, dt=None)``. Saturated outputs have zero rows.
+        """
+        return self._jacobian(st.as_vector()[None], ref, self.integ_ep[None])[0]
+
+    def jacobian_batch(self, X: np.ndarray, ref: dict) -> np.ndarray:
+        """Batched jacobian for (N, 17) states -> (N, 4, 17).
+
+        ``ref`` is as for compute_batch; the integrators are held at
+        ``integ_ep_batch`` (zero when unset).
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, 17)
+        integ = self.integ_ep_batch
+        if integ is not None and integ.shape != (X.shape[0], 3):
+            integ = None
+        return self._jacobian(X, ref, integ)
+
+    def _jacobian(
+        self, X: np.ndarray, ref: dict, integ: np.ndarray | None
+    ) -> np.ndarray:
+        p_d, v_d, a_ff = _ref_batch(ref, X.shape[0])
+        yaw_d = ref.get("yaw_d", self.cfg.yaw_des)
+        if not self.cfg.yaw_track:
+            yaw_d = float(self.cfg.yaw_des)
+
+        Ko, Ki = self.K_outer, self.K_inner
+        ep = X[:, 0:3] - p_d
+        ev = X[:, 3:6] - v_d
+        a_cmd = a_ff - ep @ Ko[:, 0:3].T - ev @ Ko[:, 3:6].T
+        if self.cfg.use_pos_integral and integ is not None:
+            a_cmd -= self.cfg.ki_pos * integ
+
+        return _cascade_jacobian(
+            a_cmd,
+            yaw_d,
+            X[:, 6:10],
+            X[:, 10:13],
+            Ko[:, 0:3],
+            Ko[:, 3:6],
+            Ki[:, 0:3],
+            Ki[:, 3:6],
+            self.quad,
+            self.limits,
+        )
+
+    def compute_batch(
+        self,
+        p: np.ndarray,
+        v: np.ndarray,
+        q: np.ndarray,
+        omega: np.ndarray,
+        ref: dict,
+        dt: float | None = None,
+    ) -> np.ndarray:
+        """Batched compute for N vehicles given as (N, k) state arrays.
+
+        ``ref`` holds the same keys as for ``compute``; each entry is either
+        shared by all vehicles or given per vehicle. The position integrator
+        of each vehicle lives in ``integ_ep_batch`` (N, 3). Returns (N, 4)
+        wrenches [T, tau_x, tau_y, tau_z].
+        """
+        p = np.asarray(p, dtype=float).reshape(-1, 3)
+        n = p.shape[0]
+        v = np.asarray(v, dtype=float).reshape(n, 3)
+        omega = np.asarray(omega, dtype=float).reshape(n, 3)
+        p_d, v_d, a_ff = _ref_batch(ref, n)
+
+        yaw_d = ref.get("yaw_d", self.cfg.yaw_des)
+        if not self.cfg.yaw_track:
+            yaw_d = float(self.cfg.yaw_des)
+
+        # Outer LQR
+        ep = p - p_d
+        ev = v - v_d
+        Ko = self.K_outer
+        a_cmd = a_ff - ep @ Ko[:, 0:3].T - ev @ Ko[:, 3:6].T
+
+        if self.cfg.use_pos_integral:
+            if self.integ_ep_batch is None or self.integ_ep_batch.shape != (n, 3):
+                self.integ_ep_batch = np.zeros((n, 3), dtype=float)
+            if dt is not None and dt > 0.0:
+                self.integ_ep_batch += ep * dt
+                np.clip(
+                    self.integ_ep_batch,
+                    -self.cfg.integ_limit,
+                    self.cfg.integ_limit,
+                    out=self.integ_ep_batch,
+                )
+            a_cmd -= self.cfg.ki_pos * self.integ_ep_batch
+
+        # Map to desired attitude + thrust
+        Rd, thrust = accel_to_R_and_thrust_batch(a_cmd, yaw_d, self.quad.m, self.quad.g)
+
+        # Inner LQR on SO(3) error
+        e_R = so3_error(q_to_R(q), Rd)
+        Ki = self.K_inner
+
+        U = np.empty((n, 4), dtype=float)
+        U[:, 0] = np.clip(thrust, self.limits.thrust_min, self.limits.thrust_max)
+        U[:, 1:4] = -(e_R @ Ki[:, 0:3].T + omega @ Ki[:, 3:6].T)
+        np.clip(U[:, 1:4], -self.limits.tau_max, self.limits.tau_max, out=U[:, 1:4])
+        return U
@@ -1,14 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import numpy as np
 
 from ..config import Limits, PIDConfig, QuadParams
 from ..math.quaternion import q_normalize, q_to_R
 from ..types import State, Wrench
-from .lqr import so3_error
-from .reference import accel_to_q_and_thrust
+from .lqr import _cascade_jacobian, _ref_batch, so3_error
+from .reference import accel_to_q_and_thrust, accel_to_R_and_thrust_batch
 
 
 @dataclass
@@ -17,6 +17,7 @@ class BaselinePID:
     cfg: PIDConfig
     limits: Limits
     integ_ep: np.ndarray
+    integ_ep_batch: np.ndarray | None = field(default=None)
 
     @staticmethod
     def build(quad: QuadParams, cfg: PIDConfig, limits: Limits) -> "BaselinePID":
@@ -26,6 +27,7 @@ class BaselinePID:
 
     def reset(self) -> None:
         self.integ_ep[:] = 0.0
+        self.integ_ep_batch = None
 
     def compute(self, st: State, ref: dict, dt: float) -> Wrench:
         p, v, q, w = st.p, st.v, q_normalize(st.q), st.omega
@@ -62,3 +64,92 @@ class BaselinePID:
         tau = np.clip(tau, -self.limits.tau_max, self.limits.tau_max)
 
         return Wrench(thrust=thrust, tau=tau)
+
+    def jacobian(self, st: State, ref: dict) -> np.ndarray:
+        """d wrench / d x, (4, 17), of compute at (st, ref) with dt = 0.
+
+        The position integrator is held at ``integ_ep``; saturated outputs
+        have zero rows. See HierarchicalLQR.jacobian.
+        """
+        return self._jacobian(st.as_vector()[None], ref, self.integ_ep[None])[0]
+
+    def jacobian_batch(self, X: np.ndarray, ref: dict) -> np.ndarray:
+        """Batched jacobian for (N, 17) states -> (N, 4, 17)."""
+        X = np.asarray(X, dtype=float).reshape(-1, 17)
+        integ = self.integ_ep_batch
+        if integ is None or integ.shape != (X.shape[0], 3):
+            integ = np.zeros((X.shape[0], 3), dtype=float)
+        return self._jacobian(X, ref, integ)
+
+    def _jacobian(self, X: np.ndarray, ref: dict, integ: np.ndarray) -> np.ndarray:
+        p_d, v_d, a_ff = _ref_batch(ref, X.shape[0])
+        yaw_d = ref.get("yaw_d", 0.0)
+
+        ep = X[:, 0:3] - p_d
+        ev = X[:, 3:6] - v_d
+        a_cmd = (
+            a_ff - self.cfg.kp_pos * ep - self.cfg.kd_pos * ev - self.cfg.ki_pos * integ
+        )
+
+        def diag(k) -> np.ndarray:
+            return np.diag(np.broadcast_to(np.asarray(k, dtype=float), (3,)))
+
+        return _cascade_jacobian(
+            a_cmd,
+            yaw_d,
+            X[:, 6:10],
+            X[:, 10:13],
+            diag(self.cfg.kp_pos),
+            diag(self.cfg.kd_pos),
+            diag(self.cfg.kp_R),
+            diag(self.cfg.kd_w),
+            self.quad,
+            self.limits,
+        )
+
+    def compute_batch(
+        self,
+        p: np.ndarray,
+        v: np.ndarray,
+        q: np.ndarray,
+        omega: np.ndarray,
+        ref: dict,
+        dt: float,
+    ) -> np.ndarray:
+        """Batched compute for N vehicles; see HierarchicalLQR.compute_batch."""
+        p = np.asarray(p, dtype=float).reshape(-1, 3)
+        n = p.shape[0]
+        v = np.asarray(v, dtype=float).reshape(n, 3)
+        omega = np.asarray(omega, dtype=float).reshape(n, 3)
+        p_d, v_d, a_ff = _ref_batch(ref, n)
+        yaw_d = ref.get("yaw_d", 0.0)
+
+        ep = p - p_d
+        ev = v - v_d
+
+        if self.integ_ep_batch is None or self.integ_ep_batch.shape != (n, 3):
+            self.integ_ep_batch = np.zeros((n, 3), dtype=float)
+        self.integ_ep_batch += ep * dt
+        np.clip(
+            self.integ_ep_batch,
+            -self.cfg.integ_limit,
+            self.cfg.integ_limit,
+            out=self.integ_ep_batch,
+        )
+
+        a_cmd = (
+            a_ff
+            - self.cfg.kp_pos * ep
+            - self.cfg.kd_pos * ev
+            - self.cfg.ki_pos * self.integ_ep_batch
+        )
+
+        Rd, thrust = accel_to_R_and_thrust_batch(a_cmd, yaw_d, self.quad.m, self.quad.g)
+
+        e_R = so3_error(q_to_R(q), Rd)
+
+        U = np.empty((n, 4), dtype=float)
+        U[:, 0] = np.clip(thrust, self.limits.thrust_min, self.limits.thrust_max)
+        U[:, 1:4] = -self.cfg.kp_R * e_R - self.cfg.kd_w * omega
+        np.clip(U[:, 1:4], -self.limits.tau_max, self.limits.tau_max, out=U[:, 1:4])
+        return U
@@ -48,3 +48,41 @@ def accel_to_q_and_thrust(
     a_total = np.asarray(a_cmd, dtype=float).reshape(3) + g * e3
     thrust = m * float(np.linalg.norm(a_total))
     return q_d, thrust
+
+
+def accel_to_R_and_thrust_batch(
+    a_cmd: Array, yaw_des: Array | float, m: float, g: float
+) -> tuple[Array, Array]:
+    """Batched accel_to_R_des + thrust for (N, 3) accelerations.
+
+    Returns desired rotations (N, 3, 3) and thrust magnitudes (N,). The
+    quaternion round trip of accel_to_q_and_thrust is skipped, since
+    q_to_R(R_to_q(R)) reproduces R.
+    """
+    a_cmd = np.asarray(a_cmd, dtype=float).reshape(-1, 3)
+    n = a_cmd.shape[0]
+    a_total = a_cmd.copy()
+    a_total[:, 2] += g
+    norm = np.sqrt(np.sum(a_total * a_total, axis=1))
+    thrust = m * norm
+    b3 = a_total / np.maximum(norm, 1e-6)[:, None]
+
+    yaw = np.broadcast_to(np.asarray(yaw_des, dtype=float), (n,))
+    b1_des_world = np.zeros((n, 3), dtype=float)
+    b1_des_world[:, 0] = np.cos(yaw)
+    b1_des_world[:, 1] = np.sin(yaw)
+
+    # make b2 = b3 x b1_des_world, then b1 = b2 x b3 (with the same fallbacks)
+    b2 = np.cross(b3, b1_des_world)
+    n2 = np.sqrt(np.sum(b2 * b2, axis=1))
+    for axis in ([0.0, 1.0, 0.0], [1.0, 0.0, 0.0]):
+        bad = n2 < 1e-6
+        if not np.any(bad):
+            break
+        b2[bad] = np.cross(b3[bad], np.array(axis, dtype=float))
+        n2[bad] = np.sqrt(np.sum(b2[bad] * b2[bad], axis=1))
+    b2 /= n2[:, None]
+    b1 = np.cross(b2, b3)
+
+    R = np.stack([b1, b2, b3], axis=2)
+    return R, thrust
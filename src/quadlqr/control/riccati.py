@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import numpy as np
+
+Array = np.ndarray
+
+# Small dense CARE/DARE solvers in plain NumPy, sized for the 6x6 design
+# problems in lqr.py. SciPy stays an optional fallback / cross-check.
+
+
+class RiccatiError(np.linalg.LinAlgError):
+    """Raised when an iterative Riccati solve does not converge."""
+
+
+def care_residual(P: Array, A: Array, B: Array, Q: Array, R: Array) -> float:
+    """Relative residual of A^T P + P A - P B R^{-1} B^T P + Q = 0."""
+    PB = P @ B
+    res = A.T @ P + P @ A - PB @ np.linalg.solve(R, PB.T) + Q
+    return float(np.linalg.norm(res) / max(np.linalg.norm(Q), np.linalg.norm(P), 1.0))
+
+
+def dare_residual(P: Array, A: Array, B: Array, Q: Array, R: Array) -> float:
+    """Relative residual of A^T P A - P - A^T P B (R + B^T P B)^{-1} B^T P A + Q."""
+    BPA = B.T @ P @ A
+    res = A.T @ P @ A - P - BPA.T @ np.linalg.solve(R + B.T @ P @ B, BPA) + Q
+    return float(np.linalg.norm(res) / max(np.linalg.norm(Q), np.linalg.norm(P), 1.0))
+
+
+def solve_care(
+    A: Array, B: Array, Q: Array, R: Array, tol: float = 1e-13, max_iter: int = 100
+) -> Array:
+    """Stabilizing solution of the CARE via the Hamiltonian matrix sign function.
+
+    Newton iteration Z <- (Z / c + c Z^{-1}) / 2 with determinant scaling c,
+    started from the Hamiltonian H = [[A, -G], [-Q, -A^T]], G = B R^{-1} B^T.
+    The state is rescaled first so badly scaled inputs (J^{-1} ~ 1e5) converge.
+    """
+    A, B, Q, R = (np.asarray(M, dtype=float) for M in (A, B, Q, R))
+    n = A.shape[0]
+    G = B @ np.linalg.solve(R, B.T)
+
+    # Diagonal symplectic scaling x = D x~: A~ = D^-1 A D, G~ = D^-1 G D^-1,
+    # Q~ = D Q D, P = D^-1 P~ D^-1; balances G against Q.
+    gd, qd = np.diag(G), np.diag(Q)
+    ok = (gd > 0) & (qd > 0)
+    d = np.ones(n)
+    d[ok] = (gd[ok] / qd[ok]) ** 0.25
+    As = A * d[None, :] / d[:, None]
+    Gs = G / d[:, None] / d[None, :]
+    Qs = Q * d[:, None] * d[None, :]
+
+    Z = np.block([[As, -Gs], [-Qs, -As.T]])
+    for _ in range(max_iter):
+        Zi = np.linalg.inv(Z)
+        _, logdet = np.linalg.slogdet(Z)
+        c = np.exp(logdet / (2 * n))
+        Z_new = 0.5 * (Z / c + c * Zi)
+        if np.linalg.norm(Z_new - Z, 1) <= tol * np.linalg.norm(Z_new, 1):
+            Z = Z_new
+            break
+        Z = Z_new
+    else:
+        raise RiccatiError("CARE sign iteration did not converge")
+
+    W11, W12 = Z[:n, :n], Z[:n, n:]
+    W21, W22 = Z[n:, :n], Z[n:, n:]
+    eye = np.eye(n)
+    lhs = np.vstack([W12, W22 + eye])
+    rhs = -np.vstack([W11 + eye, W21])
+    Ps = np.linalg.lstsq(lhs, rhs, rcond=None)[0]
+    Ps = 0.5 * (Ps + Ps.T)
+    P = Ps / d[:, None] / d[None, :]
+    if not np.all(np.isfinite(P)):
+        raise RiccatiError("CARE solution is not finite")
+    return P
+
+
+def solve_dare(
+    A: Array, B: Array, Q: Array, R: Array, tol: float = 1e-13, max_iter: int = 100
+) -> Array:
+    """Stabilizing solution of the DARE via the structure-preserving doubling
+    algorithm (SDA); converges quadratically for stabilizable/detectable data.
+    """
+    A, B, Q, R = (np.asarray(M, dtype=float) for M in (A, B, Q, R))
+    n = A.shape[0]
+    eye = np.eye(n)
+    Ak = A.copy()
+    Gk = B @ np.linalg.solve(R, B.T)
+    Hk = Q.copy()
+    for _ in range(max_iter):
+        W = eye + Gk @ Hk
+        AW = Ak @ np.linalg.inv(W)  # A_k (I + G_k H_k)^{-1}
+        H_new = Hk + Ak.T @ Hk @ np.linalg.solve(W, Ak)
+        Gk = Gk + AW @ Gk @ Ak.T
+        Ak = AW @ Ak
+        if np.linalg.norm(H_new - Hk, 1) <= tol * np.linalg.norm(H_new, 1):
+            Hk = H_new
+            break
+        Hk = H_new
+    else:
+        raise RiccatiError("DARE doubling iteration did not converge")
+    P = 0.5 * (Hk + Hk.T)
+    if not np.all(np.isfinite(P)):
+        raise RiccatiError("DARE solution is not finite")
+    return P
+
+
+def care(A: Array, B: Array, Q: Array, R: Array, backend: str = "numpy") -> Array:
+    """CARE solution with the NumPy solver, falling back to SciPy if it fails.
+
+    ``backend="scipy"`` forces the SciPy solver. SciPy is only imported when
+    it is actually used.
+    """
+    if backend == "numpy":
+        try:
+            P = solve_care(A, B, Q, R)
+            if care_residual(P, A, B, Q, R) < 1e-8:
+                return P
+        except np.linalg.LinAlgError:
+            pass
+    elif backend != "scipy":
+        raise ValueError(f"Unknown Riccati backend: {backend}")
+    from scipy.linalg import solve_continuous_are
+
+    return solve_continuous_are(A, B, Q, R)
+
+
+def dare(A: Array, B: Array, Q: Array, R: Array, backend: str = "numpy") -> Array:
+    """DARE counterpart of ``care``."""
+    if backend == "numpy":
+        try:
+            P = solve_dare(A, B, Q, R)
+            if dare_residual(P, A, B, Q, R) < 1e-8:
+                return P
+        except np.linalg.LinAlgError:
+            pass
+    elif backend != "scipy":
+        raise ValueError(f"Unknown Riccati backend: {backend}")
+    from scipy.linalg import solve_discrete_are
+
+    return solve_discrete_are(A, B, Q, R)
@@ -1,4 +1,19 @@
+from .disturbance import DisturbanceTable as DisturbanceTable
+from .disturbance import disturbance_table as disturbance_table
+from .linearize import closed_loop_jacobian as closed_loop_jacobian
+from .linearize import closed_loop_jacobian_batch as closed_loop_jacobian_batch
+from .linearize import linearize as linearize
+from .linearize import linearize_batch as linearize_batch
 from .motor import MotorModel as MotorModel
 from .quadrotor import QuadrotorPlant as QuadrotorPlant
 
-__all__ = ["MotorModel", "QuadrotorPlant"]
+__all__ = [
+    "DisturbanceTable",
+    "MotorModel",
+    "QuadrotorPlant",
+    "closed_loop_jacobian",
+    "closed_loop_jacobian_batch",
+    "disturbance_table",
+    "linearize",
+    "linearize_batch",
+]
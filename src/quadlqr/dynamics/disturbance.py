@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..config import DisturbanceConfig
+
+Array = np.ndarray
+
+F_PHASE = np.array([0.0, 0.7, 1.1])
+TAU_PHASE = np.array([0.3, 1.0, 0.2])
+
+
+def disturbance_params(cfg: DisturbanceConfig) -> tuple[Array, float, Array, float]:
+    """(force_amp, force_sigma, tau_amp, tau_sigma) for cfg.level (>= 1)."""
+    if cfg.level == 1:
+        return (
+            cfg.force_amp_1,
+            cfg.force_noise_sigma_1,
+            cfg.tau_amp_1,
+            cfg.tau_noise_sigma_1,
+        )
+    return (
+        cfg.force_amp_2,
+        cfg.force_noise_sigma_2,
+        cfg.tau_amp_2,
+        cfg.tau_noise_sigma_2,
+    )
+
+
+@dataclass(frozen=True)
+class DisturbanceTable:
+    """Force/torque disturbance sampled on a uniform grid t_k = k * dt.
+
+    ``sample`` interpolates linearly between grid points, so RK stage times
+    (and adaptive steps) see a continuous signal that does not depend on
+    how many times, or where, the integrator evaluates it.
+    """
+
+    dt: float
+    wrench: Array  # (n, 6): force (world) | torque (body)
+    slope: Array  # (n - 1, 6): wrench[k + 1] - wrench[k]
+
+    @property
+    def force(self) -> Array:
+        return self.wrench[:, :3]
+
+    @property
+    def tau(self) -> Array:
+        return self.wrench[:, 3:]
+
+    def sample(self, t) -> tuple[Array, Array]:
+        """Return (force_world, torque_body) at t (scalar or array of times)."""
+        if np.ndim(t) == 0:
+            s = float(t) / self.dt
+            k = min(max(int(s), 0), self.slope.shape[0] - 1)
+            row = self.wrench[k] + (s - k) * self.slope[k]
+            return row[:3], row[3:]
+        s = np.asarray(t, dtype=float) / self.dt
+        k = np.clip(np.floor(s).astype(int), 0, self.slope.shape[0] - 1)
+        rows = self.wrench[k] + (s - k)[..., None] * self.slope[k]
+        return rows[..., :3], rows[..., 3:]
+
+
+def build_disturbance_table(
+    cfg: DisturbanceConfig, dt: float, horizon: float
+) -> DisturbanceTable:
+    """Generate the whole-horizon signals in one vectorized pass."""
+    if cfg.level <= 0:
+        raise ValueError("Disturbance table requires level >= 1")
+    f_amp, f_sig, tau_amp, tau_sig = disturbance_params(cfg)
+    n = int(np.floor(horizon / dt)) + 2  # one grid point past the horizon
+    t = np.arange(n)[:, None] * dt
+    noise = np.random.default_rng(cfg.seed).standard_normal((n, 6))
+
+    wrench = np.empty((n, 6))
+    wrench[:, :3] = f_amp * np.sin(2.0 * np.pi * cfg.force_freq_hz * t + F_PHASE)
+    wrench[:, :3] += f_sig * noise[:, :3]
+    wrench[:, 3:] = tau_amp * np.sin(2.0 * np.pi * cfg.tau_freq_hz * t + TAU_PHASE)
+    wrench[:, 3:] += tau_sig * noise[:, 3:]
+    slope = np.diff(wrench, axis=0)
+    wrench.setflags(write=False)
+    slope.setflags(write=False)
+    return DisturbanceTable(dt=float(dt), wrench=wrench, slope=slope)
+
+
+_TABLES: OrderedDict[tuple, DisturbanceTable] = OrderedDict()
+_TABLES_MAX = 16
+
+
+def disturbance_table(
+    cfg: DisturbanceConfig, dt: float, horizon: float
+) -> DisturbanceTable:
+    """Cached ``build_disturbance_table``.
+
+    Keyed by (level, seed, dt, horizon) plus the amplitude/frequency values,
+    so e.g. the LQR and PID runs of one experiment share the same (read-only)
+    signals within a process.
+    """
+    key = (
+        int(cfg.level),
+        int(cfg.seed),
+        float(dt),
+        float(horizon),
+        tuple(np.concatenate(disturbance_params(cfg)[::2]).tolist()),
+        tuple(disturbance_params(cfg)[1::2]),
+        tuple(np.concatenate([cfg.force_freq_hz, cfg.tau_freq_hz]).tolist()),
+    )
+    table = _TABLES.get(key)
+    if table is None:
+        table = build_disturbance_table(cfg, dt, horizon)
+        _TABLES[key] = table
+        if len(_TABLES) > _TABLES_MAX:
+            _TABLES.popitem(last=False)
+    else:
+        _TABLES.move_to_end(key)
+    return table
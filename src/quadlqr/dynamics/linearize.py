@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import numpy as np
+
+from ..control.allocation import Mixer
+from ..control.lqr import HierarchicalLQR
+from ..control.pid import BaselinePID
+from ..types import State
+from .motor import MotorModel
+from .quadrotor import QuadrotorPlant
+
+Array = np.ndarray
+
+
+def linearize(
+    plant: QuadrotorPlant,
+    motor: MotorModel,
+    mixer: Mixer,
+    t: float,
+    x: Array,
+    u: Array,
+) -> tuple[Array, Array]:
+    """Jacobians (A, B) of the actuated plant at (x, u).
+
+    The system is the one run_case integrates with the wrench held:
+    ``x_dot = plant.f(t, x)`` with ``omega_m_dot = motor.deriv(omega_m,
+    mixer.allocate(u))``, u = [T, tau_x, tau_y, tau_z]. A is (17, 17), B is
+    (17, 4). With a controller's local gain ``K = du/dx`` the closed loop
+    linearizes to ``A + B @ K`` (see closed_loop_jacobian).
+    """
+    u = np.asarray(u, dtype=float).reshape(4)
+    A = plant.jacobian(t, x)
+    d_omega, d_cmd = motor.jacobian()
+    A[13:17, 13:17] = d_omega
+    B = np.zeros((17, 4), dtype=float)
+    B[13:17] = d_cmd @ mixer.jacobian(u[0], u[1:4])
+    return A, B
+
+
+def linearize_batch(
+    plant: QuadrotorPlant,
+    motor: MotorModel,
+    mixer: Mixer,
+    t: float,
+    X: Array,
+    U: Array,
+) -> tuple[Array, Array]:
+    """Batched linearize: (N, 17) states, (N, 4) wrenches -> (N, 17, 17), (N, 17, 4)."""
+    X = np.asarray(X, dtype=float).reshape(-1, 17)
+    U = np.asarray(U, dtype=float).reshape(-1, 4)
+    A = plant.jacobian_batch(t, X)
+    d_omega, d_cmd = motor.jacobian()
+    A[:, 13:17, 13:17] = d_omega
+    B = np.zeros((X.shape[0], 17, 4), dtype=float)
+    B[:, 13:17] = d_cmd @ mixer.jacobian_batch(U)
+    return A, B
+
+
+def closed_loop_jacobian(
+    plant: QuadrotorPlant,
+    motor: MotorModel,
+    mixer: Mixer,
+    ctrl: HierarchicalLQR | BaselinePID,
+    t: float,
+    x: Array,
+    ref: dict,
+) -> Array:
+    """Jacobian ``A + B @ K`` of the stage-mode closed loop at x, (17, 17).
+
+    The system is run_case's closed_loop_rhs: ``u = ctrl.compute(st, ref)``
+    with the position integrator held, fed through the mixer and motors.
+    K is ``ctrl.jacobian(st, ref)``; A and B come from linearize at u.
+    """
+    st = State.from_vector(np.asarray(x, dtype=float))
+    u = ctrl.compute(st, ref, 0.0).as_vector()
+    A, B = linearize(plant, motor, mixer, t, x, u)
+    return A + B @ ctrl.jacobian(st, ref)
+
+
+def closed_loop_jacobian_batch(
+    plant: QuadrotorPlant,
+    motor: MotorModel,
+    mixer: Mixer,
+    ctrl: HierarchicalLQR | BaselinePID,
+    t: float,
+    X: Array,
+    ref: dict,
+) -> Array:
+    """Batched closed_loop_jacobian: (N, 17) states -> (N, 17, 17).
+
+    Uses compute_batch / jacobian_batch, so ``ref`` entries may be per
+    vehicle and the integrators are held at ``ctrl.integ_ep_batch``.
+    """
+    X = np.asarray(X, dtype=float).reshape(-1, 17)
+    U = ctrl.compute_batch(X[:, 0:3], X[:, 3:6], X[:, 6:10], X[:, 10:13], ref, 0.0)
+    A, B = linearize_batch(plant, motor, mixer, t, X, U)
+    return A + B @ ctrl.jacobian_batch(X, ref)
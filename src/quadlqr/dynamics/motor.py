@@ -15,3 +15,18 @@ class MotorModel:
         omega = np.asarray(omega, dtype=float).reshape(4)
         omega_cmd = np.asarray(omega_cmd, dtype=float).reshape(4)
         return (omega_cmd - omega) / self.tau
+
+    def flow(self, omega: Array, omega_cmd: Array, h: float) -> Array:
+        """Exact solution after time h with omega_cmd held constant."""
+        decay = np.exp(-h / self.tau)
+        return omega_cmd + (np.asarray(omega, dtype=float) - omega_cmd) * decay
+
+    def jacobian(self) -> tuple[Array, Array]:
+        """(d deriv / d omega, d deriv / d omega_cmd), each (4, 4); constant."""
+        eye = np.eye(4) / self.tau
+        return -eye, eye
+
+    def flow_jacobian(self, h: float) -> tuple[Array, Array]:
+        """(d flow / d omega, d flow / d omega_cmd) after time h, each (4, 4)."""
+        decay = np.exp(-h / self.tau)
+        return decay * np.eye(4), (1.0 - decay) * np.eye(4)
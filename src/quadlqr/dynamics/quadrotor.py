@@ -4,7 +4,9 @@ import numpy as np
 
 from ..config import DisturbanceConfig, QuadParams, RotorParams
 from ..math.quaternion import omega_to_qdot, q_normalize, q_to_R
+from ..math.so3 import hat
 from ..types import State
+from .disturbance import F_PHASE, TAU_PHASE, DisturbanceTable, disturbance_params
 
 Array = np.ndarray
 
@@ -19,6 +21,9 @@ class QuadrotorPlant:
         self.rotor = rotor
         self.disturb = disturb
         self.rng = np.random.default_rng(disturb.seed)
+        # pre-generated signals (DisturbanceConfig.mode == "table"); see
+        # dynamics/disturbance.py. None: draw noise on every call.
+        self.table: DisturbanceTable | None = None
 
     def reset_rng(self, seed: int | None = None) -> None:
         if seed is None:
@@ -30,26 +35,15 @@ class QuadrotorPlant:
         cfg = self.disturb
         if cfg.level <= 0:
             return np.zeros(3), np.zeros(3)
+        if self.table is not None:
+            return self.table.sample(t)
 
-        if cfg.level == 1:
-            f_amp = cfg.force_amp_1
-            f_sig = cfg.force_noise_sigma_1
-            tau_amp = cfg.tau_amp_1
-            tau_sig = cfg.tau_noise_sigma_1
-        else:
-            f_amp = cfg.force_amp_2
-            f_sig = cfg.force_noise_sigma_2
-            tau_amp = cfg.tau_amp_2
-            tau_sig = cfg.tau_noise_sigma_2
-
-        f = f_amp * np.sin(
-            2.0 * np.pi * cfg.force_freq_hz * t + np.array([0.0, 0.7, 1.1])
-        )
+        f_amp, f_sig, tau_amp, tau_sig = disturbance_params(cfg)
+
+        f = f_amp * np.sin(2.0 * np.pi * cfg.force_freq_hz * t + F_PHASE)
         f += f_sig * self.rng.standard_normal(3)
 
-        tau = tau_amp * np.sin(
-            2.0 * np.pi * cfg.tau_freq_hz * t + np.array([0.3, 1.0, 0.2])
-        )
+        tau = tau_amp * np.sin(2.0 * np.pi * cfg.tau_freq_hz * t + TAU_PHASE)
         tau += tau_sig * self.rng.standard_normal(3)
         return f, tau
 
@@ -69,6 +63,35 @@ class QuadrotorPlant:
 
         return float(T), np.array([tau_x, tau_y, tau_z], dtype=float)
 
+    def mixing_matrix(self) -> Array:
+        """(4, 4) map omega_m**2 -> [T, tau]; same X configuration as above."""
+        kf, km, arm = self.rotor.kf, self.rotor.km, self.rotor.arm
+        return np.array(
+            [
+                [kf, kf, kf, kf],
+                [0.0, arm * kf, 0.0, -arm * kf],
+                [-arm * kf, 0.0, arm * kf, 0.0],
+                [km, -km, km, -km],
+            ],
+            dtype=float,
+        )
+
+    def wrench_from_omega_batch(self, omega_m: Array) -> tuple[Array, Array]:
+        """Batched wrench_from_omega: (N, 4) rotor speeds -> (N,) thrust, (N, 3) tau."""
+        omega_m = np.asarray(omega_m, dtype=float).reshape(-1, 4)
+        u = (omega_m * omega_m) @ self.mixing_matrix().T
+        return u[:, 0], u[:, 1:4]
+
+    def wrench_jacobian(self, omega_m: Array) -> Array:
+        """d[T, tau]/d omega_m, (4, 4)."""
+        omega_m = np.asarray(omega_m, dtype=float).reshape(4)
+        return self.mixing_matrix() * (2.0 * omega_m)
+
+    def wrench_jacobian_batch(self, omega_m: Array) -> Array:
+        """Batched wrench_jacobian: (N, 4) rotor speeds -> (N, 4, 4)."""
+        omega_m = np.asarray(omega_m, dtype=float).reshape(-1, 4)
+        return self.mixing_matrix() * (2.0 * omega_m[:, None, :])
+
     def f(self, t: float, x: Array) -> Array:
         """Full state derivative for x=[p(3), v(3), q(4), omega(3), omega_m(4)]."""
         st = State.from_vector(x)
@@ -100,6 +123,191 @@ class QuadrotorPlant:
         xdot = np.concatenate([p_dot, v_dot, q_dot, omega_dot, omega_m_dot], axis=0)
         return xdot
 
+    def f_batch(
+        self,
+        t: float,
+        X: Array,
+        f_w: Array | None = None,
+        tau_d: Array | None = None,
+    ) -> Array:
+        """Batched state derivative for an (N, 17) stack of vehicles.
+
+        Uses the same state layout as ``f``. Disturbances are passed in per
+        vehicle as (N, 3) world forces ``f_w`` and body torques ``tau_d``
+        (zero if omitted); the plant RNG is not touched.
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, 17)
+        m, g, J = self.quad.m, self.quad.g, self.quad.J
+        n = X.shape[0]
+
+        q = q_normalize(X[:, 6:10])
+        qw, qx, qy, qz = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+
+        T, tau = self.wrench_from_omega_batch(X[:, 13:17])
+
+        xdot = np.zeros((n, 17), dtype=float)
+
+        # Translational dynamics (world): only the body z-axis of R is needed
+        Tm = T / m
+        xdot[:, 0:3] = X[:, 3:6]
+        xdot[:, 3] = Tm * 2.0 * (qx * qz + qy * qw)
+        xdot[:, 4] = Tm * 2.0 * (qy * qz - qx * qw)
+        xdot[:, 5] = Tm * (1.0 - 2.0 * (qx * qx + qy * qy)) - g
+        if f_w is not None:
+            xdot[:, 3:6] += np.asarray(f_w, dtype=float).reshape(-1, 3) / m
+
+        # Rotational dynamics (body)
+        omega = X[:, 10:13]
+        wx, wy, wz = omega[:, 0], omega[:, 1], omega[:, 2]
+        xdot[:, 6] = 0.5 * (-wx * qx - wy * qy - wz * qz)
+        xdot[:, 7] = 0.5 * (wx * qw + wz * qy - wy * qz)
+        xdot[:, 8] = 0.5 * (wy * qw - wz * qx + wx * qz)
+        xdot[:, 9] = 0.5 * (wz * qw + wy * qx - wx * qy)
+
+        tau_total = tau - np.cross(omega, omega @ J.T)
+        if tau_d is not None:
+            tau_total += np.asarray(tau_d, dtype=float).reshape(-1, 3)
+        xdot[:, 10:13] = np.linalg.solve(J, tau_total.T).T
+
+        # omega_m derivative handled by motor model externally; zeros here
+        return xdot
+
+    def jacobian(self, t: float, x: Array) -> Array:
+        """Analytic d f / d x, (17, 17), at state x.
+
+        Columns 13:17 are the sensitivities to the rotor speeds. Includes the
+        quaternion normalization inside ``f``, so it matches finite
+        differences of ``f`` off the unit sphere too. Disturbances do not
+        depend on the state and drop out; the motor rows are zero like
+        ``f``'s (see ``linearize`` for the motor and mixer).
+        """
+        x = np.asarray(x, dtype=float).reshape(17)
+        m, J = self.quad.m, self.quad.J
+        q = x[6:10]
+        s = float(np.sqrt(q @ q))
+        qn = q_normalize(q)
+        # d qn / d q
+        P = (np.eye(4) - np.outer(qn, qn)) / s if s >= 1e-12 else np.zeros((4, 4))
+        w, qx, qy, qz = qn.tolist()
+        ox, oy, oz = x[10:13].tolist()
+        omega = x[10:13]
+        T, _ = self.wrench_from_omega(x[13:17])
+        D = self.wrench_jacobian(x[13:17])
+
+        A = np.zeros((17, 17), dtype=float)
+        A[0:3, 3:6] = np.eye(3)
+
+        # v_dot = (T/m) * R(qn) e3: body z-axis b3 and its quaternion gradient
+        b3 = np.array(
+            [
+                2 * (qx * qz + qy * w),
+                2 * (qy * qz - qx * w),
+                1 - 2 * (qx * qx + qy * qy),
+            ]
+        )
+        db3 = 2.0 * np.array(
+            [
+                [qy, qz, w, qx],
+                [-qx, -w, qz, qy],
+                [0.0, -2 * qx, -2 * qy, 0.0],
+            ]
+        )
+        A[3:6, 6:10] = (T / m) * (db3 @ P)
+        A[3:6, 13:17] = np.outer(b3 / m, D[0])
+
+        # q_dot = 0.5 * Omega(omega) qn
+        Om = 0.5 * np.array(
+            [
+                [0.0, -ox, -oy, -oz],
+                [ox, 0.0, oz, -oy],
+                [oy, -oz, 0.0, ox],
+                [oz, oy, -ox, 0.0],
+            ]
+        )
+        A[6:10, 6:10] = Om @ P
+        A[6:10, 10:13] = 0.5 * np.array(
+            [[-qx, -qy, -qz], [w, -qz, qy], [qz, w, -qx], [-qy, qx, w]]
+        )
+
+        # omega_dot = J^-1 (tau + tau_d - omega x J omega)
+        rhs = np.empty((3, 7), dtype=float)
+        rhs[:, 0:3] = hat(J @ omega) - hat(omega) @ J
+        rhs[:, 3:7] = D[1:4]
+        A[10:13, 10:17] = np.linalg.solve(J, rhs)
+        return A
+
+    def jacobian_batch(self, t: float, X: Array) -> Array:
+        """Batched jacobian: (N, 17) states -> (N, 17, 17)."""
+        X = np.asarray(X, dtype=float).reshape(-1, 17)
+        m, J = self.quad.m, self.quad.J
+        n = X.shape[0]
+        q = X[:, 6:10]
+        s = np.sqrt(np.sum(q * q, axis=1))
+        qn = q_normalize(q)
+        P = np.eye(4) - qn[:, :, None] * qn[:, None, :]
+        P *= np.where(s >= 1e-12, 1.0 / np.maximum(s, 1e-300), 0.0)[:, None, None]
+        w, qx, qy, qz = qn[:, 0], qn[:, 1], qn[:, 2], qn[:, 3]
+        omega = X[:, 10:13]
+        ox, oy, oz = omega[:, 0], omega[:, 1], omega[:, 2]
+        T, _ = self.wrench_from_omega_batch(X[:, 13:17])
+        D = self.wrench_jacobian_batch(X[:, 13:17])
+        zero = np.zeros(n)
+
+        A = np.zeros((n, 17, 17), dtype=float)
+        A[:, 0:3, 3:6] = np.eye(3)
+
+        b3 = np.stack(
+            [
+                2 * (qx * qz + qy * w),
+                2 * (qy * qz - qx * w),
+                1 - 2 * (qx * qx + qy * qy),
+            ],
+            axis=1,
+        )
+        db3 = 2.0 * np.stack(
+            [
+                np.stack([qy, qz, w, qx], axis=1),
+                np.stack([-qx, -w, qz, qy], axis=1),
+                np.stack([zero, -2 * qx, -2 * qy, zero], axis=1),
+            ],
+            axis=1,
+        )
+        A[:, 3:6, 6:10] = (T / m)[:, None, None] * (db3 @ P)
+        A[:, 3:6, 13:17] = (b3 / m)[:, :, None] * D[:, None, 0, :]
+
+        Om = 0.5 * np.stack(
+            [
+                np.stack([zero, -ox, -oy, -oz], axis=1),
+                np.stack([ox, zero, oz, -oy], axis=1),
+                np.stack([oy, -oz, zero, ox], axis=1),
+                np.stack([oz, oy, -ox, zero], axis=1),
+            ],
+            axis=1,
+        )
+        A[:, 6:10, 6:10] = Om @ P
+        A[:, 6:10, 10:13] = 0.5 * np.stack(
+            [
+                np.stack([-qx, -qy, -qz], axis=1),
+                np.stack([w, -qz, qy], axis=1),
+                np.stack([qz, w, -qx], axis=1),
+                np.stack([-qy, qx, w], axis=1),
+            ],
+            axis=1,
+        )
+
+        rhs = np.empty((n, 3, 7), dtype=float)
+        rhs[:, :, 0:3] = hat(omega @ J.T) - hat(omega) @ J
+        rhs[:, :, 3:7] = D[:, 1:4]
+        A[:, 10:13, 10:17] = np.linalg.inv(J) @ rhs
+        return A
+
+    @staticmethod
+    def post_process_batch(X: Array) -> Array:
+        """Normalize the quaternion of every row of an (N, 17) state stack."""
+        X = np.array(X, dtype=float).reshape(-1, 17)
+        X[:, 6:10] = q_normalize(X[:, 6:10])
+        return X
+
     @staticmethod
     def post_process(x: Array) -> Array:
         """Normalize quaternion after integration."""
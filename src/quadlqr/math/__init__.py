@@ -1,14 +1,26 @@
-from .quaternion import R_to_q, omega_to_qdot, q_conj, q_mul, q_normalize, q_to_R
-from .so3 import clamp_norm, hat, vee
+from .quaternion import (
+    R_to_q,
+    omega_to_qdot,
+    q_conj,
+    q_exp,
+    q_mul,
+    q_normalize,
+    q_to_euler,
+    q_to_R,
+)
+from .so3 import clamp_norm, dexp_inv, hat, vee
 
 __all__ = [
     "q_normalize",
     "q_conj",
     "q_mul",
     "q_to_R",
+    "q_exp",
     "omega_to_qdot",
     "R_to_q",
+    "q_to_euler",
     "hat",
     "vee",
+    "dexp_inv",
     "clamp_norm",
 ]
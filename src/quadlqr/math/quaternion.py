@@ -1,96 +1,207 @@
 from __future__ import annotations
 
+import math
+
 import numpy as np
 
 Array = np.ndarray
 
+# All functions accept a single quaternion (4,) or any stack (..., 4); rotation
+# matrices are (3, 3) or (..., 3, 3). Single items keep a scalar fast path since
+# the per-step simulation calls these on one vehicle at a time.
+
+_Q_IDENTITY = np.array([1.0, 0.0, 0.0, 0.0], dtype=float)
+_Q_CONJ_SIGNS = np.array([1.0, -1.0, -1.0, -1.0], dtype=float)
+
 
 def q_normalize(q: Array) -> Array:
-    q = np.asarray(q, dtype=float).reshape(4)
-    n = float(np.linalg.norm(q))
-    if n < 1e-12:
-        return np.array([1.0, 0.0, 0.0, 0.0], dtype=float)
-    return q / n
+    q = np.asarray(q, dtype=float)
+    if q.ndim == 1:
+        n = float(np.sqrt(q @ q))
+        if n < 1e-12:
+            return _Q_IDENTITY.copy()
+        return q / n
+    n = np.sqrt(np.sum(q * q, axis=-1, keepdims=True))
+    small = n < 1e-12
+    out = q / np.where(small, 1.0, n)
+    if small.any():
+        out = np.where(small, _Q_IDENTITY, out)
+    return out
 
 
 def q_conj(q: Array) -> Array:
-    q = np.asarray(q, dtype=float).reshape(4)
-    return np.array([q[0], -q[1], -q[2], -q[3]], dtype=float)
+    return np.asarray(q, dtype=float) * _Q_CONJ_SIGNS
 
 
 def q_mul(q1: Array, q2: Array) -> Array:
     """Hamilton product (w,x,y,z)."""
-    w1, x1, y1, z1 = np.asarray(q1, dtype=float).reshape(4)
-    w2, x2, y2, z2 = np.asarray(q2, dtype=float).reshape(4)
-    return np.array(
-        [
-            w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
-            w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
-            w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
-            w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
-        ],
-        dtype=float,
-    )
+    q1 = np.asarray(q1, dtype=float)
+    q2 = np.asarray(q2, dtype=float)
+    if q1.ndim == 1 and q2.ndim == 1:
+        w1, x1, y1, z1 = q1.tolist()
+        w2, x2, y2, z2 = q2.tolist()
+        return np.array(
+            [
+                w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+                w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+                w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+                w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+            ],
+            dtype=float,
+        )
+    w1, x1, y1, z1 = q1[..., 0], q1[..., 1], q1[..., 2], q1[..., 3]
+    w2, x2, y2, z2 = q2[..., 0], q2[..., 1], q2[..., 2], q2[..., 3]
+    out = np.empty(np.broadcast_shapes(q1.shape, q2.shape), dtype=float)
+    out[..., 0] = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
+    out[..., 1] = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
+    out[..., 2] = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
+    out[..., 3] = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
+    return out
 
 
 def q_to_R(q: Array) -> Array:
     """Rotation matrix body->world."""
     q = q_normalize(q)
-    w, x, y, z = q
-    return np.array(
-        [
-            [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
-            [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
-            [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
-        ],
-        dtype=float,
-    )
+    if q.ndim == 1:
+        w, x, y, z = q.tolist()
+        return np.array(
+            [
+                [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+                [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+                [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+            ],
+            dtype=float,
+        )
+    w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    R = np.empty((*q.shape[:-1], 3, 3), dtype=float)
+    R[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    R[..., 0, 1] = 2 * (x * y - z * w)
+    R[..., 0, 2] = 2 * (x * z + y * w)
+    R[..., 1, 0] = 2 * (x * y + z * w)
+    R[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    R[..., 1, 2] = 2 * (y * z - x * w)
+    R[..., 2, 0] = 2 * (x * z - y * w)
+    R[..., 2, 1] = 2 * (y * z + x * w)
+    R[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    return R
 
 
 def omega_to_qdot(q: Array, omega_b: Array) -> Array:
     """q_dot = 0.5 * Omega(omega) * q"""
-    q = np.asarray(q, dtype=float).reshape(4)
-    wx, wy, wz = np.asarray(omega_b, dtype=float).reshape(3)
-    Omega = np.array(
-        [
-            [0.0, -wx, -wy, -wz],
-            [wx, 0.0, wz, -wy],
-            [wy, -wz, 0.0, wx],
-            [wz, wy, -wx, 0.0],
-        ],
-        dtype=float,
-    )
-    return 0.5 * Omega @ q
+    q = np.asarray(q, dtype=float)
+    omega_b = np.asarray(omega_b, dtype=float)
+    if q.ndim == 1 and omega_b.ndim == 1:
+        w, x, y, z = q.tolist()
+        wx, wy, wz = omega_b.tolist()
+        return np.array(
+            [
+                0.5 * (-wx * x - wy * y - wz * z),
+                0.5 * (wx * w + wz * y - wy * z),
+                0.5 * (wy * w - wz * x + wx * z),
+                0.5 * (wz * w + wy * x - wx * y),
+            ],
+            dtype=float,
+        )
+    w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    wx, wy, wz = omega_b[..., 0], omega_b[..., 1], omega_b[..., 2]
+    qdot = np.empty((*np.broadcast_shapes(q.shape[:-1], omega_b.shape[:-1]), 4))
+    qdot[..., 0] = -wx * x - wy * y - wz * z
+    qdot[..., 1] = wx * w + wz * y - wy * z
+    qdot[..., 2] = wy * w - wz * x + wx * z
+    qdot[..., 3] = wz * w + wy * x - wx * y
+    qdot *= 0.5
+    return qdot
+
+
+def q_exp(phi: Array) -> Array:
+    """Unit quaternion of the rotation vector phi (angle |phi| about phi/|phi|)."""
+    phi = np.asarray(phi, dtype=float)
+    if phi.ndim == 1:
+        x, y, z = phi.tolist()
+        n = math.sqrt(x * x + y * y + z * z)
+        # sin(n/2)/n; Taylor term below 1e-4 keeps full precision
+        s = math.sin(0.5 * n) / n if n > 1e-4 else 0.5 - n * n / 48.0
+        return np.array([math.cos(0.5 * n), s * x, s * y, s * z], dtype=float)
+    n = np.sqrt(np.sum(phi * phi, axis=-1, keepdims=True))
+    s = np.where(n > 1e-4, np.sin(0.5 * n) / np.maximum(n, 1e-300), 0.5 - n * n / 48.0)
+    return np.concatenate([np.cos(0.5 * n), s * phi], axis=-1)
 
 
 def R_to_q(R: Array) -> Array:
-    """Convert rotation matrix to quaternion (w,x,y,z). Robust enough for simulation."""
-    R = np.asarray(R, dtype=float).reshape(3, 3)
-    tr = float(np.trace(R))
+    """Convert rotation matrix to quaternion (w,x,y,z). Robust enough for simulation.
+
+    Stacks are converted branchlessly: all four Shepperd candidates are formed
+    and the one picked by the scalar rule (trace > 0, else largest diagonal
+    entry) is selected per matrix.
+    """
+    R = np.asarray(R, dtype=float)
+    if R.ndim == 2:
+        return _R_to_q_single(R)
+    r00, r01, r02 = R[..., 0, 0], R[..., 0, 1], R[..., 0, 2]
+    r10, r11, r12 = R[..., 1, 0], R[..., 1, 1], R[..., 1, 2]
+    r20, r21, r22 = R[..., 2, 0], R[..., 2, 1], R[..., 2, 2]
+    tr = r00 + r11 + r22
+
+    use_w = tr > 0
+    use_x = ~use_w & (r00 > r11) & (r00 > r22)
+    use_y = ~use_w & ~use_x & (r11 > r22)
+    cond = [use_w, use_x, use_y]
+
+    # S = 4 * |selected component|; clamp keeps unselected candidates finite
+    S = np.select(cond, [1.0 + tr, 1.0 + r00 - r11 - r22, 1.0 + r11 - r00 - r22])
+    S = np.where(use_w | use_x | use_y, S, 1.0 + r22 - r00 - r11)
+    S = 2.0 * np.sqrt(np.maximum(S, 1e-300))
+    inv_S = 1.0 / S
+    quarter = 0.25 * S
+
+    d21, d02, d10 = (r21 - r12) * inv_S, (r02 - r20) * inv_S, (r10 - r01) * inv_S
+    s01, s02, s12 = (r01 + r10) * inv_S, (r02 + r20) * inv_S, (r12 + r21) * inv_S
+    q = np.empty((*R.shape[:-2], 4), dtype=float)
+    q[..., 0] = np.select(cond, [quarter, d21, d02], d10)
+    q[..., 1] = np.select(cond, [d21, quarter, s01], s02)
+    q[..., 2] = np.select(cond, [d02, s01, quarter], s12)
+    q[..., 3] = np.select(cond, [d10, s02, s12], quarter)
+    return q_normalize(q)
+
+
+def _R_to_q_single(R: Array) -> Array:
+    (r00, r01, r02), (r10, r11, r12), (r20, r21, r22) = R.tolist()
+    tr = r00 + r11 + r22
     if tr > 0:
         S = np.sqrt(tr + 1.0) * 2.0
         w = 0.25 * S
-        x = (R[2, 1] - R[1, 2]) / S
-        y = (R[0, 2] - R[2, 0]) / S
-        z = (R[1, 0] - R[0, 1]) / S
+        x = (r21 - r12) / S
+        y = (r02 - r20) / S
+        z = (r10 - r01) / S
     else:
         # pick max diagonal
-        if R[0, 0] > R[1, 1] and R[0, 0] > R[2, 2]:
-            S = np.sqrt(1.0 + R[0, 0] - R[1, 1] - R[2, 2]) * 2.0
-            w = (R[2, 1] - R[1, 2]) / S
+        if r00 > r11 and r00 > r22:
+            S = np.sqrt(1.0 + r00 - r11 - r22) * 2.0
+            w = (r21 - r12) / S
             x = 0.25 * S
-            y = (R[0, 1] + R[1, 0]) / S
-            z = (R[0, 2] + R[2, 0]) / S
-        elif R[1, 1] > R[2, 2]:
-            S = np.sqrt(1.0 + R[1, 1] - R[0, 0] - R[2, 2]) * 2.0
-            w = (R[0, 2] - R[2, 0]) / S
-            x = (R[0, 1] + R[1, 0]) / S
+            y = (r01 + r10) / S
+            z = (r02 + r20) / S
+        elif r11 > r22:
+            S = np.sqrt(1.0 + r11 - r00 - r22) * 2.0
+            w = (r02 - r20) / S
+            x = (r01 + r10) / S
             y = 0.25 * S
-            z = (R[1, 2] + R[2, 1]) / S
+            z = (r12 + r21) / S
         else:
-            S = np.sqrt(1.0 + R[2, 2] - R[0, 0] - R[1, 1]) * 2.0
-            w = (R[1, 0] - R[0, 1]) / S
-            x = (R[0, 2] + R[2, 0]) / S
-            y = (R[1, 2] + R[2, 1]) / S
+            S = np.sqrt(1.0 + r22 - r00 - r11) * 2.0
+            w = (r10 - r01) / S
+            x = (r02 + r20) / S
+            y = (r12 + r21) / S
             z = 0.25 * S
     return q_normalize(np.array([w, x, y, z], dtype=float))
+
+
+def q_to_euler(q: Array) -> Array:
+    """ZYX Euler angles [roll, pitch, yaw] (rad) of body->world quaternions."""
+    q = q_normalize(q)
+    w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    eul = np.empty((*q.shape[:-1], 3), dtype=float)
+    eul[..., 0] = np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    eul[..., 1] = np.arcsin(np.clip(2 * (w * y - z * x), -1.0, 1.0))
+    eul[..., 2] = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+    return eul
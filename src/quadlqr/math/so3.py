@@ -6,16 +6,41 @@ Array = np.ndarray
 
 
 def hat(w: Array) -> Array:
-    wx, wy, wz = w
-    return np.array([[0.0, -wz, wy], [wz, 0.0, -wx], [-wy, wx, 0.0]], dtype=float)
+    w = np.asarray(w, dtype=float)
+    wx, wy, wz = w[..., 0], w[..., 1], w[..., 2]
+    W = np.zeros((*w.shape[:-1], 3, 3), dtype=float)
+    W[..., 0, 1] = -wz
+    W[..., 0, 2] = wy
+    W[..., 1, 0] = wz
+    W[..., 1, 2] = -wx
+    W[..., 2, 0] = -wy
+    W[..., 2, 1] = wx
+    return W
 
 
 def vee(W: Array) -> Array:
-    return np.array([W[2, 1], W[0, 2], W[1, 0]], dtype=float)
+    W = np.asarray(W, dtype=float)
+    w = np.empty((*W.shape[:-2], 3), dtype=float)
+    w[..., 0] = W[..., 2, 1]
+    w[..., 1] = W[..., 0, 2]
+    w[..., 2] = W[..., 1, 0]
+    return w
 
 
 def clamp_norm(v: Array, max_norm: float) -> Array:
-    n = float(np.linalg.norm(v))
-    if n <= max_norm or n < 1e-12:
-        return v
-    return v * (max_norm / n)
+    v = np.asarray(v, dtype=float)
+    n = np.sqrt(np.sum(v * v, axis=-1, keepdims=True))
+    scale = np.where(
+        (n <= max_norm) | (n < 1e-12), 1.0, max_norm / np.maximum(n, 1e-12)
+    )
+    return v * scale
+
+
+def dexp_inv(theta: Array, w: Array) -> Array:
+    """theta_dot for a body rate w along q0 * exp(theta), to second order.
+
+    Inverse right Jacobian of SO(3), truncated after the double commutator:
+    w + [theta, w] / 2 + [theta, [theta, w]] / 12 (enough for 4th-order RKMK).
+    """
+    c = np.cross(theta, w)
+    return w + 0.5 * c + np.cross(theta, c) / 12.0
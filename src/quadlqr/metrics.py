@@ -33,3 +33,172 @@ def compute_metrics(npz: dict) -> dict:
         "peak_thrust": peak_thrust,
         "peak_tau": peak_tau,
     }
+
+
+class P2Quantile:
+    """Streaming quantile estimate with the P^2 algorithm (Jain & Chlamtac).
+
+    Keeps five markers, so memory is O(1) in the number of samples; exact
+    for the first five samples.
+    """
+
+    def __init__(self, p: float):
+        if not 0.0 < p < 1.0:
+            raise ValueError(f"Quantile must be in (0, 1), got {p}")
+        self.p = p
+        self.q: list[float] = []
+        self.pos = [0.0, 1.0, 2.0, 3.0, 4.0]
+        self.want = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.step = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x: float) -> None:
+        q = self.q
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        pos, want = self.pos, self.want
+        for i in range(k + 1, 5):
+            pos[i] += 1.0
+        for i in range(5):
+            want[i] += self.step[i]
+
+        for i in (1, 2, 3):
+            d = want[i] - pos[i]
+            if (d >= 1.0 and pos[i + 1] - pos[i] > 1.0) or (
+                d <= -1.0 and pos[i - 1] - pos[i] < -1.0
+            ):
+                s = 1.0 if d > 0 else -1.0
+                # piecewise-parabolic prediction, linear if it breaks ordering
+                qp = q[i] + s / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + s)
+                    * (q[i + 1] - q[i])
+                    / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - s)
+                    * (q[i] - q[i - 1])
+                    / (pos[i] - pos[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    j = i + int(s)
+                    qp = q[i] + s * (q[j] - q[i]) / (pos[j] - pos[i])
+                q[i] = qp
+                pos[i] += s
+
+    def value(self) -> float:
+        if not self.q:
+            return float("nan")
+        if len(self.q) < 5:
+            return float(np.percentile(self.q, 100.0 * self.p))
+        return self.q[2]
+
+
+class OnlineMetrics:
+    """Incremental ``compute_metrics``: fed one sample per step by run_case.
+
+    ``result()`` returns the same keys as ``compute_metrics`` on the full log
+    (equal up to summation rounding), without keeping the trajectory.
+    Optional extras, all O(1) memory per step:
+
+    - ``percentiles``: e.g. (50, 95, 99) -> ``pos_err_p50`` ... streaming
+      P^2 estimates of the position error norm (approximate; tail quantiles
+      are tight, the median drifts while the error is still converging).
+    - ``window``: tumbling window length in samples; ``result()["windows"]``
+      lists rmse / max error / energy per window.
+    """
+
+    def __init__(self, percentiles=(), window: int = 0):
+        self.percentiles = {
+            pc: P2Quantile(pc / 100.0) for pc in sorted(float(p) for p in percentiles)
+        }
+        self.window = int(window)
+        self.n = 0
+        self.t01 = [0.0, 1.0]  # first two sample times -> dt, as compute_metrics
+        self.sq_err = 0.0
+        self.max_err = 0.0
+        self.energy = 0.0
+        self.peak_thrust = 0.0
+        self.peak_tau = [0.0, 0.0, 0.0]
+        self.windows: list[dict] = []
+        self._win = None
+
+    def update(self, t: float, p: Array, p_ref: Array, u: Array) -> None:
+        px, py, pz = p.tolist()
+        rx, ry, rz = p_ref.tolist()
+        T, tx, ty, tz = u.tolist()
+        ex, ey, ez = px - rx, py - ry, pz - rz
+        e2 = ex * ex + ey * ey + ez * ez
+        err = e2**0.5
+        energy = T * T + (tx * tx + ty * ty + tz * tz)  # times dt in result()
+
+        if self.n < 2:
+            self.t01[self.n] = t
+        self.n += 1
+        self.sq_err += e2
+        self.energy += energy
+        self.max_err = max(self.max_err, err)
+        self.peak_thrust = max(self.peak_thrust, abs(T))
+        peak_tau = self.peak_tau
+        for i, v in enumerate((abs(tx), abs(ty), abs(tz))):
+            peak_tau[i] = max(peak_tau[i], v)
+        for est in self.percentiles.values():
+            est.add(err)
+
+        if self.window > 0:
+            win = self._win
+            if win is None:
+                win = self._win = {
+                    "t_start": t,
+                    "n": 0,
+                    "sq": 0.0,
+                    "max": 0.0,
+                    "en": 0.0,
+                }
+            win["n"] += 1
+            win["sq"] += e2
+            win["en"] += energy
+            win["max"] = max(win["max"], err)
+            if win["n"] == self.window:
+                self._close_window()
+
+    def _window_row(self, win: dict) -> dict:
+        return {
+            "t_start": win["t_start"],
+            "rmse_pos": (win["sq"] / win["n"]) ** 0.5,
+            "max_pos_err": win["max"],
+            "energy_u": win["en"] * self._dt(),
+        }
+
+    def _dt(self) -> float:
+        return self.t01[1] - self.t01[0] if self.n > 1 else 1.0
+
+    def _close_window(self) -> None:
+        self.windows.append(self._win)
+        self._win = None
+
+    def result(self) -> dict:
+        if self.n == 0:
+            raise ValueError("No samples accumulated")
+        out = {
+            "rmse_pos": (self.sq_err / self.n) ** 0.5,
+            "max_pos_err": self.max_err,
+            "energy_u": self.energy * self._dt(),
+            "peak_thrust": self.peak_thrust,
+            "peak_tau": list(self.peak_tau),
+        }
+        for pc, est in self.percentiles.items():
+            out[f"pos_err_p{pc:g}"] = est.value()
+        if self.window > 0:
+            wins = self.windows + ([self._win] if self._win is not None else [])
+            out["windows"] = [self._window_row(w) for w in wins]
+        return out
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import dataclasses
+import functools
+import hashlib
+import json
+import os
+import platform
+import shutil
+import struct
+import tempfile
+import time
+import types
+
+import numpy as np
+
+from ..config import ExperimentConfig
+
+_PKG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@functools.lru_cache(maxsize=1)
+def code_fingerprint() -> str:
+    """Hash of every .py file of the quadlqr package plus numpy/Python versions.
+
+    Any source edit (or an upgrade of the numerics underneath) yields a new
+    fingerprint, hence new cache keys.
+    """
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(_PKG_DIR):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for fname in sorted(f for f in files if f.endswith(".py")):
+            path = os.path.join(root, fname)
+            h.update(os.path.relpath(path, _PKG_DIR).encode())
+            with open(path, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+    h.update(np.__version__.encode())
+    h.update(platform.python_version().encode())
+    return h.hexdigest()
+
+
+def _code_names(code: types.CodeType) -> set[str]:
+    """Global/attribute names used by ``code`` and every nested code object."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _feed(h, obj, _seen: set[int] | None = None) -> None:
+    """Feed a type-tagged, order-stable encoding of ``obj`` into hash ``h``.
+
+    Raises TypeError for objects that cannot be hashed by content (no
+    ``cache_key()``, not a dataclass or one of the handled builtins).
+    """
+    seen = set() if _seen is None else _seen
+
+    def feed(item) -> None:
+        _feed(h, item, seen)
+
+    if obj is None or isinstance(obj, bool):
+        h.update(b"K" + repr(obj).encode())
+    elif isinstance(obj, (int, np.integer)):
+        h.update(b"I" + str(int(obj)).encode() + b";")
+    elif isinstance(obj, (float, np.floating)):
+        h.update(b"F" + struct.pack("<d", float(obj)))
+    elif isinstance(obj, str):
+        data = obj.encode()
+        h.update(b"S%d:" % len(data) + data)
+    elif isinstance(obj, bytes):
+        h.update(b"B%d:" % len(obj) + obj)
+    elif isinstance(obj, np.ndarray):
+        arr = np.ascontiguousarray(obj)
+        h.update(b"A" + arr.dtype.str.encode() + repr(arr.shape).encode())
+        h.update(arr.tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"L%d:" % len(obj))
+        for item in obj:
+            feed(item)
+    elif isinstance(obj, dict):
+        h.update(b"D%d:" % len(obj))
+        for key in sorted(obj, key=repr):
+            feed(key)
+            feed(obj[key])
+    elif isinstance(obj, functools.partial):
+        h.update(b"P")
+        feed(obj.func)
+        feed(obj.args)
+        feed(obj.keywords)
+    elif hasattr(obj, "cache_key"):
+        h.update(b"C" + type(obj).__qualname__.encode())
+        feed(obj.cache_key())
+    elif dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        h.update(b"O" + type(obj).__qualname__.encode())
+        for f in dataclasses.fields(obj):
+            feed(f.name)
+            feed(getattr(obj, f.name))
+    elif isinstance(obj, types.FunctionType):
+        h.update(b"f" + f"{obj.__module__}.{obj.__qualname__}".encode())
+        if id(obj) in seen:  # recursion through globals / closures
+            return
+        seen.add(id(obj))
+        feed(obj.__code__)
+        feed(obj.__defaults__)
+        feed(obj.__kwdefaults__)
+        feed([c.cell_contents for c in obj.__closure__ or ()])
+        # package code is covered by code_fingerprint(); anything else also
+        # depends on the current values of the globals it reads
+        if not (obj.__module__ or "").startswith("quadlqr"):
+            g = obj.__globals__
+            feed({n: g[n] for n in _code_names(obj.__code__) if n in g})
+    elif isinstance(obj, types.CodeType):
+        h.update(b"c")
+        feed(obj.co_code)
+        feed(obj.co_names)
+        feed(obj.co_consts)
+    elif isinstance(obj, types.MethodType):
+        feed(obj.__func__)
+        feed(obj.__self__)
+    elif isinstance(obj, types.ModuleType):
+        h.update(b"m" + obj.__name__.encode())
+    elif isinstance(obj, (type, types.BuiltinFunctionType, np.ufunc)):
+        # identified by name: their behaviour is fixed by the installed code
+        name = getattr(obj, "__qualname__", obj.__name__)
+        h.update(b"t" + f"{getattr(obj, '__module__', '')}.{name}".encode())
+    else:
+        raise TypeError(f"Cannot hash {type(obj).__name__} for the run cache")
+
+
+def run_key(cfg: ExperimentConfig, ref_fn, controller: str, t_final: float) -> str:
+    """Content hash of everything a ``run_case`` result depends on.
+
+    Covers the full config tree (array values included), the scenario (its
+    code, defaults, closure and, outside the package, the globals it reads;
+    ``functools.partial`` arguments; ``cache_key()`` for callable objects),
+    the controller, the horizon and ``code_fingerprint()``. The case name is
+    not part of the key: it only names the log file. Raises TypeError for a
+    scenario that cannot be hashed by content.
+    """
+    h = hashlib.sha256()
+    _feed(h, code_fingerprint())
+    _feed(h, cfg)
+    _feed(h, ref_fn)
+    _feed(h, controller.lower())
+    _feed(h, float(t_final))
+    return h.hexdigest()
+
+
+def _tree_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path)
+        for f in files
+    )
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _copy(src: str, dst: str, link: bool = False) -> None:
+    """Copy (or hard-link, falling back to copying) a file or directory tree."""
+    fn = _link_or_copy if link else shutil.copy2
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, copy_function=fn)
+    else:
+        fn(src, dst)
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class RunCache:
+    """Content-addressed store of run logs, for ``run_case(..., cache=...)``.
+
+    Entries live in ``root/<key>/`` (the log plus ``meta.json``) and are
+    published with an atomic rename, so concurrent suite workers may share a
+    cache. On a hit the stored log is copied to the path the run would have
+    written; ``link=True`` hard-links instead (instant even for large chunked
+    logs, but only safe if nothing rewrites those files in place later).
+    ``max_bytes`` bounds the total size: after each store the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int | None = None, link: bool = False):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.link = link
+        os.makedirs(root, exist_ok=True)
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def fetch(self, key: str, base: str) -> str | None:
+        """Materialize entry ``key`` at ``base`` (+ its suffix); None on a miss."""
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        src = os.path.join(entry, meta["log"])
+        if not os.path.exists(src):
+            return None
+        dst = base + meta["suffix"]
+        _remove(dst)
+        _copy(src, dst, self.link)
+        os.utime(os.path.join(entry, "meta.json"))  # LRU stamp
+        return dst
+
+    def store(self, key: str, path: str, base: str, **meta) -> None:
+        """Add the log at ``path`` (written for ``base``) under ``key``."""
+        entry = self._entry(key)
+        if os.path.exists(entry):
+            return
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.root)
+        try:
+            log = "log" + path[len(base) :]
+            _copy(path, os.path.join(tmp, log))
+            meta = {
+                "log": log,
+                "suffix": path[len(base) :],
+                "created": time.time(),
+                "code": code_fingerprint(),
+                "bytes": _tree_size(path),
+                **meta,
+            }
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+            os.rename(tmp, entry)
+        except OSError:
+            # another process published the same key first
+            _remove(tmp)
+            return
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes)
+
+    def entries(self) -> list[dict]:
+        """Metadata of every entry (plus "key" and "last_used"), oldest first."""
+        out = []
+        for key in os.listdir(self.root):
+            meta_path = os.path.join(self._entry(key), "meta.json")
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+                last_used = os.path.getmtime(meta_path)
+            except (OSError, ValueError):
+                continue
+            out.append({**meta, "key": key, "last_used": last_used})
+        out.sort(key=lambda e: e["last_used"])
+        return out
+
+    def size(self) -> int:
+        return sum(e["bytes"] for e in self.entries())
+
+    def invalidate(self, key: str) -> bool:
+        """Drop one entry; True if it existed."""
+        entry = self._entry(key)
+        existed = os.path.isdir(entry)
+        _remove(entry)
+        return existed
+
+    def prune(self) -> int:
+        """Drop entries written by a different code fingerprint."""
+        stale = [e["key"] for e in self.entries() if e["code"] != code_fingerprint()]
+        for key in stale:
+            self.invalidate(key)
+        return len(stale)
+
+    def evict(self, max_bytes: int) -> int:
+        """Drop least recently used entries until the total is <= max_bytes."""
+        entries = self.entries()
+        total = sum(e["bytes"] for e in entries)
+        dropped = 0
+        for e in entries:
+            if total <= max_bytes:
+                break
+            self.invalidate(e["key"])
+            total -= e["bytes"]
+            dropped += 1
+        return dropped
+
+    def clear(self) -> None:
+        for key in os.listdir(self.root):
+            _remove(self._entry(key))
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .logger import load_log
+
+Array = np.ndarray
+
+
+@dataclass
+class Checkpoint:
+    """Full mid-run simulation state at log row ``k`` (t = t_k).
+
+    Taken by ``run_case(..., checkpoints=CheckpointRecorder(...))`` at the top
+    of step k, before row k is logged; ``run_case(..., resume=checkpoint)``
+    continues from it. Plain arrays and dicts only, so checkpoints pickle to
+    worker processes for parallel forks.
+    """
+
+    k: int  # log cursor: rows [0, k) are in the parent log
+    t: float
+    n: int  # parent log length (same t grid required to resume)
+    layout: tuple  # (control_mode, integrator, decimation, fast_path)
+    x: Array  # plant state vector
+    integ_ep: Array  # controller position integrator
+    rng: dict  # plant bit-generator state
+    held: dict | None = None  # zoh: last control sample (ref, wrench, omega_cmd)
+    solver: dict | None = None  # dopri45 state (see DormandPrince45.get_state)
+    z: Array | None = None  # stage-mode dopri45 augmented state
+    log_path: str | None = None  # parent log, set when the parent run finishes
+
+    def prefix(self) -> dict[str, Array]:
+        """Rows [0, k) of every channel of the parent log."""
+        if self.log_path is None:
+            raise ValueError("Checkpoint has no parent log to take the prefix from")
+        log = load_log(self.log_path)
+        # copies, not memmap views: the parent's files may be rewritten next
+        return {
+            name: np.array(log[name][: self.k])
+            for name in ("t", "X", "U", "omega", "omega_cmd", "p_ref", "v_ref")
+        }
+
+
+@dataclass
+class CheckpointRecorder:
+    """Requests checkpoints at the first log sample at or after each time."""
+
+    times: Sequence[float]
+    saved: list[Checkpoint] = field(default_factory=list)
+
+    def steps(self, t: Array) -> set[int]:
+        k = np.searchsorted(t, np.asarray(self.times, dtype=float) - 1e-12)
+        return {int(i) for i in k if i < len(t)}
+
+    def finish(self, log_path: str | None) -> None:
+        for ckpt in self.saved:
+            ckpt.log_path = log_path
+
+    def at(self, t: float) -> Checkpoint:
+        """The checkpoint taken for requested time t."""
+        for ckpt in self.saved:
+            if ckpt.t >= t - 1e-12:
+                return ckpt
+        raise KeyError(t)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from math import sqrt
+
+import numpy as np
+
+from ..dynamics import MotorModel, QuadrotorPlant
+
+Array = np.ndarray
+
+
+class FastRHS:
+    """Closed-loop plant + motor derivative written into a caller buffer.
+
+    Same model as ``QuadrotorPlant.f`` with the motor derivative filled in,
+    but constants (m, g, J, mixing coefficients, tau) are unpacked once and the
+    per-call math runs on Python floats, so no State, concatenate or small
+    temporaries are created. Disturbances still come from
+    ``plant._disturbance`` so the RNG stream matches the reference path.
+    """
+
+    def __init__(self, plant: QuadrotorPlant, motor: MotorModel):
+        self.plant = plant
+        quad, rotor = plant.quad, plant.rotor
+        J = np.asarray(quad.J, dtype=float)
+        self.m = float(quad.m)
+        self.g = float(quad.g)
+        self.J = J.tolist()
+        self.J_inv = np.linalg.inv(J).tolist()
+        # diagonal inertia: divide like the LU solve in QuadrotorPlant.f does
+        self.J_diag = bool(np.all(J == np.diag(np.diag(J))))
+        self.kf = float(rotor.kf)
+        self.km = float(rotor.km)
+        self.arm_kf = float(rotor.arm) * float(rotor.kf)
+        self.tau_m = float(motor.tau)
+
+    def __call__(self, t: float, x: Array, omega_cmd: Array, out: Array) -> Array:
+        _, _, _, vx, vy, vz, qw, qx, qy, qz, wx, wy, wz, m1, m2, m3, m4 = x.tolist()
+
+        n = sqrt(qw * qw + qx * qx + qy * qy + qz * qz)
+        if n < 1e-12:
+            qw, qx, qy, qz = 1.0, 0.0, 0.0, 0.0
+        else:
+            qw, qx, qy, qz = qw / n, qx / n, qy / n, qz / n
+
+        # rotor mixing (X configuration, yaw signs [+, -, +, -])
+        w1, w2, w3, w4 = m1 * m1, m2 * m2, m3 * m3, m4 * m4
+        T = self.kf * (w1 + w2 + w3 + w4)
+        tx = self.arm_kf * (w2 - w4)
+        ty = self.arm_kf * (-w1 + w3)
+        tz = self.km * (w1 - w2 + w3 - w4)
+
+        fx = fy = fz = 0.0
+        if self.plant.disturb.level > 0:
+            f_w, tau_d = self.plant._disturbance(t)
+            fx, fy, fz = f_w.tolist()
+            dx, dy, dz = tau_d.tolist()
+            tx += dx
+            ty += dy
+            tz += dz
+
+        # translational: R e3 * T / m - g e3 + f_w / m (reference operation order)
+        m = self.m
+        out[0] = vx
+        out[1] = vy
+        out[2] = vz
+        out[3] = 2 * (qx * qz + qy * qw) * T / m + fx / m
+        out[4] = 2 * (qy * qz - qx * qw) * T / m + fy / m
+        out[5] = (1 - 2 * (qx * qx + qy * qy)) * T / m - self.g + fz / m
+
+        # quaternion kinematics on the normalized quaternion
+        out[6] = 0.5 * (-wx * qx - wy * qy - wz * qz)
+        out[7] = 0.5 * (wx * qw + wz * qy - wy * qz)
+        out[8] = 0.5 * (wy * qw - wz * qx + wx * qz)
+        out[9] = 0.5 * (wz * qw + wy * qx - wx * qy)
+
+        # rigid body: J^{-1} (tau - w x J w)
+        (j00, j01, j02), (j10, j11, j12), (j20, j21, j22) = self.J
+        hx = j00 * wx + j01 * wy + j02 * wz
+        hy = j10 * wx + j11 * wy + j12 * wz
+        hz = j20 * wx + j21 * wy + j22 * wz
+        rx = tx - (wy * hz - wz * hy)
+        ry = ty - (wz * hx - wx * hz)
+        rz = tz - (wx * hy - wy * hx)
+        if self.J_diag:
+            out[10] = rx / j00
+            out[11] = ry / j11
+            out[12] = rz / j22
+        else:
+            (i00, i01, i02), (i10, i11, i12), (i20, i21, i22) = self.J_inv
+            out[10] = i00 * rx + i01 * ry + i02 * rz
+            out[11] = i10 * rx + i11 * ry + i12 * rz
+            out[12] = i20 * rx + i21 * ry + i22 * rz
+
+        # first-order motors
+        c1, c2, c3, c4 = omega_cmd.tolist()
+        tau_m = self.tau_m
+        out[13] = (c1 - m1) / tau_m
+        out[14] = (c2 - m2) / tau_m
+        out[15] = (c3 - m3) / tau_m
+        out[16] = (c4 - m4) / tau_m
+        return out
+
+
+class FastRK4:
+    """RK4 stepper with preallocated stage buffers; updates x in place.
+
+    ``f(t, x, out)`` must write the derivative into ``out``.
+    """
+
+    def __init__(self, n: int):
+        self.k1 = np.zeros(n, dtype=float)
+        self.k2 = np.zeros(n, dtype=float)
+        self.k3 = np.zeros(n, dtype=float)
+        self.k4 = np.zeros(n, dtype=float)
+        self.xs = np.zeros(n, dtype=float)
+
+    def step(
+        self, f: Callable[[float, Array, Array], Array], t: float, x: Array, dt: float
+    ) -> Array:
+        k1, k2, k3, k4, xs = self.k1, self.k2, self.k3, self.k4, self.xs
+        h2 = 0.5 * dt
+        f(t, x, k1)
+        np.multiply(k1, h2, out=xs)
+        np.add(x, xs, out=xs)
+        f(t + h2, xs, k2)
+        np.multiply(k2, h2, out=xs)
+        np.add(x, xs, out=xs)
+        f(t + h2, xs, k3)
+        np.multiply(k3, dt, out=xs)
+        np.add(x, xs, out=xs)
+        f(t + dt, xs, k4)
+
+        # x += dt/6 * (k1 + 2 k2 + 2 k3 + k4), summed in rk4_step's order
+        np.multiply(k2, 2.0, out=xs)
+        np.add(k1, xs, out=xs)
+        k3 *= 2.0
+        xs += k3
+        xs += k4
+        xs *= dt / 6.0
+        x += xs
+        return x
+
+
+def normalize_quat_inplace(x: Array) -> Array:
+    """In-place counterpart of QuadrotorPlant.post_process."""
+    qw, qx, qy, qz = x[6:10].tolist()
+    n = sqrt(qw * qw + qx * qx + qy * qy + qz * qz)
+    if n < 1e-12:
+        x[6] = 1.0
+        x[7] = x[8] = x[9] = 0.0
+    else:
+        x[6:10] /= n
+    return x
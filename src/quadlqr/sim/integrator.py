@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, replace
 from typing import Callable
 
 import numpy as np
 
+from ..math import dexp_inv, q_exp, q_mul
+
 Array = np.ndarray
 
 
@@ -15,3 +18,273 @@ def rk4_step(
     k3 = f(t + 0.5 * dt, x + 0.5 * dt * k2)
     k4 = f(t + dt, x + dt * k3)
     return x + (dt / 6.0) * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+def rkmk4_step(
+    f: Callable[[float, Array], Array],
+    t: float,
+    x: Array,
+    dt: float,
+    q: slice = slice(6, 10),
+    w: slice = slice(10, 13),
+) -> Array:
+    """Classical RK4 with the attitude advanced on the unit quaternions (RKMK).
+
+    The quaternion x[q] (w, x, y, z; body rate x[w]) is never summed: each
+    stage sets q_i = q0 * exp(theta_i), where theta is integrated in the Lie
+    algebra through ``dexp_inv``; all other components take the usual RK4
+    update and f's quaternion derivative is ignored. The result has unit
+    norm to rounding, so no renormalization is needed.
+    """
+    q0 = x[q]
+    h2 = 0.5 * dt
+
+    def stage(tk: float, theta: Array, y: Array) -> tuple[Array, Array]:
+        y = y.copy()
+        y[q] = q_mul(q0, q_exp(theta))
+        k = f(tk, y)
+        return k, dexp_inv(theta, y[w])
+
+    k1, th1 = stage(t, np.zeros(3), x)
+    k2, th2 = stage(t + h2, h2 * th1, x + h2 * k1)
+    k3, th3 = stage(t + h2, h2 * th2, x + h2 * k2)
+    k4, th4 = stage(t + dt, dt * th3, x + dt * k3)
+    x_new = x + (dt / 6.0) * (k1 + 2 * k2 + 2 * k3 + k4)
+    x_new[q] = q_mul(q0, q_exp((dt / 6.0) * (th1 + 2 * th2 + 2 * th3 + th4)))
+    return x_new
+
+
+Flow = Callable[[float, Array, float], Array]
+
+
+def lie_step(flow_a: Flow, flow_b: Flow, t: float, x: Array, dt: float) -> Array:
+    """First-order (Lie) splitting: full step of A, then full step of B.
+
+    ``flow_a`` / ``flow_b`` advance (t, x) by h for the two sub-problems,
+    exactly or with any one-step scheme.
+    """
+    return flow_b(t, flow_a(t, x, dt), dt)
+
+
+def strang_step(flow_a: Flow, flow_b: Flow, t: float, x: Array, dt: float) -> Array:
+    """Second-order (Strang) splitting: A for dt/2, B for dt, A for dt/2.
+
+    B advances time; the second half-step of A starts from B's end state at
+    t + dt.
+    """
+    x = flow_a(t, x, 0.5 * dt)
+    x = flow_b(t, x, dt)
+    return flow_a(t + dt, x, 0.5 * dt)
+
+
+# Dormand-Prince 5(4) tableau (FSAL), error weights and 4th-order dense output.
+_DP_C = np.array([0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0])
+_DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+)
+_DP_B = np.array([35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84])
+_DP_E = np.array(
+    [
+        71 / 57600,
+        0.0,
+        -71 / 16695,
+        71 / 1920,
+        -17253 / 339200,
+        22 / 525,
+        -1 / 40,
+    ]
+)
+_DP_P = np.array(
+    [
+        [
+            1.0,
+            -8048581381 / 2820520608,
+            8663915743 / 2820520608,
+            -12715105075 / 11282082432,
+        ],
+        [0.0, 0.0, 0.0, 0.0],
+        [
+            0.0,
+            131558114200 / 32700410799,
+            -68118460800 / 10900136933,
+            87487479700 / 32700410799,
+        ],
+        [
+            0.0,
+            -1754552775 / 470086768,
+            14199869525 / 1410260304,
+            -10690763975 / 1880347072,
+        ],
+        [
+            0.0,
+            127303824393 / 49829197408,
+            -318862633887 / 49829197408,
+            701980252875 / 199316789632,
+        ],
+        [0.0, -282668133 / 205662961, 2019193451 / 616988883, -1453857185 / 822651844],
+        [0.0, 40617522 / 29380423, -110615467 / 29380423, 69997945 / 29380423],
+    ]
+)
+
+
+class StepSizeError(RuntimeError):
+    """Raised when the adaptive solver cannot meet its tolerance."""
+
+
+@dataclass
+class StepStats:
+    accepted: int = 0
+    rejected: int = 0
+    nfev: int = 0
+
+
+class DormandPrince45:
+    """Adaptive Dormand-Prince RK5(4) integrator with dense output.
+
+    ``advance_to(t_out)`` steps freely past ``t_out`` (unless ``t_stop`` pins
+    a step boundary, e.g. at a control update) and returns the interpolated
+    state at ``t_out``, so logging on a fixed grid does not shorten steps.
+    ``post_step`` may project accepted states (quaternion normalization); it
+    must leave ``f`` unchanged for FSAL reuse to stay exact.
+
+    Raises StepSizeError instead of spinning when a rejected step shrinks
+    below ``h_min`` or one ``advance_to`` call takes more than ``max_steps``
+    step attempts (e.g. f is non-smooth or noisy in t, so the error estimate
+    never settles).
+    """
+
+    def __init__(
+        self,
+        f: Callable[[float, Array], Array],
+        t0: float,
+        x0: Array,
+        rtol: float = 1e-6,
+        atol: float = 1e-8,
+        h0: float | None = None,
+        h_max: float = np.inf,
+        post_step: Callable[[Array], Array] | None = None,
+        h_min: float = 1e-10,
+        max_steps: int | None = None,
+    ):
+        self.f = f
+        self.rtol = float(rtol)
+        self.atol = float(atol)
+        self.h_max = float(h_max)
+        self.h_min = float(h_min)
+        self.max_steps = max_steps
+        self.post_step = post_step
+        self.stats = StepStats()
+        self.h = 0.0
+        self.reset(t0, x0, h0)
+
+    def _eval(self, t: float, x: Array) -> Array:
+        self.stats.nfev += 1
+        return self.f(t, x)
+
+    def reset(self, t: float, x: Array, h: float | None = None) -> None:
+        """Restart at (t, x), e.g. after a discontinuity in f; keeps h if None."""
+        self.t = float(t)
+        self.x = np.array(x, dtype=float)
+        self.k1 = self._eval(self.t, self.x)
+        if h is not None:
+            self.h = float(h)
+        elif self.h <= 0.0:
+            self.h = self._initial_step()
+        self.t_old = self.t
+        self.x_old = self.x
+        self.K: Array | None = None
+
+    def get_state(self) -> dict:
+        """Copy of everything ``step`` / ``state_at`` depend on (checkpoints)."""
+        return {
+            "t": self.t,
+            "x": self.x.copy(),
+            "k1": self.k1.copy(),
+            "h": self.h,
+            "t_old": self.t_old,
+            "x_old": self.x_old.copy(),
+            "K": None if self.K is None else self.K.copy(),
+            "stats": replace(self.stats),
+        }
+
+    def set_state(self, state: dict) -> None:
+        """Restore a ``get_state`` copy; continuing is then bit-identical."""
+        self.t, self.h, self.t_old = state["t"], state["h"], state["t_old"]
+        self.x, self.k1 = state["x"].copy(), state["k1"].copy()
+        self.x_old = state["x_old"].copy()
+        self.K = None if state["K"] is None else state["K"].copy()
+        self.stats = replace(state["stats"])
+
+    def _initial_step(self) -> float:
+        scale = self.atol + self.rtol * np.abs(self.x)
+        d0 = np.sqrt(np.mean((self.x / scale) ** 2))
+        d1 = np.sqrt(np.mean((self.k1 / scale) ** 2))
+        h = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+        return min(h, self.h_max)
+
+    def step(self, t_stop: float | None = None) -> None:
+        """Take one accepted step, never crossing ``t_stop``."""
+        t, x, h = self.t, self.x, min(self.h, self.h_max)
+        K = np.empty((7, x.shape[0]), dtype=float)
+        K[0] = self.k1
+        rejected = False
+        while True:
+            last = t_stop is not None and t + h >= t_stop - 1e-12 * max(
+                1.0, abs(t_stop)
+            )
+            if last:
+                h = t_stop - t
+            for i in range(1, 6):
+                dx = np.dot(_DP_A[i], K[:i])
+                K[i] = self._eval(t + _DP_C[i] * h, x + h * dx)
+            x_new = x + h * np.dot(_DP_B, K[:6])
+            t_new = t_stop if last else t + h
+            K[6] = self._eval(t_new, x_new)
+
+            scale = self.atol + self.rtol * np.maximum(np.abs(x), np.abs(x_new))
+            err = np.sqrt(np.mean((h * np.dot(_DP_E, K) / scale) ** 2))
+            if err <= 1.0:
+                fac = 10.0 if err == 0.0 else min(10.0, 0.9 * err**-0.2)
+                self.stats.accepted += 1
+                break
+            self.stats.rejected += 1
+            rejected = True
+            h *= max(0.2, 0.9 * err**-0.2)
+            if h < self.h_min:
+                raise StepSizeError(
+                    f"step size {h:.3g} below h_min={self.h_min:g} at t={t:.6g} "
+                    f"(error estimate {err:.3g})"
+                )
+
+        if self.post_step is not None:
+            x_new = self.post_step(x_new)
+        self.t_old, self.x_old, self.K = t, x, K
+        self.t, self.x, self.k1 = t_new, x_new, K[6]
+        # a step shortened to hit t_stop should not shrink the next one
+        self.h = max(h * fac, self.h) if last and not rejected else h * fac
+
+    def state_at(self, t: float) -> Array:
+        """Dense-output state at t within the last accepted step."""
+        if self.K is None or t >= self.t:
+            return self.x.copy()
+        h = self.t - self.t_old
+        theta = (t - self.t_old) / h
+        Q = self.K.T @ _DP_P
+        return self.x_old + h * (Q @ theta ** np.arange(1, 5))
+
+    def advance_to(self, t_out: float, t_stop: float | None = None) -> Array:
+        start = self.stats.accepted + self.stats.rejected
+        while self.t < t_out - 1e-12 * max(1.0, abs(t_out)):
+            self.step(t_stop)
+            tried = self.stats.accepted + self.stats.rejected - start
+            if self.max_steps is not None and tried > self.max_steps:
+                raise StepSizeError(
+                    f"more than max_steps={self.max_steps} step attempts to reach "
+                    f"t={t_out:.6g} (at t={self.t:.6g}, h={self.h:.3g})"
+                )
+        return self.state_at(t_out)
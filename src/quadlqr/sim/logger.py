@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+from collections.abc import Mapping
+
+import numpy as np
+
+Array = np.ndarray
+
+MANIFEST = "manifest.json"
+CHUNKED_FORMAT = "quadlqr-chunked-v1"
+
+
+class NpzLog:
+    """Whole-run in-memory channels written with savez_compressed on close."""
+
+    def __init__(self, base: str, n: int, channels: dict[str, tuple]):
+        self.path = f"{base}.npz"
+        self.data = {
+            name: np.zeros((n, *shape), dtype=float) for name, shape in channels.items()
+        }
+        self.k = 0
+
+    def append(self, **row: Array) -> None:
+        for name, value in row.items():
+            self.data[name][self.k] = value
+        self.k += 1
+
+    def extend(self, **rows: Array) -> None:
+        """Append a block of rows at once (equal lengths per channel)."""
+        m = len(rows["t"])
+        for name, value in rows.items():
+            self.data[name][self.k : self.k + m] = value
+        self.k += m
+
+    def close(self, **extra: Array) -> str:
+        np.savez_compressed(self.path, **self.data, **extra)
+        return self.path
+
+    def abort(self) -> None:
+        """Discard the run (nothing is on disk before close)."""
+        self.data = {}
+
+
+class ChunkedLog:
+    """Streaming per-channel log: ``<base>/<channel>.npy`` + ``manifest.json``.
+
+    Rows are buffered ``chunk`` at a time and appended to each channel file,
+    whose .npy header already carries the full (n, ...) shape, so memory stays
+    bounded by the chunk size. The manifest is rewritten after every flush
+    with the number of rows on disk; a crashed run stays readable up to the
+    last flush via ``load_log``. ``abort`` releases the file handles of a
+    run that failed before ``close``.
+    """
+
+    def __init__(self, base: str, n: int, channels: dict[str, tuple], chunk: int):
+        self.path = base
+        os.makedirs(base, exist_ok=True)
+        self.n = int(n)
+        self.chunk = max(int(chunk), 1)
+        self.rows = 0
+        self.i = 0
+        self.buffers = {
+            name: np.zeros((self.chunk, *shape), dtype=float)
+            for name, shape in channels.items()
+        }
+        self.files = {}
+        self._handles = contextlib.ExitStack()
+        try:
+            for name, shape in channels.items():
+                # owned by the ExitStack, released in close() / abort()
+                f = self._handles.enter_context(
+                    open(os.path.join(base, f"{name}.npy"), "wb")  # noqa: SIM115
+                )
+                np.lib.format.write_array_header_1_0(
+                    f,
+                    {"descr": "<f8", "fortran_order": False, "shape": (self.n, *shape)},
+                )
+                self.files[name] = f
+        except BaseException:
+            self._handles.close()
+            raise
+        self.manifest = {
+            "format": CHUNKED_FORMAT,
+            "n": self.n,
+            "rows": 0,
+            "complete": False,
+            "channels": {
+                name: {
+                    "file": f"{name}.npy",
+                    "shape": [self.n, *shape],
+                    "streamed": True,
+                }
+                for name, shape in channels.items()
+            },
+        }
+        self._write_manifest()
+
+    def append(self, **row: Array) -> None:
+        i = self.i
+        for name, value in row.items():
+            self.buffers[name][i] = value
+        self.i = i + 1
+        if self.i == self.chunk:
+            self.flush()
+
+    def extend(self, **rows: Array) -> None:
+        """Append a block of rows at once (equal lengths per channel)."""
+        self.flush()
+        for name, f in self.files.items():
+            f.write(np.ascontiguousarray(rows[name], dtype=float).tobytes())
+            f.flush()
+        self.rows += len(rows["t"])
+        self._write_manifest()
+
+    def flush(self) -> None:
+        if self.i == 0:
+            return
+        for name, f in self.files.items():
+            f.write(self.buffers[name][: self.i].tobytes())
+            f.flush()
+        self.rows += self.i
+        self.i = 0
+        self._write_manifest()
+
+    def close(self, **extra: Array) -> str:
+        self.flush()
+        self._handles.close()
+        for name, value in extra.items():
+            value = np.asarray(value)
+            np.save(os.path.join(self.path, f"{name}.npy"), value)
+            self.manifest["channels"][name] = {
+                "file": f"{name}.npy",
+                "shape": list(value.shape),
+            }
+        self.manifest["complete"] = self.rows == self.n
+        self._write_manifest()
+        return self.path
+
+    def abort(self) -> None:
+        """Close the channel files; the log stays readable up to the last flush."""
+        self._handles.close()
+
+    def _write_manifest(self) -> None:
+        self.manifest["rows"] = self.rows
+        tmp = os.path.join(self.path, f"{MANIFEST}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+
+
+class NullLog:
+    """Discards every row; for runs that only need online metrics."""
+
+    path = None
+
+    def append(self, **row: Array) -> None:
+        pass
+
+    def extend(self, **rows: Array) -> None:
+        pass
+
+    def close(self, **extra: Array) -> None:
+        return None
+
+    def abort(self) -> None:
+        pass
+
+
+def open_log(fmt: str, base: str, n: int, channels: dict[str, tuple], chunk: int):
+    """Log writer for ``SimConfig.log_format`` ("npz", "chunked" or "none")."""
+    fmt = fmt.lower()
+    if fmt == "none":
+        return NullLog()
+    if fmt == "npz":
+        return NpzLog(base, n, channels)
+    if fmt == "chunked":
+        return ChunkedLog(base, n, channels, chunk)
+    raise ValueError(f"Unknown log format: {fmt}")
+
+
+def _map_rows(path: str, rows: int) -> Array:
+    """Read-only memmap of the first ``rows`` rows of a streamed .npy file.
+
+    Unlike ``np.load(mmap_mode="r")`` this also works while the file is still
+    shorter than the shape in its header (crashed or running simulation).
+    """
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version != (1, 0):
+            raise ValueError(f"Unexpected .npy version {version} in {path}")
+        shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        offset = f.tell()
+    if rows == 0:
+        return np.zeros((0, *shape[1:]), dtype=dtype)
+    return np.memmap(
+        path, dtype=dtype, mode="r", offset=offset, shape=(rows, *shape[1:])
+    )
+
+
+class LazyLog(Mapping):
+    """Read-only view of a chunked log directory.
+
+    Channels are opened with ``mmap_mode="r"`` on first access and cached, so
+    e.g. ``plot_motor_speeds`` only pages in ``t``, ``omega`` and ``omega_cmd``
+    and never touches ``X``. Works anywhere the npz dict is accepted.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self._cache: dict[str, Array] = {}
+
+    def __getitem__(self, name: str) -> Array:
+        if name not in self._cache:
+            meta = self.manifest["channels"][name]
+            file = os.path.join(self.path, meta["file"])
+            rows, n = self.manifest["rows"], self.manifest["n"]
+            if meta.get("streamed") and rows < n:
+                self._cache[name] = _map_rows(file, rows)
+            else:
+                self._cache[name] = np.load(file, mmap_mode="r")
+        return self._cache[name]
+
+    def __iter__(self):
+        return iter(self.manifest["channels"])
+
+    def __len__(self) -> int:
+        return len(self.manifest["channels"])
+
+    @property
+    def files(self) -> list[str]:
+        """Channel names, mirroring ``NpzFile.files``."""
+        return list(self.manifest["channels"])
+
+
+def load_log(path: str, mmap: bool = True) -> Mapping:
+    """Open a run log written by run_case (.npz file or chunked directory).
+
+    Chunked directories are returned as a lazy, memory-mapped ``LazyLog``
+    unless ``mmap=False``, in which case every channel is read into memory.
+    """
+    if not os.path.isdir(path):
+        return dict(np.load(path))
+    log = LazyLog(path)
+    if mmap:
+        return log
+    return {name: np.array(log[name]) for name in log}
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import numpy as np
+
+from .scenarios import Ref
+
+Array = np.ndarray
+
+# Degree-7 (septic) segments: the minimum-snap polynomial between two
+# waypoints with fixed position, velocity, acceleration and jerk at both
+# ends. Waypoint derivatives come from the neighbouring waypoints only, so a
+# waypoint edit changes the boundary data of at most four segments.
+ORDER = 8
+_FACT = np.array([1.0, 1.0, 2.0, 6.0])
+
+
+def _segment_coeffs(T: float, start: Array, end: Array) -> Array:
+    """Power-basis coefficients (8, 3) on tau in [0, T].
+
+    ``start`` / ``end`` are (4, 3): position, velocity, acceleration, jerk.
+    """
+    c = np.zeros((ORDER, 3))
+    c[:4] = start / _FACT[:, None]
+    # rows: d^r/dtau^r of tau^4..tau^7 at tau = T, r = 0..3
+    M = np.zeros((4, 4))
+    for r in range(4):
+        for j, n in enumerate(range(4, 8)):
+            M[r, j] = np.prod(np.arange(n - r + 1, n + 1)) * T ** (n - r)
+    # subtract the contribution of the low-order coefficients at tau = T
+    low = np.zeros((4, 3))
+    for r in range(4):
+        for n in range(r, 4):
+            low[r] += np.prod(np.arange(n - r + 1, n + 1)) * T ** (n - r) * c[n]
+    c[4:] = np.linalg.solve(M, end - low)
+    return c
+
+
+class MinSnapTrajectory:
+    """Piecewise minimum-snap reference through 3D waypoints.
+
+    Usable anywhere a scenario is (``traj(t, cfg)`` with scalar or array t,
+    returning ``Ref``). Segment durations default to distance / ``speed``
+    (at least ``t_min``). The trajectory starts and ends at rest; interior
+    waypoint velocity/acceleration come from the parabola through the
+    waypoint and its two neighbours, jerk is zero.
+
+    Coefficients are kept per segment together with the boundary data they
+    were solved for; ``set_waypoint`` only re-solves segments whose data
+    actually changed (``solves`` counts them). Queries locate their segment
+    in O(1) through a uniform bucket grid over time.
+    """
+
+    def __init__(
+        self,
+        waypoints: Array,
+        durations: Array | None = None,
+        speed: float = 1.0,
+        t_min: float = 0.5,
+        yaw: float = 0.0,
+    ):
+        waypoints = np.array(waypoints, dtype=float)
+        if waypoints.ndim != 2 or waypoints.shape[1] != 3 or len(waypoints) < 2:
+            raise ValueError("waypoints must be (m, 3) with m >= 2")
+        self.waypoints = waypoints
+        self.fixed_durations = durations is not None
+        self.speed = float(speed)
+        self.t_min = float(t_min)
+        self.yaw = float(yaw)
+        if durations is not None:
+            durations = np.array(durations, dtype=float)
+            if durations.shape != (len(waypoints) - 1,) or np.any(durations <= 0):
+                raise ValueError("durations must be (m - 1,) and positive")
+        self.durations = durations
+        self.version = 0
+        self.solves = 0
+        self._bc: list[tuple | None] = [None] * (len(waypoints) - 1)
+        self.coeffs = np.zeros((len(waypoints) - 1, ORDER, 3))
+        self._rebuild()
+
+    @property
+    def duration(self) -> float:
+        return float(self.t_knots[-1])
+
+    def cache_key(self) -> tuple:
+        """The inputs that define the trajectory (for the run cache)."""
+        return (self.waypoints, self.T, self.yaw)
+
+    def set_waypoint(self, i: int, p: Array) -> None:
+        """Move waypoint i and re-solve the segments it influences."""
+        self.waypoints[i] = np.asarray(p, dtype=float)
+        self._rebuild()
+
+    def _segment_durations(self) -> Array:
+        if self.fixed_durations:
+            return self.durations
+        dist = np.linalg.norm(np.diff(self.waypoints, axis=0), axis=1)
+        return np.maximum(dist / self.speed, self.t_min)
+
+    def _waypoint_derivatives(self, T: Array) -> Array:
+        """(m, 4, 3) position/velocity/acceleration/jerk at each waypoint."""
+        P = self.waypoints
+        D = np.zeros((len(P), 4, 3))
+        D[:, 0] = P
+        if len(P) > 2:
+            s = np.diff(P, axis=0) / T[:, None]  # mean velocity per segment
+            T0, T1 = T[:-1, None], T[1:, None]
+            D[1:-1, 1] = (T1 * s[:-1] + T0 * s[1:]) / (T0 + T1)
+            D[1:-1, 2] = 2.0 * (s[1:] - s[:-1]) / (T0 + T1)
+        return D
+
+    def _rebuild(self) -> None:
+        T = self._segment_durations()
+        D = self._waypoint_derivatives(T)
+        for k in range(len(T)):
+            bc = (float(T[k]), D[k].tobytes(), D[k + 1].tobytes())
+            if bc != self._bc[k]:
+                self.coeffs[k] = _segment_coeffs(T[k], D[k], D[k + 1])
+                self._bc[k] = bc
+                self.solves += 1
+        self.T = T.copy()
+        self.t_knots = np.concatenate([[0.0], np.cumsum(T)])
+
+        # bucket width <= shortest segment: each bucket meets at most two
+        # segments, so a lookup is one table read plus one comparison
+        self._width = float(T.min())
+        n_buckets = int(np.ceil(self.t_knots[-1] / self._width)) + 1
+        starts = np.arange(n_buckets) * self._width
+        self._bucket = np.clip(
+            np.searchsorted(self.t_knots, starts, side="right") - 1, 0, len(T) - 1
+        )
+        self.version += 1
+
+    def segment_index(self, t) -> Array:
+        """Segment containing t (clamped to the first/last segment)."""
+        t = np.asarray(t, dtype=float)
+        b = np.clip((t / self._width).astype(int), 0, len(self._bucket) - 1)
+        k = self._bucket[b]
+        k = np.where(
+            (k < len(self.T) - 1) & (t >= self.t_knots[np.minimum(k + 1, len(self.T))]),
+            k + 1,
+            k,
+        )
+        return k
+
+    def __call__(self, t, cfg=None) -> Ref:
+        scalar = np.ndim(t) == 0
+        t = np.clip(np.asarray(t, dtype=float), 0.0, self.t_knots[-1])
+        k = self.segment_index(t)
+        tau = (t - self.t_knots[k])[..., None]
+        c = self.coeffs[k]  # (..., 8, 3)
+
+        # Horner for p, v, a
+        p = c[..., 7, :]
+        v = 7.0 * c[..., 7, :]
+        a = 42.0 * c[..., 7, :]
+        for n in range(6, -1, -1):
+            p = p * tau + c[..., n, :]
+            if n >= 1:
+                v = v * tau + n * c[..., n, :]
+            if n >= 2:
+                a = a * tau + n * (n - 1) * c[..., n, :]
+        yaw = self.yaw if scalar else np.full(t.shape, self.yaw)
+        return Ref(p_d=p, v_d=v, a_ff=a, yaw_d=yaw)
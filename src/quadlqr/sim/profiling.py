@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import numpy as np
+
+Array = np.ndarray
+
+
+class StageTimer:
+    """Cumulative wall time and call counts per simulation stage.
+
+    ``run_case(..., timings=StageTimer())`` wraps each stage callable once at
+    setup (``wrap``); without a timer the plain callables are used, so the
+    instrumentation costs nothing when it is off.
+
+    Stages: reference, controller, mixer, plant.f, motor, rhs (whole
+    closed-loop derivative, inclusive of the former), step (one integrator
+    step, inclusive of its RHS calls), post_process, logging, metrics.
+    ``report`` also derives ``integrator`` = step - rhs, i.e. the RK stage
+    combination / error control itself. On the fast path plant.f also
+    covers the motor derivative.
+    """
+
+    def __init__(self):
+        self.ns: dict[str, int] = {}
+        self.calls: dict[str, int] = {}
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        ns, calls = self.ns, self.calls
+        ns.setdefault(name, 0)
+        calls.setdefault(name, 0)
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            t0 = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                ns[name] += clock() - t0
+                calls[name] += 1
+
+        return timed
+
+    def report(self) -> dict:
+        """{stage: {"seconds", "calls", "us_per_call"}} in insertion order."""
+        out = {
+            name: {
+                "seconds": ns * 1e-9,
+                "calls": self.calls[name],
+                "us_per_call": (
+                    ns * 1e-3 / self.calls[name] if self.calls[name] else 0.0
+                ),
+            }
+            for name, ns in self.ns.items()
+        }
+        if "step" in self.ns and "rhs" in self.ns:
+            calls = self.calls["step"]
+            ns = self.ns["step"] - self.ns["rhs"]
+            out["integrator"] = {
+                "seconds": ns * 1e-9,
+                "calls": calls,
+                "us_per_call": ns * 1e-3 / calls if calls else 0.0,
+            }
+        return out
+
+    def as_arrays(self) -> dict[str, Array]:
+        """Log extras: stage names, cumulative ns and call counts."""
+        names = list(self.ns)
+        return {
+            "timing_stages": np.array(names),
+            "timing_ns": np.array([self.ns[k] for k in names], dtype=np.int64),
+            "timing_calls": np.array([self.calls[k] for k in names], dtype=np.int64),
+        }
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux /proc), else the peak from getrusage."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryTracker:
+    """tracemalloc + RSS sampling for long runs, grouped into phases.
+
+    ``run_case(..., memory=tracker)`` records phase "run_case" and samples
+    every ``interval`` steps; the suite adds a "plotting" phase per case.
+    For each phase ``report`` lists the samples (traced current/peak bytes,
+    RSS) and the ``top`` call sites whose live allocations grew most between
+    the start and the end of the phase.
+    """
+
+    def __init__(self, interval: int = 1000, top: int = 10, frames: int = 1):
+        self.interval = max(int(interval), 1)
+        self.top = int(top)
+        self.frames = int(frames)
+        self.phases: dict[str, dict] = {}
+        self._current: str | None = None
+        self._snapshot = None
+        self._started = False
+
+    def begin(self, phase: str) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started = True
+        self._current = phase
+        self._snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        self.phases[phase] = {"samples": [], "top_sites": []}
+        self.sample(0)
+
+    def sample(self, step: int) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        self.phases[self._current]["samples"].append(
+            {
+                "step": int(step),
+                "traced": current,
+                "traced_peak": peak,
+                "rss": rss_bytes(),
+            }
+        )
+
+    def end(self, step: int | None = None) -> None:
+        phase = self.phases[self._current]
+        if step is not None:
+            self.sample(step)
+        snap = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        stats = snap.compare_to(self._snapshot, "lineno")
+        stats.sort(key=lambda s: s.size_diff, reverse=True)
+        phase["top_sites"] = [
+            {
+                "site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                "size_diff": s.size_diff,
+                "count_diff": s.count_diff,
+            }
+            for s in stats[: self.top]
+        ]
+        self._snapshot = None
+        self._current = None
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def report(self, trace: bool = False) -> dict:
+        """Compact per-phase summary (first/last/peak of the samples); the raw
+        samples are included with ``trace=True``."""
+        out = {}
+        for name, phase in self.phases.items():
+            samples = phase["samples"]
+            out[name] = {
+                "samples": len(samples),
+                "traced_start": samples[0]["traced"] if samples else 0,
+                "traced_end": samples[-1]["traced"] if samples else 0,
+                "traced_peak": max((s["traced_peak"] for s in samples), default=0),
+                "rss_start": samples[0]["rss"] if samples else 0,
+                "rss_end": samples[-1]["rss"] if samples else 0,
+                "rss_max": max((s["rss"] for s in samples), default=0),
+                "top_sites": phase["top_sites"],
+            }
+            if trace:
+                out[name]["trace"] = samples
+        return out
+
+
+def assert_step_allocation_budget(
+    step: Callable[[int], object],
+    budget: float,
+    steps: int = 200,
+    warmup: int = 20,
+) -> float:
+    """Assert that ``step(k)`` allocates at most ``budget`` bytes per call.
+
+    Measures transient traced bytes per call (peak above the pre-call level)
+    averaged over ``steps`` calls after ``warmup``; returns that mean. On
+    failure the message lists the call sites whose live memory grew over the
+    measured steps (leaks / growing buffers), for use in tests of hot loops.
+    """
+    for k in range(warmup):
+        step(k)
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    total, worst, sites = 0, -1, None
+    filters = (*_SNAPSHOT_FILTERS, tracemalloc.Filter(False, __file__))
+    start = tracemalloc.take_snapshot().filter_traces(filters)
+    try:
+        for k in range(warmup, warmup + steps):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            step(k)
+            used = tracemalloc.get_traced_memory()[1] - before
+            total += used
+            worst = max(worst, used)
+        mean = total / steps
+        if mean > budget:
+            snap = tracemalloc.take_snapshot().filter_traces(filters)
+            stats = snap.compare_to(start, "lineno")
+            stats.sort(key=lambda s: s.size_diff, reverse=True)
+            sites = "\n".join(
+                f"  {s.traceback[0].filename}:{s.traceback[0].lineno}: "
+                f"{s.size_diff:+d} B"
+                for s in stats[:5]
+                if s.size_diff > 0
+            )
+    finally:
+        if started:
+            tracemalloc.stop()
+    if sites is not None:
+        raise AssertionError(
+            f"{mean:.0f} B/step allocated (worst {worst} B), budget {budget:.0f} B\n"
+            f"live growth by site:\n{sites or '  none (transient allocations only)'}"
+        )
+    return mean
@@ -1,14 +1,28 @@
 from __future__ import annotations
 
+import copy
 import os
 
 import numpy as np
 
 from ..config import ExperimentConfig
 from ..control import BaselinePID, HierarchicalLQR, Mixer
-from ..dynamics import MotorModel, QuadrotorPlant
+from ..dynamics import MotorModel, QuadrotorPlant, disturbance_table
+from ..metrics import OnlineMetrics
 from ..types import State
-from .integrator import rk4_step
+from .cache import RunCache, run_key
+from .checkpoint import Checkpoint, CheckpointRecorder
+from .fastpath import FastRHS, FastRK4, normalize_quat_inplace
+from .integrator import (
+    DormandPrince45,
+    lie_step,
+    rk4_step,
+    rkmk4_step,
+    strang_step,
+)
+from .logger import load_log, open_log
+from .profiling import MemoryTracker, StageTimer
+from .scenarios import reference_table
 
 Array = np.ndarray
 
@@ -20,121 +34,488 @@ def run_case(
     controller: str,
     t_final: float,
     outdir: str,
-) -> str:
+    metrics: OnlineMetrics | None = None,
+    timings: StageTimer | None = None,
+    memory: MemoryTracker | None = None,
+    cache: RunCache | None = None,
+    checkpoints: CheckpointRecorder | None = None,
+    resume: Checkpoint | None = None,
+) -> str | None:
+    """Simulate one closed-loop case and write its log under ``outdir/logs``.
+
+    Returns the log path (None with ``log_format="none"``). If ``metrics`` is
+    given it is updated every logged step, so metrics are available without
+    reading the log back. If ``timings`` is given, every stage is timed into
+    it and the totals are also stored in the log (``timing_*`` arrays).
+    ``memory`` samples tracemalloc/RSS every ``memory.interval`` steps.
+
+    With a ``cache``, a run whose inputs (config, scenario, controller,
+    horizon, package code) match a stored one is not simulated: the stored
+    log is placed at the usual path and ``metrics`` are replayed from it.
+    Runs with ``timings``/``memory``, without a log, or whose scenario
+    cannot be hashed by content (see ``run_key``) bypass the cache.
+
+    ``checkpoints`` collects a ``Checkpoint`` at each requested time;
+    ``resume`` continues from one (the config may differ, e.g. gains or
+    disturbances, but not the time grid / integrator layout). The resumed
+    log starts with the parent's rows, and with an unchanged config the
+    result is identical to the uninterrupted run. Resuming under the
+    parent's own name continues it in place (the log is rewritten with the
+    prefix).
+    """
     os.makedirs(outdir, exist_ok=True)
-    logdir = os.path.join(outdir, "logs")
-    os.makedirs(logdir, exist_ok=True)
-
-    plant = QuadrotorPlant(cfg.quad, cfg.rotor, cfg.disturb)
-    plant.reset_rng(cfg.disturb.seed)
-
-    motor = MotorModel(cfg.motor.tau)
-    mixer = Mixer(
-        cfg.rotor.kf,
-        cfg.rotor.km,
-        cfg.rotor.arm,
-        cfg.limits.omega_min,
-        cfg.limits.omega_max,
-    )
-
-    lqr = HierarchicalLQR.build(cfg.quad, cfg.lqr, cfg.limits)
-    pid = BaselinePID.build(cfg.quad, cfg.pid, cfg.limits)
-    lqr.reset()
-    pid.reset()
-
-    dt = cfg.sim.dt
-    n = int(np.floor(t_final / dt)) + 1
-    t = np.linspace(0.0, t_final, n)
-
-    # Initial state
-    x0 = State(
-        p=np.array([0.2, -0.2, cfg.traj.hover_z - 0.1], dtype=float),
-        v=np.zeros(3, dtype=float),
-        q=np.array([1.0, 0.0, 0.0, 0.0], dtype=float),
-        omega=np.zeros(3, dtype=float),
-        omega_m=np.ones(4, dtype=float) * 1200.0,
-    ).as_vector()
-
-    X = np.zeros((n, x0.shape[0]), dtype=float)
-    U = np.zeros((n, 4), dtype=float)  # desired wrench [T, tau_x, tau_y, tau_z]
-    OM = np.zeros((n, 4), dtype=float)  # motor speeds
-    OM_CMD = np.zeros((n, 4), dtype=float)
-    P_REF = np.zeros((n, 3), dtype=float)
-    V_REF = np.zeros((n, 3), dtype=float)
-
-    x = x0.copy()
-
-    def closed_loop_rhs(tk: float, xk: Array) -> Array:
-        """Return derivative of full state. We integrate rigid body with plant.f, plus motor dynamics."""
-        st = State.from_vector(xk)
-
-        ref = ref_fn(tk, cfg.traj)
-        ref_dict = {
-            "p_d": ref.p_d,
-            "v_d": ref.v_d,
-            "a_ff": ref.a_ff,
-            "yaw_d": ref.yaw_d,
-        }
+    os.makedirs(os.path.join(outdir, "logs"), exist_ok=True)
+    base = log_base(outdir, name, controller)
+
+    key = None
+    if (
+        cache is not None
+        and timings is None
+        and memory is None
+        and checkpoints is None
+        and resume is None
+        and cfg.sim.log_format.lower() != "none"
+    ):
+        try:
+            key = run_key(cfg, ref_fn, controller, t_final)
+        except TypeError:
+            key = None  # scenario not hashable by content: bypass the cache
+        path = cache.fetch(key, base) if key is not None else None
+        if path is not None:
+            if metrics is not None:
+                _replay_metrics(metrics, load_log(path))
+            return path
+    if memory is not None:
+        memory.begin("run_case")
+    end_step = None
+    log = None
+    try:
+        plant = QuadrotorPlant(cfg.quad, cfg.rotor, cfg.disturb)
+        plant.reset_rng(cfg.disturb.seed)
+        disturb_mode = cfg.disturb.mode.lower()
+        if disturb_mode not in ("online", "table"):
+            raise ValueError(f"Unknown disturbance mode: {cfg.disturb.mode}")
+
+        motor = MotorModel(cfg.motor.tau)
+        mixer = Mixer(
+            cfg.rotor.kf,
+            cfg.rotor.km,
+            cfg.rotor.arm,
+            cfg.limits.omega_min,
+            cfg.limits.omega_max,
+        )
+
+        mode = cfg.sim.control_mode.lower()
+        if mode not in ("stage", "zoh"):
+            raise ValueError(f"Unknown control_mode: {cfg.sim.control_mode}")
+        method = cfg.sim.integrator.lower()
+        if method not in ("rk4", "dopri45", "strang", "lie", "rkmk4"):
+            raise ValueError(f"Unknown integrator: {cfg.sim.integrator}")
+        decim = max(int(cfg.sim.control_decimation), 1) if mode == "zoh" else 1
+        if method == "dopri45" and disturb_mode == "online" and cfg.disturb.level > 0:
+            # fresh noise on every RHS call: the error estimate never settles
+            raise ValueError(
+                'integrator="dopri45" needs a smooth RHS; use disturb.mode="table" '
+                "with disturbances on"
+            )
+
+        dt = cfg.sim.dt
+        dt_ctrl = decim * dt
 
         if controller.lower() == "lqr":
-            wrench = lqr.compute(st, ref_dict, dt)
+            ctrl = HierarchicalLQR.build(cfg.quad, cfg.lqr, cfg.limits, dt=dt_ctrl)
         elif controller.lower() == "pid":
-            wrench = pid.compute(st, ref_dict, dt)
+            ctrl = BaselinePID.build(cfg.quad, cfg.pid, cfg.limits)
         else:
             raise ValueError(f"Unknown controller: {controller}")
+        ctrl.reset()
+        n = int(np.floor(t_final / dt)) + 1
+        if disturb_mode == "table" and cfg.disturb.level > 0:
+            plant.table = disturbance_table(cfg.disturb, dt, t_final)
+        t = np.linspace(0.0, t_final, n)
 
-        # allocation: wrench -> omega_cmd
-        omega_cmd = mixer.allocate(wrench.thrust, wrench.tau)
-
-        # motor derivative
-        domega = motor.deriv(st.omega_m, omega_cmd)
+        ref_mode = cfg.sim.reference.lower()
+        if ref_mode == "table":
+            reference = reference_table(ref_fn, cfg.traj, t_final, n).at
+        elif ref_mode == "online":
 
-        # rigid-body derivative from plant: uses omega_m in state
-        xdot = plant.f(tk, xk)
-        xdot = xdot.copy()
-        xdot[13:17] = domega  # overwrite motor dot (plant uses zeros placeholder)
+            def reference(tk: float):
+                return ref_fn(tk, cfg.traj)
 
-        return xdot
+        else:
+            raise ValueError(f"Unknown reference mode: {cfg.sim.reference}")
 
-    for k in range(n):
-        tk = float(t[k])
-        st = State.from_vector(x)
+        # Initial state
+        x0 = State(
+            p=np.array([0.2, -0.2, cfg.traj.hover_z - 0.1], dtype=float),
+            v=np.zeros(3, dtype=float),
+            q=np.array([1.0, 0.0, 0.0, 0.0], dtype=float),
+            omega=np.zeros(3, dtype=float),
+            omega_m=np.ones(4, dtype=float) * 1200.0,
+        ).as_vector()
 
-        ref = ref_fn(tk, cfg.traj)
-        ref_dict = {
-            "p_d": ref.p_d,
-            "v_d": ref.v_d,
-            "a_ff": ref.a_ff,
-            "yaw_d": ref.yaw_d,
+        channels = {
+            "t": (),
+            "X": (x0.shape[0],),
+            "U": (4,),  # desired wrench [T, tau_x, tau_y, tau_z]
+            "omega": (4,),  # motor speeds
+            "omega_cmd": (4,),
+            "p_ref": (3,),
+            "v_ref": (3,),
         }
+        # read the parent's rows before open_log: resuming under the parent's
+        # own name reopens (truncates) the very files the prefix comes from
+        prefix = None
+        if resume is not None and (
+            cfg.sim.log_format.lower() != "none" or metrics is not None
+        ):
+            prefix = resume.prefix()
+        log = open_log(
+            cfg.sim.log_format,
+            base,
+            n,
+            channels,
+            cfg.sim.log_chunk,
+        )
 
-        # compute controller output for logging
-        if controller.lower() == "lqr":
-            wrench = lqr.compute(st, ref_dict, dt)
-        else:
-            wrench = pid.compute(st, ref_dict, dt)
-        omega_cmd = mixer.allocate(wrench.thrust, wrench.tau)
-
-        X[k, :] = x
-        U[k, :] = wrench.as_vector()
-        OM[k, :] = st.omega_m
-        OM_CMD[k, :] = omega_cmd
-        P_REF[k, :] = ref.p_d
-        V_REF[k, :] = ref.v_d
-
-        if k < n - 1:
-            x = rk4_step(closed_loop_rhs, tk, x, dt)
-            x = plant.post_process(x)
-
-    path = os.path.join(logdir, f"{name}__{controller}.npz")
-    np.savez_compressed(
-        path,
-        t=t,
-        X=X,
-        U=U,
-        omega=OM,
-        omega_cmd=OM_CMD,
-        p_ref=P_REF,
-        v_ref=V_REF,
-    )
+        x = x0.copy()
+
+        # per-stage instrumentation: wrap once here, nothing to pay when off
+        def timed(name: str, fn):
+            return fn if timings is None else timings.wrap(name, fn)
+
+        reference = timed("reference", reference)
+        compute = timed("controller", ctrl.compute)
+        allocate = timed("mixer", mixer.allocate)
+        plant_f = timed("plant.f", plant.f)
+        motor_deriv = timed("motor", motor.deriv)
+        post_process = timed("post_process", plant.post_process)
+        normalize_quat = timed("post_process", normalize_quat_inplace)
+        log_append = timed("logging", log.append)
+        metrics_update = (
+            timed("metrics", metrics.update) if metrics is not None else None
+        )
+        rk4 = timed("step", rk4_step)
+        rkmk4 = timed("step", rkmk4_step)
+
+        def control(tk: float, st: State, dt_c: float):
+            """Reference -> controller -> mixer at tk.
+
+            Returns (ref, wrench, omega_cmd).
+            """
+            ref = reference(tk)
+            ref_dict = {
+                "p_d": ref.p_d,
+                "v_d": ref.v_d,
+                "a_ff": ref.a_ff,
+                "yaw_d": ref.yaw_d,
+            }
+            wrench = compute(st, ref_dict, dt_c)
+
+            # allocation: wrench -> omega_cmd
+            omega_cmd = allocate(wrench.thrust, wrench.tau)
+            return ref, wrench, omega_cmd
+
+        def closed_loop_rhs(tk: float, xk: Array) -> Array:
+            """Return derivative of full state.
+
+            We integrate rigid body with plant.f, plus motor dynamics.
+            """
+            st = State.from_vector(xk)
+            _, _, omega_cmd = control(tk, st, dt)
+
+            # motor derivative
+            domega = motor_deriv(st.omega_m, omega_cmd)
+
+            # rigid-body derivative from plant: uses omega_m in state
+            xdot = plant_f(tk, xk)
+            xdot = xdot.copy()
+            xdot[13:17] = domega  # overwrite motor dot (plant uses zeros placeholder)
+
+            return xdot
+
+        def held_rhs(tk: float, xk: Array) -> Array:
+            """Closed-loop derivative with omega_cmd held from the last control sample."""
+            xdot = plant_f(tk, xk)
+            xdot[13:17] = motor_deriv(xk[13:17], omega_cmd)
+            return xdot
+
+        rhs = timed("rhs", closed_loop_rhs if mode == "stage" else held_rhs)
+
+        # Operator splitting. Motor sub-flow: rigid body frozen, so omega_cmd is
+        # constant (re-evaluated at the frozen state in stage mode, held in zoh
+        # mode) and omega_m follows its exact exponential. Body sub-flow: RK4
+        # with omega_m frozen (plant.f leaves it unchanged). The stiff motor no
+        # longer bounds dt. In stage mode both act on z = [x, integ_ep] like
+        # adaptive stage mode below: the integrator is ODE state advanced by the
+        # body flow, not bumped by the controller calls.
+        motor_flow = timed("motor", motor.flow)
+        split = {"strang": strang_step, "lie": lie_step}.get(method)
+
+        def motor_sub(tk: float, xk: Array, h: float) -> Array:
+            cmd = omega_cmd
+            if mode == "stage":
+                ctrl.integ_ep = np.clip(xk[17:], -integ_limit, integ_limit)
+                cmd = control(tk, State.from_vector(xk[:17]), 0.0)[2]
+            xk = xk.copy()
+            xk[13:17] = motor_flow(xk[13:17], cmd, h)
+            return xk
+
+        def body_rhs(tk: float, z: Array) -> Array:
+            zdot = np.empty_like(z)
+            zdot[:17] = plant_f(tk, z[:17])
+            zdot[17:] = integ_rate(z[0:3] - reference(tk).p_d, z[17:])
+            return zdot
+
+        def body_sub(tk: float, xk: Array, h: float) -> Array:
+            return rk4_step(body_rhs if mode == "stage" else plant_f, tk, xk, h)
+
+        if split is not None:
+            split = timed("step", split)
+
+        # Adaptive stage mode: the position integrator becomes ODE state z[17:20]
+        # (d/dt integ_ep = ep, frozen at the clip limit) instead of being bumped
+        # once per RHS call, so steps may span many log samples.
+        integ_limit = ctrl.cfg.integ_limit
+        use_integral = getattr(ctrl.cfg, "use_pos_integral", True)
+
+        def integral_rhs(tk: float, z: Array) -> Array:
+            xk, integ = z[:17], z[17:]
+            st = State.from_vector(xk)
+            ctrl.integ_ep = np.clip(integ, -integ_limit, integ_limit)
+            ref, _, omega_cmd = control(tk, st, 0.0)
+
+            zdot = np.empty_like(z)
+            zdot[:17] = plant_f(tk, xk)
+            zdot[13:17] = motor_deriv(st.omega_m, omega_cmd)
+            zdot[17:] = integ_rate(st.p - ref.p_d, integ)
+            return zdot
+
+        def integ_rate(ep: Array, integ: Array) -> Array:
+            """d/dt integ_ep: the position error, frozen at the clip limit."""
+            if not use_integral:
+                return np.zeros(3)
+            ep = ep.copy()
+            ep[
+                ((integ >= integ_limit) & (ep > 0))
+                | ((integ <= -integ_limit) & (ep < 0))
+            ] = 0.0
+            return ep
+
+        def normalize_z(z: Array) -> Array:
+            z[:17] = post_process(z[:17])
+            return z
+
+        # Fast path (rk4): derivatives go into preallocated buffers, x is updated
+        # in place; the controller still runs through the regular objects.
+        fast = FastRHS(plant, motor) if cfg.sim.fast_path and method == "rk4" else None
+        stepper = FastRK4(x.shape[0]) if fast is not None else None
+        if fast is not None:
+            fast = timed("plant.f", fast)
+            stepper_step = timed("step", stepper.step)
+
+        def fast_rhs(tk: float, xk: Array, out: Array) -> Array:
+            if mode == "stage":
+                return fast(tk, xk, control(tk, State.from_vector(xk), dt)[2], out)
+            return fast(tk, xk, omega_cmd, out)
+
+        fast_rhs = timed("rhs", fast_rhs)
+        integral_rhs = timed("rhs", integral_rhs)
+
+        solver = None
+        z = None  # stage mode [x, integ_ep] for dopri45 / strang / lie
+        if split is not None and mode == "stage":
+            z = np.concatenate([x, ctrl.integ_ep])
+        if method == "dopri45" and mode == "stage":
+            z = np.concatenate([x, ctrl.integ_ep])
+            solver = DormandPrince45(
+                integral_rhs,
+                0.0,
+                z,
+                rtol=cfg.sim.rtol,
+                atol=cfg.sim.atol,
+                h_min=cfg.sim.h_min,
+                max_steps=cfg.sim.max_steps,
+                h0=dt,
+                post_step=normalize_z,
+            )
+            advance_to = timed("step", solver.advance_to)
+
+        layout = (mode, method, decim, fast is not None)
+        k0 = 0
+        if resume is not None:
+            if (
+                resume.n != n
+                or resume.t != float(t[resume.k])
+                or resume.layout != layout
+            ):
+                raise ValueError(
+                    "Checkpoint does not match this run's time grid / integrator layout"
+                )
+            k0 = resume.k
+            x = resume.x.copy()
+            ctrl.integ_ep = resume.integ_ep.copy()
+            if resume.held is not None:
+                ref, wrench, omega_cmd = (
+                    resume.held["ref"],
+                    resume.held["wrench"],
+                    resume.held["omega_cmd"],
+                )
+            if resume.solver is not None:
+                if solver is None:
+                    solver = DormandPrince45(
+                        rhs,
+                        t[k0],
+                        x,
+                        rtol=cfg.sim.rtol,
+                        atol=cfg.sim.atol,
+                        h_min=cfg.sim.h_min,
+                        max_steps=cfg.sim.max_steps,
+                        post_step=post_process,
+                    )
+                    advance_to = timed("step", solver.advance_to)
+                solver.set_state(resume.solver)
+            if resume.z is not None:
+                z = resume.z.copy()
+            # last: building the solver above may have drawn noise
+            plant.rng.bit_generator.state = resume.rng
+            if log.path is not None:
+                log.extend(**prefix)
+            if metrics is not None:
+                _replay_metrics(metrics, prefix)
+
+        ckpt_steps = checkpoints.steps(t) if checkpoints is not None else ()
+
+        for k in range(k0, n):
+            tk = float(t[k])
+            if k in ckpt_steps:
+                checkpoints.saved.append(
+                    Checkpoint(
+                        k=k,
+                        t=tk,
+                        n=n,
+                        layout=layout,
+                        x=x.copy(),
+                        integ_ep=np.array(ctrl.integ_ep, dtype=float),
+                        rng=copy.deepcopy(plant.rng.bit_generator.state),
+                        held=(
+                            {
+                                "ref": ref,
+                                "wrench": wrench,
+                                "omega_cmd": omega_cmd.copy(),
+                            }
+                            if mode == "zoh" and k > 0
+                            else None
+                        ),
+                        solver=solver.get_state() if solver is not None else None,
+                        z=z.copy() if z is not None else None,
+                    )
+                )
+            st = State.from_vector(x)
+
+            if z is not None:
+                # log only; the integrator state comes from the ODE solution
+                ctrl.integ_ep = np.clip(z[17:], -integ_limit, integ_limit)
+                ref, wrench, omega_cmd = control(tk, st, 0.0)
+            elif mode == "stage":
+                # compute controller output for logging
+                ref, wrench, omega_cmd = control(tk, st, dt)
+            elif k % decim == 0:
+                # sample-and-hold: one controller evaluation per control period
+                ref, wrench, omega_cmd = control(tk, st, dt_ctrl)
+                if method == "dopri45":
+                    # f jumps with the new omega_cmd: restart the adaptive solver
+                    if solver is None:
+                        solver = DormandPrince45(
+                            rhs,
+                            tk,
+                            x,
+                            rtol=cfg.sim.rtol,
+                            atol=cfg.sim.atol,
+                            h_min=cfg.sim.h_min,
+                            max_steps=cfg.sim.max_steps,
+                            h0=dt_ctrl,
+                            post_step=post_process,
+                        )
+                        advance_to = timed("step", solver.advance_to)
+                    else:
+                        solver.reset(tk, x)
+            else:
+                ref = reference(tk)
+
+            u = wrench.as_vector()
+            log_append(
+                t=tk,
+                X=x,
+                U=u,
+                omega=st.omega_m,
+                omega_cmd=omega_cmd,
+                p_ref=ref.p_d,
+                v_ref=ref.v_d,
+            )
+            if metrics is not None:
+                metrics_update(tk, x[0:3], ref.p_d, u)
+
+            if memory is not None and k % memory.interval == 0 and k > 0:
+                memory.sample(k)
+
+            if k < n - 1:
+                t_next = float(t[k + 1])
+                if stepper is not None:
+                    stepper_step(fast_rhs, tk, x, dt)
+                    normalize_quat(x)
+                elif split is not None and z is not None:
+                    z = normalize_z(split(motor_sub, body_sub, tk, z, dt))
+                    x = z[:17].copy()
+                elif split is not None:
+                    x = split(motor_sub, body_sub, tk, x, dt)
+                    x = post_process(x)
+                elif method == "rkmk4":
+                    # unit quaternion by construction: no post_process
+                    x = rkmk4(rhs, tk, x, dt)
+                elif solver is None:
+                    x = rk4(rhs, tk, x, dt)
+                    x = post_process(x)
+                elif mode == "stage":
+                    z = advance_to(t_next)
+                    x = post_process(z[:17])
+                else:
+                    t_stop = float(t[min((k // decim + 1) * decim, n - 1)])
+                    x = post_process(advance_to(t_next, t_stop))
+
+        extra = {}
+        if solver is not None:
+            stats = solver.stats
+            extra["solver_stats"] = np.array(
+                [stats.accepted, stats.rejected, stats.nfev]
+            )
+        if timings is not None:
+            extra.update(timings.as_arrays())
+
+        path = log.close(**extra)
+        end_step = n
+    except BaseException:
+        # release open channel files; a chunked log keeps its flushed rows
+        if log is not None:
+            log.abort()
+        raise
+    finally:
+        # also on failure: never leave tracemalloc running in the process
+        if memory is not None:
+            memory.end(end_step)
+    if checkpoints is not None:
+        checkpoints.finish(path)
+    if key is not None:
+        cache.store(key, path, base, name=name, controller=controller)
     return path
+
+
+def log_base(outdir: str, name: str, controller: str) -> str:
+    """Log path of a run without its format suffix (``.npz`` or none)."""
+    return os.path.join(outdir, "logs", f"{name}__{controller}")
+
+
+def _replay_metrics(metrics: OnlineMetrics, log) -> None:
+    """Feed logged rows to ``metrics`` as if they had been simulated."""
+    for tk, xk, pk, uk in zip(log["t"], log["X"], log["p_ref"], log["U"], strict=True):
+        metrics.update(float(tk), xk[0:3], pk, uk)
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, fields
 
 import numpy as np
 
 from ..config import TrajConfig
 
+Array = np.ndarray
+
+# Scenarios take a scalar time (-> (3,) arrays, float yaw) or an array of n
+# times (-> (n, 3) arrays, (n,) yaw) and evaluate all samples in one pass.
+
 
 @dataclass(frozen=True)
 class Ref:
@@ -15,24 +22,165 @@ class Ref:
     yaw_d: float = 0.0
 
 
-def hover(t: float, cfg: TrajConfig) -> Ref:
-    p = np.array([0.0, 0.0, cfg.hover_z], dtype=float)
-    return Ref(p_d=p, v_d=np.zeros(3), a_ff=np.zeros(3), yaw_d=0.0)
+def _const(t: Array, value: float) -> Array:
+    return np.full(t.shape, value, dtype=float)
+
+
+def _yaw(t: Array, value: float = 0.0) -> Array:
+    return _const(t, value)
+
+
+def hover(t, cfg: TrajConfig) -> Ref:
+    if np.ndim(t) == 0:
+        p = np.array([0.0, 0.0, cfg.hover_z], dtype=float)
+        return Ref(p_d=p, v_d=np.zeros(3), a_ff=np.zeros(3), yaw_d=0.0)
+    t = np.asarray(t, dtype=float)
+    p = np.stack([_const(t, 0.0), _const(t, 0.0), _const(t, cfg.hover_z)], axis=-1)
+    return Ref(p_d=p, v_d=np.zeros(p.shape), a_ff=np.zeros(p.shape), yaw_d=_yaw(t))
 
 
-def line(t: float, cfg: TrajConfig) -> Ref:
+def line(t, cfg: TrajConfig) -> Ref:
     v = cfg.line_v
-    p = np.array([v * t, 0.0, cfg.hover_z], dtype=float)
-    v_d = np.array([v, 0.0, 0.0], dtype=float)
-    return Ref(p_d=p, v_d=v_d, a_ff=np.zeros(3), yaw_d=0.0)
+    if np.ndim(t) == 0:
+        p = np.array([v * t, 0.0, cfg.hover_z], dtype=float)
+        v_d = np.array([v, 0.0, 0.0], dtype=float)
+        return Ref(p_d=p, v_d=v_d, a_ff=np.zeros(3), yaw_d=0.0)
+    t = np.asarray(t, dtype=float)
+    p = np.stack([v * t, _const(t, 0.0), _const(t, cfg.hover_z)], axis=-1)
+    v_d = np.stack([_const(t, v), _const(t, 0.0), _const(t, 0.0)], axis=-1)
+    return Ref(p_d=p, v_d=v_d, a_ff=np.zeros(p.shape), yaw_d=_yaw(t))
 
 
-def circle(t: float, cfg: TrajConfig) -> Ref:
+def circle(t, cfg: TrajConfig) -> Ref:
     r = cfg.circle_r
     w = cfg.circle_omega
-    p = np.array([r * np.cos(w * t), r * np.sin(w * t), cfg.circle_z], dtype=float)
-    v_d = np.array([-r * w * np.sin(w * t), r * w * np.cos(w * t), 0.0], dtype=float)
-    a_ff = np.array(
-        [-r * w * w * np.cos(w * t), -r * w * w * np.sin(w * t), 0.0], dtype=float
+    if np.ndim(t) == 0:
+        p = np.array([r * np.cos(w * t), r * np.sin(w * t), cfg.circle_z], dtype=float)
+        v_d = np.array(
+            [-r * w * np.sin(w * t), r * w * np.cos(w * t), 0.0], dtype=float
+        )
+        a_ff = np.array(
+            [-r * w * w * np.cos(w * t), -r * w * w * np.sin(w * t), 0.0], dtype=float
+        )
+        return Ref(p_d=p, v_d=v_d, a_ff=a_ff, yaw_d=0.0)
+    t = np.asarray(t, dtype=float)
+    c, s = np.cos(w * t), np.sin(w * t)
+    p = np.stack([r * c, r * s, _const(t, cfg.circle_z)], axis=-1)
+    v_d = np.stack([-r * w * s, r * w * c, _const(t, 0.0)], axis=-1)
+    a_ff = np.stack([-r * w * w * c, -r * w * w * s, _const(t, 0.0)], axis=-1)
+    return Ref(p_d=p, v_d=v_d, a_ff=a_ff, yaw_d=_yaw(t))
+
+
+def evaluate(ref_fn: Callable, t: Array, cfg: TrajConfig) -> Ref:
+    """Vectorized ``ref_fn`` over a time array; loops if ref_fn is scalar-only."""
+    t = np.asarray(t, dtype=float)
+    try:
+        ref = ref_fn(t, cfg)
+    except (TypeError, ValueError):
+        ref = None
+    if ref is not None and np.shape(ref.p_d) == (*t.shape, 3):
+        yaw = np.broadcast_to(np.asarray(ref.yaw_d, dtype=float), t.shape)
+        return Ref(ref.p_d, ref.v_d, ref.a_ff, np.array(yaw))
+    refs = [ref_fn(float(tk), cfg) for tk in t.ravel()]
+    return Ref(
+        p_d=np.array([r.p_d for r in refs], dtype=float).reshape(*t.shape, 3),
+        v_d=np.array([r.v_d for r in refs], dtype=float).reshape(*t.shape, 3),
+        a_ff=np.array([r.a_ff for r in refs], dtype=float).reshape(*t.shape, 3),
+        yaw_d=np.array([r.yaw_d for r in refs], dtype=float).reshape(t.shape),
+    )
+
+
+class ReferenceTable:
+    """Reference sampled once on the simulation grid t_k = k * h.
+
+    Rows are stored for every grid time and every midpoint t_k + h / 2, so
+    the log samples and all fixed-step RK4 stages are plain lookups of exact
+    scenario values. Other times (adaptive steps) interpolate inside the
+    step: cubic Hermite for p_d (using v_d) and v_d (using a_ff), linear for
+    a_ff and yaw_d.
+    """
+
+    def __init__(self, ref_fn: Callable, cfg: TrajConfig, t_final: float, n: int):
+        self.n = int(n)
+        self.h = t_final / (n - 1) if n > 1 else 1.0
+        t = np.linspace(0.0, t_final, self.n)
+        ref = evaluate(ref_fn, t, cfg)
+        mid = evaluate(ref_fn, t[:-1] + 0.5 * self.h, cfg)
+        self.p, self.v, self.a = ref.p_d, ref.v_d, ref.a_ff
+        self.yaw = ref.yaw_d.tolist()
+        self.mid = mid
+        self.mid_yaw = mid.yaw_d.tolist()
+        for arr in (ref.p_d, ref.v_d, ref.a_ff, mid.p_d, mid.v_d, mid.a_ff):
+            arr.setflags(write=False)
+
+    def step(self, k: int) -> Ref:
+        """Row k (t = k * h) as views into the table."""
+        return Ref(p_d=self.p[k], v_d=self.v[k], a_ff=self.a[k], yaw_d=self.yaw[k])
+
+    def at(self, t: float) -> Ref:
+        s = t / self.h
+        j = round(2.0 * s)
+        if abs(2.0 * s - j) < 1e-9 and 0 <= j < 2 * self.n - 1:
+            k = j // 2
+            if not j & 1:
+                return self.step(k)
+            mid = self.mid
+            return Ref(
+                p_d=mid.p_d[k], v_d=mid.v_d[k], a_ff=mid.a_ff[k], yaw_d=self.mid_yaw[k]
+            )
+        k = min(max(int(s), 0), self.n - 2)
+        u = s - k
+        h = self.h
+        p0, p1, v0, v1, a0, a1 = (
+            self.p[k],
+            self.p[k + 1],
+            self.v[k],
+            self.v[k + 1],
+            self.a[k],
+            self.a[k + 1],
+        )
+        # cubic Hermite basis on [0, 1]
+        u2, u3 = u * u, u * u * u
+        h00, h10 = 2 * u3 - 3 * u2 + 1, u3 - 2 * u2 + u
+        h01, h11 = -2 * u3 + 3 * u2, u3 - u2
+        return Ref(
+            p_d=h00 * p0 + h10 * h * v0 + h01 * p1 + h11 * h * v1,
+            v_d=h00 * v0 + h10 * h * a0 + h01 * v1 + h11 * h * a1,
+            a_ff=a0 + u * (a1 - a0),
+            yaw_d=self.yaw[k] + u * (self.yaw[k + 1] - self.yaw[k]),
+        )
+
+
+def _freeze(value):
+    if isinstance(value, np.ndarray):
+        return (value.shape, tuple(value.ravel().tolist()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+_TABLES: OrderedDict[tuple, ReferenceTable] = OrderedDict()
+_TABLES_MAX = 16
+
+
+def reference_table(
+    ref_fn: Callable, cfg: TrajConfig, t_final: float, n: int
+) -> ReferenceTable:
+    """Cached ``ReferenceTable``, shared by every controller run on the same
+    scenario, trajectory config and time grid within a process."""
+    key = (
+        ref_fn,
+        getattr(ref_fn, "version", None),  # mutable scenarios (MinSnapTrajectory)
+        tuple((f.name, _freeze(getattr(cfg, f.name))) for f in fields(cfg)),
+        float(t_final),
+        int(n),
     )
-    return Ref(p_d=p, v_d=v_d, a_ff=a_ff, yaw_d=0.0)
+    table = _TABLES.get(key)
+    if table is None:
+        table = ReferenceTable(ref_fn, cfg, t_final, n)
+        _TABLES[key] = table
+        if len(_TABLES) > _TABLES_MAX:
+            _TABLES.popitem(last=False)
+    else:
+        _TABLES.move_to_end(key)
+    return table
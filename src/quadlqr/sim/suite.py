@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import copy
+import json
+import os
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from ..config import ExperimentConfig
+from ..metrics import compute_metrics
+from ..plotting import (
+    plot_hover_errors,
+    plot_inputs,
+    plot_motor_speeds,
+    plot_traj_xy,
+    plot_traj_xy_compare,
+)
+from . import scenarios
+from .cache import RunCache
+from .checkpoint import Checkpoint
+from .logger import load_log
+from .profiling import MemoryTracker
+from .runner import log_base, run_case
+
+
+@dataclass(frozen=True)
+class Case:
+    """One simulation of the suite: scenario x controller x config overrides.
+
+    ``scenario`` is a function from ``quadlqr.sim.scenarios`` (or its name).
+    ``overrides`` maps dotted config paths to values, e.g.
+    ``{"sim.dt": 0.005, "disturb.level": 1}``. ``t_final`` defaults to
+    ``cfg.sim.t_<scenario>``. ``plots`` names per-case figures out of
+    "hover_errors", "traj_xy", "inputs" and "motor_speeds".
+    """
+
+    name: str
+    scenario: Callable | str
+    controller: str
+    t_final: float | None = None
+    overrides: dict = field(default_factory=dict)
+    plots: tuple[str, ...] = ("inputs", "motor_speeds")
+    tag: str | None = None
+    title: str = ""
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}__{self.controller}"
+
+    @property
+    def fig_tag(self) -> str:
+        return self.tag or f"{self.name}__{self.controller.upper()}"
+
+
+@dataclass(frozen=True)
+class Compare:
+    """XY comparison figure of two finished cases (``Case.key`` of each)."""
+
+    lqr: str
+    pid: str
+    tag: str
+    title: str = "Circle Tracking Comparison (XY)"
+
+
+def apply_overrides(cfg: ExperimentConfig, overrides: dict) -> ExperimentConfig:
+    """Return a deep copy of ``cfg`` with dotted-path overrides applied."""
+    cfg = copy.deepcopy(cfg)
+    for path, value in overrides.items():
+        *parents, attr = path.split(".")
+        obj = cfg
+        for p in parents:
+            obj = getattr(obj, p)
+        if not hasattr(obj, attr):
+            raise AttributeError(f"Unknown config field: {path}")
+        setattr(obj, attr, value)
+    return cfg
+
+
+def _resolve_scenario(scenario: Callable | str) -> Callable:
+    if callable(scenario):
+        return scenario
+    fn = getattr(scenarios, scenario, None)
+    if fn is None or not callable(fn):
+        raise ValueError(f"Unknown scenario: {scenario}")
+    return fn
+
+
+def run_one(
+    case: Case,
+    cfg: ExperimentConfig,
+    outdir: str,
+    figdir: str,
+    memory_interval: int = 0,
+    cache: RunCache | None = None,
+) -> dict:
+    """Simulate one case, plot its figures and return its metrics row.
+
+    ``memory_interval > 0`` tracks tracemalloc/RSS every that many steps and
+    per plot; the summary is returned under "memory". ``cache`` is passed on
+    to ``run_case``.
+    """
+    ref_fn = _resolve_scenario(case.scenario)
+    cfg = apply_overrides(cfg, case.overrides)
+    t_final = case.t_final
+    if t_final is None and hasattr(ref_fn, "duration"):
+        t_final = ref_fn.duration
+    elif t_final is None:
+        t_final = getattr(cfg.sim, f"t_{ref_fn.__name__}")
+
+    memory = MemoryTracker(memory_interval) if memory_interval > 0 else None
+    path = run_case(
+        cfg,
+        case.name,
+        ref_fn,
+        case.controller,
+        t_final,
+        outdir,
+        memory=memory,
+        cache=cache,
+    )
+    npz = load_log(path)
+    row = {
+        "exp": case.name,
+        "controller": case.controller.upper(),
+        **compute_metrics(npz),
+    }
+
+    if memory is not None:
+        memory.begin("plotting")
+    for i, plot in enumerate(case.plots):
+        if plot == "hover_errors":
+            plot_hover_errors(npz, figdir, case.fig_tag)
+        elif plot == "traj_xy":
+            plot_traj_xy(npz, figdir, case.fig_tag, case.title)
+        elif plot == "inputs":
+            plot_inputs(npz, figdir, case.fig_tag)
+        elif plot == "motor_speeds":
+            plot_motor_speeds(npz, figdir, case.fig_tag)
+        else:
+            raise ValueError(f"Unknown plot: {plot}")
+        if memory is not None:
+            memory.sample(i + 1)
+    if memory is not None:
+        memory.end()
+        return {"row": row, "path": path, "memory": memory.report()}
+    return {"row": row, "path": path}
+
+
+def run_compare(cmp: Compare, path_lqr: str, path_pid: str, figdir: str) -> str:
+    return plot_traj_xy_compare(
+        npz_lqr=load_log(path_lqr),
+        npz_pid=load_log(path_pid),
+        outdir=figdir,
+        tag=cmp.tag,
+        title=cmp.title,
+    )
+
+
+def run_suite(
+    cases: Sequence[Case],
+    outdir: str,
+    cfg: ExperimentConfig | None = None,
+    compares: Sequence[Compare] = (),
+    jobs: int | None = 1,
+    memory_interval: int = 0,
+    cache: RunCache | None = None,
+) -> list[dict]:
+    """Run independent cases across ``jobs`` worker processes.
+
+    Comparison figures are submitted as soon as both of their inputs have
+    finished. Metrics rows are written to ``outdir/metrics.json`` in case
+    order. ``jobs=1`` runs everything in-process; ``None`` uses all CPUs.
+    With ``memory_interval > 0`` a per-case memory report is written to
+    ``outdir/memory.json``. With a ``cache``, unchanged cases reuse stored
+    logs instead of being simulated again.
+    """
+    if cfg is None:
+        cfg = ExperimentConfig()
+    keys = [c.key for c in cases]
+    if len(set(keys)) != len(keys):
+        raise ValueError("Duplicate case name/controller in suite")
+    for cmp in compares:
+        for k in (cmp.lqr, cmp.pid):
+            if k not in keys:
+                raise ValueError(f"Comparison input is not a suite case: {k}")
+
+    figdir = os.path.join(outdir, "figs")
+    os.makedirs(outdir, exist_ok=True)
+    os.makedirs(figdir, exist_ok=True)
+
+    results: dict[str, dict] = {}
+    if jobs == 1:
+        for case in cases:
+            results[case.key] = run_one(
+                case, cfg, outdir, figdir, memory_interval, cache
+            )
+        for cmp in compares:
+            run_compare(cmp, results[cmp.lqr]["path"], results[cmp.pid]["path"], figdir)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            pending: dict[Future, str] = {
+                pool.submit(
+                    run_one, case, cfg, outdir, figdir, memory_interval, cache
+                ): case.key
+                for case in cases
+            }
+            waiting = list(compares)
+            followups: list[Future] = []
+            for fut in as_completed(pending):
+                results[pending[fut]] = fut.result()
+                for cmp in [
+                    c for c in waiting if c.lqr in results and c.pid in results
+                ]:
+                    waiting.remove(cmp)
+                    followups.append(
+                        pool.submit(
+                            run_compare,
+                            cmp,
+                            results[cmp.lqr]["path"],
+                            results[cmp.pid]["path"],
+                            figdir,
+                        )
+                    )
+            for fut in followups:
+                fut.result()
+
+    rows = [results[k]["row"] for k in keys]
+    with open(os.path.join(outdir, "metrics.json"), "w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=2)
+    if memory_interval > 0:
+        report = {k: results[k]["memory"] for k in keys}
+        with open(os.path.join(outdir, "memory.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return rows
+
+
+def run_forks(
+    checkpoint: Checkpoint,
+    variants: Mapping[str, ExperimentConfig],
+    ref_fn: Callable,
+    controller: str,
+    t_final: float,
+    outdir: str,
+    jobs: int | None = 1,
+) -> dict[str, str | None]:
+    """Continue ``checkpoint`` once per variant config, in parallel.
+
+    ``variants`` maps run names to configs (e.g. the parent config with a
+    fault or retuned gains); every continuation starts from the shared
+    prefix instead of re-simulating it. Returns {name: log path}.
+
+    Variant names must not collide with the parent run (same ``outdir`` and
+    controller): that fork would overwrite the log the others read their
+    prefix from. Such a name raises ValueError.
+    """
+    if checkpoint.log_path is not None:
+        parent = os.path.abspath(checkpoint.log_path)
+        for name in variants:
+            base = os.path.abspath(log_base(outdir, name, controller))
+            if parent in (base, f"{base}.npz"):
+                raise ValueError(
+                    f"Fork {name!r} would overwrite the parent log {parent}; "
+                    "use a different variant name or outdir"
+                )
+    if jobs == 1:
+        return {
+            name: run_case(
+                cfg, name, ref_fn, controller, t_final, outdir, resume=checkpoint
+            )
+            for name, cfg in variants.items()
+        }
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            name: pool.submit(
+                run_case,
+                cfg,
+                name,
+                ref_fn,
+                controller,
+                t_final,
+                outdir,
+                resume=checkpoint,
+            )
+            for name, cfg in variants.items()
+        }
+        return {name: fut.result() for name, fut in futures.items()}